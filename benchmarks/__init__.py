@@ -0,0 +1,9 @@
+"""Benchmarks for xpystac, run with `asv <https://asv.readthedocs.io>`_.
+
+    asv run          # benchmark the latest commit on main
+    asv continuous main HEAD  # compare a branch against main
+    asv run --quick --python=same  # smoke-test in the current environment
+
+Every benchmark builds its own STAC objects locally, so no network access is
+needed.
+"""
@@ -0,0 +1,308 @@
+import atexit
+import datetime
+import functools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pystac
+
+from tests.factories import make_kerchunk_item, make_raster_item
+
+EPSG = 32613
+RESOLUTION = 10.0
+
+
+def raster_item(
+    index: int,
+    bands: tuple[str, ...] = ("red", "green", "blue"),
+    shape: tuple[int, int] = (1024, 1024),
+) -> pystac.Item:
+    """Item of COG bands with projection info, like a downsampled Sentinel-2 scene.
+
+    The assets point to files that do not exist, which is fine as long as the
+    benchmark only builds the lazy dataset.
+    """
+    # tile a 10 x 10 grid of scenes, revisiting the whole grid every 5 days
+    row, col = divmod(index % 100, 10)
+    x0 = 300_000.0 + col * shape[1] * RESOLUTION
+    y0 = 4_000_000.0 - row * shape[0] * RESOLUTION
+    item = make_raster_item(index, bands=bands, shape=shape, origin=(x0, y0), epsg=EPSG)
+    item.datetime = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    item.datetime += datetime.timedelta(days=5 * (index // 100))
+    return item
+
+
+def raster_items(n: int, **kwargs) -> list[pystac.Item]:
+    return [raster_item(i, **kwargs) for i in range(n)]
+
+
+def kerchunk_items(n: int, nx: int = 256) -> list[pystac.Item]:
+    """Items with inline kerchunk references, one hour of a
+    ``temperature(time, x)`` cube per item"""
+    return [make_kerchunk_item(i, nx=nx) for i in range(n)]
+
+
+class ItemSearch:
+    """Stand-in for ``pystac_client.ItemSearch`` that pages through items
+    held in memory, so the search branch can be measured offline."""
+
+    def __init__(self, items: list[pystac.Item], page_size: int = 100):
+        self._items = items
+        self.page_size = page_size
+
+    def pages(self):
+        for start in range(0, len(self._items), self.page_size):
+            yield self._items[start : start + self.page_size]
+
+    def items(self):
+        for page in self.pages():
+            yield from page
+
+    def item_collection(self) -> pystac.ItemCollection:
+        return pystac.ItemCollection(self.items())
+
+
+# --- Files on disk for the single asset readers
+
+
+@functools.cache
+def workdir() -> str:
+    """Scratch directory for the files written by the fixtures of one process"""
+    path = tempfile.mkdtemp(prefix="xpystac-benchmarks-")
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+
+def _cube(n_times: int = 24, size: int = 512):
+    """In-memory dataset written out by the zarr, kerchunk and icechunk fixtures"""
+    import pandas as pd
+    import xarray as xr
+
+    rng = np.random.default_rng(0)
+    return xr.Dataset(
+        {
+            "temperature": (
+                ("time", "y", "x"),
+                rng.random((n_times, size, size), dtype="float32"),
+            )
+        },
+        coords={
+            "time": pd.date_range("2020-01-01", periods=n_times, freq="h"),
+            "y": np.arange(size, dtype="float64"),
+            "x": np.arange(size, dtype="float64"),
+        },
+    )
+
+
+def _encoding(chunks: tuple[int, ...] = (1, 256, 256)) -> dict:
+    return {"temperature": {"chunks": chunks}}
+
+
+@functools.cache
+def cog_asset(
+    shape: tuple[int, int] = (2048, 2048), compress: str | None = "deflate"
+) -> pystac.Asset:
+    """Tiled GeoTIFF with overviews, internally compressed unless ``compress``
+    is None"""
+    import rasterio
+    from rasterio.enums import Resampling
+    from rasterio.transform import from_origin
+
+    path = os.path.join(workdir(), f"scene-{compress}.tif")
+    data = np.arange(shape[0] * shape[1], dtype="uint16").reshape(shape)
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        width=shape[1],
+        height=shape[0],
+        count=1,
+        dtype="uint16",
+        crs=f"EPSG:{EPSG}",
+        transform=from_origin(300_000.0, 4_000_000.0, RESOLUTION, RESOLUTION),
+        nodata=0,
+        tiled=True,
+        blockxsize=512,
+        blockysize=512,
+        compress=compress,
+    ) as dst:
+        dst.write(data, 1)
+        dst.build_overviews([2, 4, 8], Resampling.nearest)
+    return pystac.Asset(path, media_type=pystac.MediaType.COG, roles=["data"])
+
+
+@functools.cache
+def zarr_asset(
+    zarr_format: int = 3, consolidated: bool = True, compressed: bool = True
+) -> pystac.Asset:
+    """Local zarr store of ``_cube`` in the given zarr format"""
+    path = os.path.join(
+        workdir(), f"cube-v{zarr_format}-{consolidated}-{compressed}.zarr"
+    )
+    encoding = _encoding()
+    if not compressed:
+        encoding["temperature"]["compressors"] = None
+    _cube().to_zarr(
+        path,
+        zarr_format=zarr_format,
+        consolidated=consolidated,
+        encoding=encoding,
+        mode="w",
+    )
+    return pystac.Asset(
+        path,
+        media_type="application/vnd+zarr",
+        roles=["data"],
+        extra_fields={
+            "zarr:zarr_format": zarr_format,
+            "zarr:consolidated": consolidated,
+        },
+    )
+
+
+@functools.cache
+def reference_asset() -> pystac.Asset:
+    """Kerchunk reference file pointing at the chunks of the zarr v2 store"""
+    store = zarr_asset(zarr_format=2, consolidated=False).href
+    refs: dict = {}
+    for root, _, files in os.walk(store):
+        for name in files:
+            path = os.path.join(root, name)
+            key = os.path.relpath(path, store).replace(os.sep, "/")
+            if name.startswith("."):
+                with open(path) as f:
+                    refs[key] = f.read()
+            else:
+                refs[key] = [path, 0, os.path.getsize(path)]
+
+    path = os.path.join(workdir(), "cube.json")
+    with open(path, "w") as f:
+        json.dump({"version": 1, "refs": refs}, f)
+    return pystac.Asset(
+        path, media_type=pystac.MediaType.JSON, roles=["references", "data"]
+    )
+
+
+@functools.cache
+def icechunk_asset() -> pystac.Asset:
+    """Icechunk repository on the local filesystem with one commit on main"""
+    import icechunk
+
+    path = os.path.join(workdir(), "cube.icechunk")
+    repo = icechunk.Repository.create(icechunk.local_filesystem_storage(path))
+    session = repo.writable_session("main")
+    _cube().to_zarr(
+        session.store, zarr_format=3, consolidated=False, encoding=_encoding()
+    )
+    session.commit("write cube")
+    return pystac.Asset(
+        path,
+        media_type="application/vnd.zarr+icechunk",
+        roles=["data"],
+        extra_fields={"version": "main"},
+    )
+
+
+@functools.cache
+def store_items(n: int, size: int = 64) -> list[pystac.Item]:
+    """Items with one small zarr store each, one day of ``_cube`` per store"""
+    cube = _cube(n_times=1, size=size).isel(time=0, drop=True)
+    items = []
+    for i in range(n):
+        path = os.path.join(workdir(), f"day-{size}-{i}.zarr")
+        if not os.path.exists(path):
+            cube.to_zarr(path, consolidated=True)
+        item = pystac.Item(
+            id=f"day-{i}",
+            geometry=None,
+            bbox=None,
+            datetime=datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+            + datetime.timedelta(days=i),
+            properties={},
+        )
+        item.add_asset(
+            "zarr",
+            pystac.Asset(path, media_type="application/vnd+zarr", roles=["data"]),
+        )
+        items.append(item)
+    return items
+
+
+ASSETS = {
+    "cog": cog_asset,
+    "zarr2": functools.partial(zarr_asset, zarr_format=2),
+    "zarr3": functools.partial(zarr_asset, zarr_format=3),
+    "references": reference_asset,
+    "icechunk": icechunk_asset,
+}
+
+
+def stackstac_like(n_bands: int, n_times: int = 10, n_coords: int = 20, size=512):
+    """Dask-backed DataArray shaped like the output of ``stackstac.stack``"""
+    import dask.array
+    import numpy as np
+    import pandas as pd
+    import xarray as xr
+
+    bands = [f"B{i:02}" for i in range(n_bands)]
+    coords = {
+        "time": pd.date_range("2023-01-01", periods=n_times),
+        "band": bands,
+        "y": np.arange(size),
+        "x": np.arange(size),
+        "id": ("time", [f"item-{i}" for i in range(n_times)]),
+        "epsg": EPSG,
+    }
+    for i in range(n_coords):
+        coords[f"band_property_{i}"] = ("band", [f"{b}-{i}" for b in bands])
+    data = dask.array.zeros(
+        (n_times, n_bands, size, size), chunks=(1, 1, size, size), dtype="uint16"
+    )
+    return xr.DataArray(data, dims=("time", "band", "y", "x"), coords=coords)
+
+
+class _SlowServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # seconds slept before answering each request
+    latency = 0.0
+
+
+class _SlowHandler(SimpleHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@functools.cache
+def http_server(latency: float = 0.01) -> str:
+    """Serve ``workdir`` over HTTP with a fixed latency per request, like an
+    object store, and return its url."""
+    handler = functools.partial(_SlowHandler, directory=workdir())
+    server = _SlowServer(("127.0.0.1", 0), handler)
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    atexit.register(server.shutdown)
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def http_reference_assets(n: int, latency: float = 0.01) -> list[pystac.Asset]:
+    """``n`` assets pointing at the kerchunk reference file served over HTTP"""
+    name = os.path.basename(reference_asset().href)
+    url = http_server(latency)
+    return [
+        pystac.Asset(
+            f"{url}/{name}?{i}",
+            media_type=pystac.MediaType.JSON,
+            roles=["references", "data"],
+        )
+        for i in range(n)
+    ]
@@ -0,0 +1,285 @@
+import asyncio
+import os
+
+import pystac
+import xarray
+
+from benchmarks.fixtures import (
+    ASSETS,
+    ItemSearch,
+    cog_asset,
+    http_reference_assets,
+    http_server,
+    kerchunk_items,
+    raster_items,
+    store_items,
+    zarr_asset,
+)
+from xpystac._icechunk import clear_icechunk_cache
+from xpystac.cache import ChunkCache, get_chunk_cache, set_chunk_cache
+from xpystac.core import ato_xarray_many, plan_open, to_xarray
+
+
+class OpenAsset:
+    """Latency, graph size and memory of opening one asset of each kind.
+
+    The icechunk pool is cleared before every call so that each open
+    includes reading the repository config and resolving the branch.
+    """
+
+    params = list(ASSETS)
+    param_names = ["kind"]
+
+    def setup(self, kind):
+        self.asset = ASSETS[kind]()
+
+    def _to_xarray(self):
+        clear_icechunk_cache()
+        return to_xarray(self.asset)
+
+    def time_to_xarray(self, kind):
+        self._to_xarray()
+
+    def peakmem_to_xarray(self, kind):
+        self._to_xarray()
+
+    def track_graph_size(self, kind):
+        ds = self._to_xarray()
+        return len(ds.__dask_graph__())
+
+    track_graph_size.unit = "tasks"  # type: ignore[attr-defined]
+
+
+class StackItems:
+    """Latency, graph size and memory of the item branches: combining
+    kerchunk references from the datacube extension, or stacking COG items
+    with each stacking library."""
+
+    params = (
+        [1, 100, 10_000],
+        ["kerchunk", "odc.stac", "stackstac"],
+    )
+    param_names = ["n_items", "reader"]
+    timeout = 600
+
+    def setup(self, n_items, reader):
+        if reader == "kerchunk":
+            self.items = kerchunk_items(n_items)
+            self.kwargs = {}
+        else:
+            self.items = raster_items(n_items)
+            self.kwargs = {"stacking_library": reader}
+
+    def _to_xarray(self):
+        items = self.items[0] if len(self.items) == 1 else self.items
+        return to_xarray(items, **self.kwargs)
+
+    def time_to_xarray(self, n_items, reader):
+        self._to_xarray()
+
+    def peakmem_to_xarray(self, n_items, reader):
+        self._to_xarray()
+
+    def track_graph_size(self, n_items, reader):
+        ds = self._to_xarray()
+        return len(ds.__dask_graph__())
+
+    track_graph_size.unit = "tasks"  # type: ignore[attr-defined]
+
+
+class SearchItems:
+    """Latency and memory of stacking the results of an item search,
+    collected up front or streamed page by page."""
+
+    params = (
+        [1, 100, 10_000],
+        [False, True],
+    )
+    param_names = ["n_items", "stream"]
+    timeout = 600
+
+    def setup(self, n_items, stream):
+        self.search = ItemSearch(raster_items(n_items))
+
+    def time_to_xarray(self, n_items, stream):
+        to_xarray(self.search, stacking_library="odc.stac", stream=stream)
+
+    def peakmem_to_xarray(self, n_items, stream):
+        to_xarray(self.search, stacking_library="odc.stac", stream=stream)
+
+
+class AsyncOpenMany:
+    """Time to open 1,000 kerchunk reference assets served with 10ms of
+    latency each, at several concurrency limits."""
+
+    params = [1, 16, 64]
+    param_names = ["limit"]
+    number = 1
+    repeat = 3
+    timeout = 120
+
+    def setup(self, limit):
+        self.assets = http_reference_assets(1_000)
+
+    def time_ato_xarray_many(self, limit):
+        asyncio.run(ato_xarray_many(self.assets, limit=limit))
+
+
+class MetadataOnly:
+    """Time to build the skeleton of a stack from STAC fields alone."""
+
+    params = (
+        [100, 10_000, 100_000],
+        ["raster", "kerchunk"],
+    )
+    param_names = ["n_items", "kind"]
+    timeout = 600
+
+    def setup(self, n_items, kind):
+        if kind == "kerchunk":
+            self.items = kerchunk_items(n_items)
+        else:
+            self.items = raster_items(n_items)
+
+    def time_to_xarray(self, n_items, kind):
+        to_xarray(self.items, metadata_only=True)
+
+    def peakmem_to_xarray(self, n_items, kind):
+        to_xarray(self.items, metadata_only=True)
+
+
+class MemoryMapped:
+    """Time and memory of loading all the data of a local uncompressed asset
+    through xarray or through memory maps."""
+
+    params = (["cog", "zarr"], [False, True])
+    param_names = ["kind", "mmap"]
+
+    def setup(self, kind, mmap):
+        if kind == "cog":
+            self.asset = cog_asset(compress=None)
+        else:
+            self.asset = zarr_asset(compressed=False)
+
+    def time_load(self, kind, mmap):
+        to_xarray(self.asset, mmap=mmap).compute()
+
+    def peakmem_load(self, kind, mmap):
+        to_xarray(self.asset, mmap=mmap).compute()
+
+    def time_open(self, kind, mmap):
+        to_xarray(self.asset, mmap=mmap)
+
+
+class StackStores:
+    """Open time of items with one zarr store each, stacked by xpystac or
+    opened one after the other and concatenated by xarray."""
+
+    params = ([10, 100, 500], ["sequential", "xpystac"])
+    param_names = ["n_items", "reader"]
+    timeout = 600
+
+    def setup(self, n_items, reader):
+        self.items = store_items(n_items)
+
+    def _to_xarray(self, reader):
+        if reader == "xpystac":
+            return to_xarray(self.items)
+        datasets = [
+            to_xarray(item.assets["zarr"]).expand_dims(time=[item.datetime])
+            for item in self.items
+        ]
+        return xarray.concat(datasets, "time")
+
+    def time_to_xarray(self, n_items, reader):
+        self._to_xarray(reader)
+
+    def peakmem_to_xarray(self, n_items, reader):
+        self._to_xarray(reader)
+
+
+class ChunkCaching:
+    """Time of loading a zarr store served over HTTP again, with and without
+    the process-wide chunk cache holding its chunks from the first load."""
+
+    params = [False, True]
+    param_names = ["chunk_cache"]
+
+    def setup(self, chunk_cache):
+        name = os.path.basename(zarr_asset().href)
+        self.asset = pystac.Asset(
+            f"{http_server()}/{name}", media_type="application/vnd+zarr"
+        )
+        self.previous = set_chunk_cache(ChunkCache(2**30) if chunk_cache else None)
+        to_xarray(self.asset).load()
+
+    def teardown(self, chunk_cache):
+        set_chunk_cache(self.previous)
+
+    def time_reload(self, chunk_cache):
+        to_xarray(self.asset).load()
+
+    def track_hit_rate(self, chunk_cache):
+        to_xarray(self.asset).load()
+        cache = get_chunk_cache()
+        return cache.stats["hit_rate"] if cache is not None else 0.0
+
+    track_hit_rate.unit = "ratio"  # type: ignore[attr-defined]
+
+
+class OpenPlans:
+    """Time of reopening items from the STAC metadata or from a plan made
+    by ``plan_open``, which skips combining references and computing the
+    output grid."""
+
+    params = (["kerchunk", "raster"], ["stac", "plan"])
+    param_names = ["kind", "source"]
+
+    def setup(self, kind, source):
+        self.items = kerchunk_items(100) if kind == "kerchunk" else raster_items(100)
+        self.plan = plan_open(self.items)
+
+    def time_open(self, kind, source):
+        if source == "plan":
+            self.plan.open()
+        else:
+            to_xarray(self.items)
+
+
+class OpenCollection:
+    """Open time of a collection served over HTTP, from the representation
+    ranked first or from each of its assets."""
+
+    params = [None, "refs", "unconsolidated"]
+    param_names = ["asset_key"]
+
+    def setup(self, asset_key):
+        url = http_server()
+        self.collection = pystac.Collection(
+            id="cube",
+            description="the same cube as zarr and kerchunk references",
+            extent=pystac.Extent(
+                pystac.SpatialExtent([[-180, -90, 180, 90]]),
+                pystac.TemporalExtent([[None, None]]),
+            ),
+        )
+        store = zarr_asset(zarr_format=2, consolidated=False)
+        self.collection.add_asset(
+            "unconsolidated",
+            pystac.Asset(
+                f"{url}/{os.path.basename(store.href)}",
+                media_type="application/vnd+zarr",
+                extra_fields={"xarray:open_kwargs": {"consolidated": False}},
+            ),
+        )
+        self.collection.add_asset("refs", http_reference_assets(1)[0])
+        self.collection.add_asset(
+            "store",
+            pystac.Asset(
+                f"{url}/{os.path.basename(zarr_asset().href)}",
+                media_type="application/vnd+zarr",
+            ),
+        )
+
+    def time_to_xarray(self, asset_key):
+        to_xarray(self.collection, asset_key=asset_key)
@@ -0,0 +1,169 @@
+import datetime
+import time
+
+from benchmarks.fixtures import raster_items, stackstac_like
+from tests.factories import legacy_stackstac_to_dataset
+from xpystac._stacking import stackstac_to_dataset
+from xpystac.core import refresh, to_xarray
+from xpystac.signing import Signer, Token
+
+# latency of one request for a token
+SIGN_LATENCY = 0.002
+
+
+class Partitioning:
+    """Graph build time and memory of stacking many items in one call or
+    one partition at a time."""
+
+    params = (
+        [100, 1_000, 10_000],
+        ["odc.stac", "stackstac"],
+        [None, 500],
+    )
+    param_names = ["n_items", "stacking_library", "partition"]
+    timeout = 600
+
+    def setup(self, n_items, stacking_library, partition):
+        self.items = raster_items(n_items)
+
+    def _to_xarray(self, stacking_library, partition):
+        return to_xarray(
+            self.items, stacking_library=stacking_library, partition=partition
+        )
+
+    def time_to_xarray(self, n_items, stacking_library, partition):
+        self._to_xarray(stacking_library, partition)
+
+    def peakmem_to_xarray(self, n_items, stacking_library, partition):
+        self._to_xarray(stacking_library, partition)
+
+    def track_graph_size(self, n_items, stacking_library, partition):
+        ds = self._to_xarray(stacking_library, partition)
+        return len(ds.__dask_graph__())
+
+    track_graph_size.unit = "tasks"  # type: ignore[attr-defined]
+
+
+class BandSplit:
+    """Converting a stackstac DataArray into a Dataset of bands"""
+
+    params = ([3, 12, 48], ["legacy", "vectorized"])
+    param_names = ["n_bands", "implementation"]
+
+    def setup(self, n_bands, implementation):
+        self.da = stackstac_like(n_bands)
+        self.func = {
+            "legacy": legacy_stackstac_to_dataset,
+            "vectorized": stackstac_to_dataset,
+        }[implementation]
+
+    def time_to_dataset(self, n_bands, implementation):
+        self.func(self.da)
+
+
+class Prefiltering:
+    """Graph build time of stacking a small region of many items, with and
+    without dropping the items outside of it up front."""
+
+    params = ([1_000, 10_000], ["odc.stac", "stackstac"], [False, True])
+    param_names = ["n_items", "stacking_library", "prefilter"]
+    timeout = 600
+
+    def setup(self, n_items, stacking_library, prefilter):
+        self.items = raster_items(n_items)
+        # the inside of the first scene of the grid
+        minx, miny, maxx, maxy = self.items[0].bbox
+        dx, dy = (maxx - minx) / 4, (maxy - miny) / 4
+        bbox = [minx + dx, miny + dy, maxx - dx, maxy - dy]
+        self.region = (
+            {"bbox": bbox}
+            if stacking_library == "odc.stac"
+            else {"bounds_latlon": bbox}
+        )
+
+    def _to_xarray(self, stacking_library, prefilter):
+        return to_xarray(
+            self.items,
+            stacking_library=stacking_library,
+            prefilter=prefilter,
+            **self.region,
+        )
+
+    def time_to_xarray(self, n_items, stacking_library, prefilter):
+        self._to_xarray(stacking_library, prefilter)
+
+    def track_graph_size(self, n_items, stacking_library, prefilter):
+        ds = self._to_xarray(stacking_library, prefilter)
+        return len(ds.__dask_graph__())
+
+    track_graph_size.unit = "tasks"  # type: ignore[attr-defined]
+
+
+class Signing:
+    """Time of stacking items whose hrefs are signed one by one, with a
+    request per href, or by a ``Signer`` with a request per batch of the
+    containers not signed by a previous open."""
+
+    params = ([100, 1_000], ["per_href", "signer"])
+    param_names = ["n_items", "patch_url"]
+    timeout = 600
+
+    def setup(self, n_items, patch_url):
+        self.items = raster_items(n_items)
+        # --- Spread the scenes over 10 containers of a blob storage account
+        for item in self.items:
+            container = int(item.id.split("-")[1]) % 10
+            for key, asset in item.assets.items():
+                asset.href = f"https://account.blob.core.windows.net/c{container}/{item.id}/{key}.tif"
+        self.calls = 0
+        if patch_url == "signer":
+            self.patch_url = Signer(self._sign_containers)
+        else:
+            self.patch_url = self._sign_href
+
+    def _sign_href(self, obj):
+        self.calls += 1
+        time.sleep(SIGN_LATENCY)
+        return obj
+
+    def _sign_containers(self, containers):
+        self.calls += 1
+        time.sleep(SIGN_LATENCY)
+        expiry = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(
+            hours=1
+        )
+        return {c: Token("sig=0", expiry) for c in containers}
+
+    def time_to_xarray(self, n_items, patch_url):
+        to_xarray(self.items, stacking_library="stackstac", patch_url=self.patch_url)
+
+    def track_sign_calls(self, n_items, patch_url):
+        self.calls = 0
+        if isinstance(self.patch_url, Signer):
+            self.patch_url.clear()
+        for _ in range(3):
+            to_xarray(
+                self.items, stacking_library="stackstac", patch_url=self.patch_url
+            )
+        return self.calls
+
+    track_sign_calls.unit = "calls"  # type: ignore[attr-defined]
+
+
+class Refresh:
+    """Time of adding the last 100 items of a search to a cube of the
+    previous ones, by opening all the items again or refreshing the cube."""
+
+    params = ([1_000, 10_000], ["odc.stac", "stackstac"], ["rebuild", "refresh"])
+    param_names = ["n_items", "stacking_library", "method"]
+    timeout = 600
+
+    def setup(self, n_items, stacking_library, method):
+        self.items = raster_items(n_items + 100)
+        self.ds = to_xarray(self.items[:n_items], stacking_library=stacking_library)
+
+    def time_add_items(self, n_items, stacking_library, method):
+        if method == "refresh":
+            refresh(self.ds, self.items[n_items:])
+        else:
+            to_xarray(self.items, stacking_library=stacking_library)
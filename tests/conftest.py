@@ -1,7 +1,11 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pystac
 import pystac_client
 import pytest
 
+from tests.factories import make_kerchunk_item
 from tests.utils import STAC_URLS
 
 
@@ -24,6 +28,53 @@ def data_cube_kerchunk() -> pystac.ItemCollection:
     return pystac.ItemCollection.from_file(path)
 
 
+@pytest.fixture
+def inline_kerchunk() -> pystac.ItemCollection:
+    return pystac.ItemCollection([make_kerchunk_item(i) for i in [3, 0, 4, 1, 2]])
+
+
+@pytest.fixture
+def local_collection(tmp_path) -> pystac.Collection:
+    """Collection with a zarr store, a kerchunk reference file, a zarr asset
+    that does not exist and a thumbnail, all on local disk."""
+    import json
+
+    import numpy as np
+    import xarray as xr
+
+    from xpystac._xstac_kerchunk import _stac_to_kerchunk
+
+    xr.Dataset({"a": ("x", np.arange(3))}).to_zarr(tmp_path / "store.zarr")
+    refs = tmp_path / "refs.json"
+    refs.write_text(json.dumps(_stac_to_kerchunk(make_kerchunk_item(1))))
+
+    collection = pystac.Collection(
+        id="local",
+        description="local assets",
+        extent=pystac.Extent(
+            pystac.SpatialExtent([[-180, -90, 180, 90]]),
+            pystac.TemporalExtent([[None, None]]),
+        ),
+    )
+    collection.add_asset(
+        "zarr",
+        pystac.Asset(str(tmp_path / "store.zarr"), media_type="application/vnd+zarr"),
+    )
+    collection.add_asset(
+        "references",
+        pystac.Asset(str(refs), media_type=pystac.MediaType.JSON, roles=["references"]),
+    )
+    collection.add_asset(
+        "missing",
+        pystac.Asset(str(tmp_path / "missing.zarr"), media_type="application/vnd+zarr"),
+    )
+    collection.add_asset(
+        "thumbnail",
+        pystac.Asset(str(tmp_path / "thumbnail.png"), media_type=pystac.MediaType.PNG),
+    )
+    return collection
+
+
 @pytest.fixture(scope="module")
 def virtual_icechunk() -> pystac.ItemCollection:
     path = "tests/data/virtual-icechunk-collection.json"
@@ -38,3 +89,37 @@ def simple_search() -> pystac_client.ItemSearch:
         collections=["sentinel-2-l2a"],
         datetime="2020-05-01",
     )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.client_address))
+        if self.path not in self.server.routes:
+            self.send_error(404)
+            return
+        body, headers = self.server.routes[self.path]
+        self.send_response(200)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    """Local HTTP server that serves ``routes`` and records every request"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.routes = {}
+    server.requests = []
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,146 @@
+"""Objects shared by the tests and the benchmarks.
+
+Only the runtime dependencies of xpystac are imported here, so that the
+benchmarks can use it without the test dependencies.
+"""
+
+import base64
+import datetime
+import functools
+
+import numpy as np
+import pystac
+import xarray as xr
+
+
+@functools.cache
+def _to_lonlat(epsg: int):
+    from pyproj import Transformer
+
+    return Transformer.from_crs(epsg, 4326, always_xy=True)
+
+
+def make_kerchunk_item(index: int, nx: int = 4) -> pystac.Item:
+    """Make an item with inline kerchunk references in the datacube extension"""
+
+    def inline(values: np.ndarray) -> str:
+        return "base64:" + base64.b64encode(values.tobytes()).decode()
+
+    def zarray(shape: list[int], dtype: str) -> dict:
+        return {
+            "chunks": shape,
+            "compressor": None,
+            "dtype": dtype,
+            "fill_value": None,
+            "filters": None,
+            "order": "C",
+            "shape": shape,
+            "zarr_format": 2,
+        }
+
+    dt = datetime.datetime(2023, 9, 20, tzinfo=datetime.timezone.utc)
+    dt += datetime.timedelta(hours=index)
+    minutes = np.array([int(dt.timestamp() // 60)], dtype="<i4")
+    properties = {
+        "kerchunk:zgroup": {"zarr_format": 2},
+        "kerchunk:zattrs": {"index": index},
+        "cube:dimensions": {
+            "time": {
+                "type": "temporal",
+                "kerchunk:zarray": zarray([1], "<i4"),
+                "kerchunk:zattrs": {
+                    "_ARRAY_DIMENSIONS": ["time"],
+                    "units": "minutes since 1970-01-01 00:00:00 UTC",
+                    "valid_min": int(minutes[0]),
+                },
+                "kerchunk:value": {"0": inline(minutes)},
+            },
+            "x": {
+                "type": "spatial",
+                "kerchunk:zarray": zarray([nx], "<i8"),
+                "kerchunk:zattrs": {"_ARRAY_DIMENSIONS": ["x"]},
+                "kerchunk:value": {"0": inline(np.arange(nx, dtype="<i8"))},
+            },
+        },
+        "cube:variables": {
+            "temperature": {
+                "type": "data",
+                "dimensions": ["time", "x"],
+                "kerchunk:zarray": zarray([1, nx], "<f4"),
+                "kerchunk:zattrs": {"_ARRAY_DIMENSIONS": ["time", "x"]},
+                "kerchunk:value": {"0.0": inline(np.full((1, nx), index, dtype="<f4"))},
+            },
+            "flow": {
+                "type": "data",
+                "dimensions": ["x"],
+                "kerchunk:zarray": zarray([nx], "<f4"),
+                "kerchunk:zattrs": {"_ARRAY_DIMENSIONS": ["x"]},
+                "kerchunk:value": {"0": inline(np.full(nx, -index, dtype="<f4"))},
+            },
+        },
+    }
+    return pystac.Item(
+        id=f"item-{index}",
+        geometry=None,
+        bbox=None,
+        datetime=dt,
+        properties=properties,
+    )
+
+
+def make_raster_item(
+    index: int,
+    bands: tuple[str, ...] = ("red", "green"),
+    shape: tuple[int, int] = (256, 256),
+    origin: tuple[float, float] = (500_000.0, 4_000_000.0),
+    epsg: int = 32613,
+) -> pystac.Item:
+    """Make an item of COG bands on a UTM grid with projection info but no data"""
+    x0, y0 = origin
+    res = 10.0
+    x1, y1 = x0 + shape[1] * res, y0 - shape[0] * res
+    lons, lats = _to_lonlat(epsg).transform([x0, x1, x1, x0], [y0, y0, y1, y1])
+    bbox = [min(lons), min(lats), max(lons), max(lats)]
+
+    item = pystac.Item(
+        id=f"item-{index}",
+        geometry={
+            "type": "Polygon",
+            "coordinates": [[*zip(lons, lats), (lons[0], lats[0])]],
+        },
+        bbox=bbox,
+        datetime=datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc)
+        + datetime.timedelta(days=index),
+        properties={
+            "proj:epsg": epsg,
+            "proj:shape": list(shape),
+            "proj:transform": [res, 0.0, x0, 0.0, -res, y0, 0.0, 0.0, 1.0],
+        },
+        stac_extensions=[
+            "https://stac-extensions.github.io/projection/v1.1.0/schema.json",
+            "https://stac-extensions.github.io/raster/v1.1.0/schema.json",
+        ],
+    )
+    for band in bands:
+        item.add_asset(
+            band,
+            pystac.Asset(
+                f"file:///data/item-{index}/{band}.tif",
+                media_type=pystac.MediaType.COG,
+                roles=["data"],
+                extra_fields={"raster:bands": [{"data_type": "uint16", "nodata": 0}]},
+            ),
+        )
+    return item
+
+
+def legacy_stackstac_to_dataset(da: xr.DataArray) -> xr.Dataset:
+    """Band split as it was done before it moved to ``stackstac_to_dataset``"""
+    bands = {}
+    for band in da.band.values:
+        b = da.sel(band=band)
+        scalar_coords = {k: v.item() for k, v in b.coords.items() if v.shape == ()}
+        b = b.assign_attrs(**{k: v for k, v in scalar_coords.items() if v is not None})
+        b = b.drop_vars(scalar_coords)
+        bands[band] = b
+    return xr.Dataset(bands, attrs=da.attrs)
@@ -0,0 +1,215 @@
+import json
+import os
+import time
+
+import numpy as np
+import pystac
+import pytest
+import xarray as xr
+
+from tests.factories import make_kerchunk_item
+from tests.utils import requires_icechunk
+from xpystac._xstac_kerchunk import _stac_to_kerchunk
+from xpystac.cache import ChunkCache, ReferenceCache, set_chunk_cache
+from xpystac.core import to_xarray
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ReferenceCache(tmp_path / "cache")
+
+
+def test_reference_cache_round_trip(cache):
+    refs = _stac_to_kerchunk(make_kerchunk_item(0))
+    key = cache.key(refs)
+
+    assert cache.get(key) is None
+    cache.set(key, refs)
+    assert cache.get(key) == refs
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 1
+    assert cache.stats["entries"] == 1
+
+
+def test_reference_cache_key_is_independent_of_key_order(cache):
+    assert cache.key({"a": 1, "b": 2}) == cache.key({"b": 2, "a": 1})
+    assert cache.key({"a": 1}) != cache.key({"a": 2})
+
+
+def test_reference_cache_expires_entries(tmp_path):
+    cache = ReferenceCache(tmp_path, ttl=0.01)
+    cache.set("a", {"refs": {}})
+    time.sleep(0.05)
+
+    assert cache.get("a") is None
+    assert cache.stats["entries"] == 0
+
+
+def test_reference_cache_evicts_least_recently_used(tmp_path):
+    refs = _stac_to_kerchunk(make_kerchunk_item(0))
+    cache = ReferenceCache(tmp_path)
+    cache.set("a", refs)
+    cache.max_size = 2 * cache.stats["size"]
+
+    cache.set("b", refs)
+    os.utime(tmp_path / "a.refs", (0, 0))
+    cache.set("c", refs)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == refs
+    assert cache.get("c") == refs
+
+
+def test_to_xarray_with_cache_skips_combine(cache, inline_kerchunk, monkeypatch):
+    expected = to_xarray(inline_kerchunk, cache=cache)
+    assert cache.stats["misses"] == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("references should come from the cache")
+
+    monkeypatch.setattr("xpystac.core._combine_kerchunk_items", fail)
+    actual = to_xarray(inline_kerchunk, cache=cache)
+
+    assert cache.stats["hits"] == 1
+    assert actual.identical(expected)
+
+
+def test_to_xarray_with_cache_skips_fetch(cache, http_server):
+    refs = _stac_to_kerchunk(make_kerchunk_item(0))
+    http_server.routes["/refs.json"] = (json.dumps(refs).encode(), {})
+    asset = pystac.Asset(
+        f"{http_server.url}/refs.json",
+        media_type=pystac.MediaType.JSON,
+        roles=["references"],
+    )
+
+    for _ in range(3):
+        to_xarray(asset, cache=cache)
+
+    assert len(http_server.requests) == 1
+    assert cache.stats["hits"] == 2
+
+
+@pytest.fixture
+def chunk_cache():
+    cache = ChunkCache()
+    previous = set_chunk_cache(cache)
+    yield cache
+    set_chunk_cache(previous)
+
+
+def _write_zarr(path, zarr_format: int = 3) -> str:
+    ds = xr.Dataset({"a": (("y", "x"), np.arange(400.0).reshape(20, 20))})
+    ds.to_zarr(path, zarr_format=zarr_format, encoding={"a": {"chunks": (10, 10)}})
+    return str(path)
+
+
+def test_chunk_cache_evicts_least_recently_used():
+    cache = ChunkCache(max_size=8)
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    assert cache.get("a") == b"1234"
+    cache.set("c", b"1234")
+
+    assert cache.get("b") is None
+    assert cache.get("c") == b"1234"
+    assert cache.stats["hits"] == 2
+    assert cache.stats["misses"] == 1
+    assert cache.stats["size"] == 8
+
+
+def test_chunk_cache_spills_to_disk(tmp_path):
+    cache = ChunkCache(max_size=4, directory=tmp_path, max_disk_size=4)
+    for key in "abc":
+        cache.set(key, key.encode() * 4)
+
+    # a was spilled and then dropped from disk, b is still on disk
+    assert len(os.listdir(tmp_path)) == 1
+    assert cache.get("a") is None
+    assert cache.get("b") == b"bbbb"
+    assert cache.stats["disk_hits"] == 1
+    assert cache.stats["hit_rate"] == 0.5
+
+    cache.clear()
+    assert os.listdir(tmp_path) == []
+
+
+def test_to_xarray_zarr_asset_with_chunk_cache(chunk_cache, tmp_path):
+    href = _write_zarr(tmp_path / "store.zarr")
+    asset = pystac.Asset(href, media_type="application/vnd+zarr")
+
+    to_xarray(asset).load()
+    assert chunk_cache.stats["misses"] == 4
+    assert chunk_cache.stats["hits"] == 0
+
+    # reopening reads the chunks from the cache, even if the files are gone
+    for chunk in os.listdir(os.path.join(href, "a", "c", "0")):
+        os.remove(os.path.join(href, "a", "c", "0", chunk))
+    ds = to_xarray(asset).load()
+    assert chunk_cache.stats["hits"] == 4
+    np.testing.assert_array_equal(ds.a[:, 0], np.arange(0.0, 400, 20))
+
+
+def test_to_xarray_reference_asset_with_chunk_cache(chunk_cache, tmp_path):
+    store = _write_zarr(tmp_path / "store.zarr", zarr_format=2)
+    refs = {}
+    for root, _, files in os.walk(store):
+        for name in files:
+            path = os.path.join(root, name)
+            key = os.path.relpath(path, store).replace(os.sep, "/")
+            if name.startswith("."):
+                with open(path) as f:
+                    refs[key] = f.read()
+            else:
+                refs[key] = [path, 0, os.path.getsize(path)]
+    (tmp_path / "refs.json").write_text(json.dumps({"version": 1, "refs": refs}))
+    asset = pystac.Asset(
+        str(tmp_path / "refs.json"),
+        media_type=pystac.MediaType.JSON,
+        roles=["references"],
+    )
+
+    expected = to_xarray(asset).load()
+    actual = to_xarray(asset).load()
+
+    xr.testing.assert_identical(actual, expected)
+    assert chunk_cache.stats["misses"] == 4
+    assert chunk_cache.stats["hits"] == 4
+
+
+@requires_icechunk
+def test_to_xarray_icechunk_asset_with_chunk_cache(chunk_cache, tmp_path):
+    import icechunk
+
+    repo = icechunk.Repository.create(
+        icechunk.local_filesystem_storage(str(tmp_path / "repo"))
+    )
+    asset = pystac.Asset(
+        str(tmp_path / "repo"),
+        media_type="application/vnd.zarr+icechunk",
+        extra_fields={"version": "main"},
+    )
+    for value in [1, 2]:
+        session = repo.writable_session("main")
+        ds = xr.Dataset({"a": ("x", np.full(3, value))})
+        ds.to_zarr(session.store, zarr_format=3, consolidated=False, mode="w")
+        session.commit(f"write {value}")
+
+        assert to_xarray(asset).a.values.tolist() == [value] * 3
+        assert to_xarray(asset).a.values.tolist() == [value] * 3
+
+    # every commit is a new snapshot, so its chunks are not served stale
+    assert chunk_cache.stats["misses"] == 2
+    assert chunk_cache.stats["hits"] == 2
+
+
+def test_to_xarray_kerchunk_items_with_chunk_cache(chunk_cache, inline_kerchunk):
+    set_chunk_cache(None)
+    expected = to_xarray(inline_kerchunk, read_ahead=False).load()
+    set_chunk_cache(chunk_cache)
+
+    for read_ahead in [True, False]:
+        actual = to_xarray(inline_kerchunk, read_ahead=read_ahead).load()
+        xr.testing.assert_identical(actual, expected)
+    # inline references are already in memory
+    assert chunk_cache.stats["misses"] == 0
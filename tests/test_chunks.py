@@ -0,0 +1,68 @@
+import dask
+import numpy as np
+import pystac
+import pytest
+import xarray as xr
+
+from tests.factories import make_raster_item
+from xpystac._chunks import plan_chunks, plan_variables, raster_chunks
+from xpystac.core import to_xarray
+
+
+def test_plan_chunks_grows_whole_blocks_within_budget():
+    chunks = plan_chunks((10, 1000, 1000), (1, 100, 100), 1, budget=160_000)
+    assert chunks == (2, 200, 400)
+
+
+def test_plan_chunks_is_capped_by_the_shape():
+    assert plan_chunks((3, 50, 60), (1, 20, 20), 4, budget=2**30) == (3, 50, 60)
+    assert plan_chunks((10, 100), (1, 10), 1, budget=2**30, fixed=[0]) == (1, 100)
+    # a single block is kept even when it is over budget
+    assert plan_chunks((10, 100), (5, 50), 8, budget=1) == (5, 50)
+
+
+def test_plan_variables_keeps_the_close_handler():
+    ds = xr.Dataset({"t": (("y", "x"), np.zeros((50, 60)))})
+    closed = []
+    ds.set_close(lambda: closed.append(True))
+
+    planned = plan_variables(ds)
+    planned.close()
+
+    assert planned.t.chunks is not None
+    assert closed == [True]
+
+
+def test_raster_chunks_follow_the_dask_chunk_size():
+    item = make_raster_item(0)
+    with dask.config.set({"array.chunk-size": "128MiB"}):
+        assert raster_chunks(item) == (1024, 1024)
+        assert raster_chunks(item, dtype="float64") == (1024, 1024)
+    with dask.config.set({"array.chunk-size": "1MiB"}):
+        assert raster_chunks(item) == (512, 1024)
+        assert raster_chunks(item, dtype="float64") == (512, 512)
+
+
+def test_zarr_asset_chunks_are_multiples_of_native_chunks(tmp_path):
+    ds = xr.Dataset({"t": (("time", "y", "x"), np.zeros((3, 50, 60), dtype="float32"))})
+    ds.to_zarr(tmp_path / "store.zarr", encoding={"t": {"chunks": (1, 20, 20)}})
+    asset = pystac.Asset(
+        str(tmp_path / "store.zarr"), media_type="application/vnd+zarr"
+    )
+
+    with dask.config.set({"array.chunk-size": "8KiB"}):
+        planned = to_xarray(asset)
+    assert planned.t.chunks == ((1, 1, 1), (50,), (40, 20))
+    assert to_xarray(asset, chunks={}).t.chunks == ((1, 1, 1), (20, 20, 10), (20,) * 3)
+
+
+@pytest.mark.parametrize(
+    "stacking_library, expected",
+    [("odc.stac", (512, 1024)), ("stackstac", (512, 512))],
+)
+def test_stacked_items_chunks_follow_cog_tiles(stacking_library, expected):
+    items = [make_raster_item(i, shape=(3000, 3000)) for i in range(2)]
+    with dask.config.set({"array.chunk-size": "1MiB"}):
+        ds = to_xarray(items, stacking_library=stacking_library)
+    # odc.stac keeps the uint16 of the bands, stackstac defaults to float64
+    assert ds.red.data.chunksize[-2:] == expected
@@ -0,0 +1,113 @@
+import json
+from typing import Any
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from xpystac._coalesce import (
+    CoalescingReferenceFileSystem,
+    plan_reads,
+    reference_store,
+)
+from xpystac.tracing import trace
+
+
+def _write_refs(path, n_chunks: int = 10) -> tuple[dict, np.ndarray]:
+    """Uncompressed chunks of a (n_chunks * 10, 10) array laid out back to back"""
+    data = np.arange(n_chunks * 100, dtype="<f8").reshape(n_chunks * 10, 10)
+    refs: dict[str, Any] = {
+        ".zgroup": json.dumps({"zarr_format": 2}),
+        "a/.zarray": json.dumps(
+            {
+                "shape": list(data.shape),
+                "chunks": [10, 10],
+                "dtype": "<f8",
+                "compressor": None,
+                "fill_value": None,
+                "filters": None,
+                "order": "C",
+                "zarr_format": 2,
+            }
+        ),
+        "a/.zattrs": json.dumps({"_ARRAY_DIMENSIONS": ["y", "x"]}),
+    }
+    offset = 0
+    with open(path, "wb") as f:
+        for i in range(n_chunks):
+            chunk = data[i * 10 : (i + 1) * 10].tobytes()
+            f.write(chunk)
+            refs[f"a/{i}.0"] = [str(path), offset, len(chunk)]
+            offset += len(chunk)
+    return {"version": 1, "refs": refs}, data
+
+
+def test_plan_reads_merges_ranges_per_file():
+    refs = {
+        "a/0": ["f1", 0, 100],
+        "a/1": ["f1", 100, 100],
+        "a/2": ["f1", 1000, 100],
+        "a/3": ["f2", 0, 100],
+        "a/.zarray": "{}",
+    }
+    assert plan_reads(refs, max_gap=0) == {
+        "f1": ([0, 1000], [200, 1100]),
+        "f2": ([0], [100]),
+    }
+    assert plan_reads(refs, max_gap=1000)["f1"] == ([0], [1100])
+    assert plan_reads(refs, max_gap=1000, max_block=150)["f1"] == (
+        [0, 100, 1000],
+        [100, 200, 1100],
+    )
+
+
+def test_plan_reads_reports_coalesced_requests():
+    refs = {f"a/{i}": ["f", i * 100, 100] for i in range(10)}
+    with trace() as t:
+        plan_reads(refs)
+    summary = t.summary()["plan_reads"]
+    assert summary["references"] == 10
+    assert summary["blocks"] == 1
+    assert summary["coalesced"] == 9
+
+
+def test_reference_store_reads_blocks_once(tmp_path):
+    refs, data = _write_refs(tmp_path / "data.bin")
+    store = reference_store(refs, max_block=3000)
+    ds = xr.open_dataset(store, engine="zarr", consolidated=False, chunks={})
+
+    np.testing.assert_array_equal(ds.a.values, data)
+    # 8000 bytes in blocks of at most 3000 bytes
+    assert store.fs.stats == {"blocks": 4, "requests": 4, "hits": 6}
+
+
+def test_partial_reads_are_served_from_the_block(tmp_path):
+    refs, data = _write_refs(tmp_path / "data.bin")
+    fs = CoalescingReferenceFileSystem(refs)
+
+    assert fs.cat_file("a/1.0", start=8, end=16) == data[10, 1:2].tobytes()
+    assert fs.cat_file("a/2.0") == data[20:30].tobytes()
+    assert fs.stats == {"blocks": 1, "requests": 1, "hits": 1}
+
+
+def test_failed_block_read_is_retried(tmp_path):
+    refs, data = _write_refs(tmp_path / "data.bin")
+    fs = CoalescingReferenceFileSystem(refs)
+    path = tmp_path / "data.bin"
+    content = path.read_bytes()
+    path.unlink()
+
+    with pytest.raises(Exception, match="a/0.0"):
+        fs.cat_file("a/0.0")
+    path.write_bytes(content)
+    assert fs.cat_file("a/0.0") == data[:10].tobytes()
+    assert fs.stats["requests"] == 2
+
+
+def test_block_cache_is_bounded_per_file(tmp_path):
+    refs, _ = _write_refs(tmp_path / "data.bin")
+    fs = CoalescingReferenceFileSystem(refs, max_block=800, block_cache_size=2)
+
+    for key in ["a/0.0", "a/1.0", "a/2.0", "a/0.0"]:
+        fs.cat_file(key)
+    assert fs.stats == {"blocks": 10, "requests": 4, "hits": 0}
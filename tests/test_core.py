@@ -1,10 +1,14 @@
 import dask.array
+import fsspec
+import pystac
 import pystac_client
 import pytest
 import xarray as xr
 
+from tests.factories import make_raster_item
 from tests.utils import STAC_URLS, requires_icechunk, requires_planetary_computer
-from xpystac.core import to_xarray
+from xpystac._xstac_kerchunk import _stac_to_kerchunk, _stac_to_kerchunk_combined
+from xpystac.core import to_datatree, to_xarray, to_xarray_many
 
 
 def test_to_xarray_with_cog_asset(simple_cog):
@@ -62,6 +66,50 @@ def test_to_xarray_with_pystac_client_search_with_patch_url():
     assert ds.B01.max().compute() == 11080
 
 
+class ItemSearch:
+    """Stand-in for pystac_client.ItemSearch that records how it is consumed"""
+
+    def __init__(self, items):
+        self._items = items
+        self.yielded = 0
+
+    def items(self):
+        for item in self._items:
+            self.yielded += 1
+            yield item
+
+    def item_collection(self):
+        return pystac.ItemCollection(list(self.items()))
+
+
+@pytest.mark.parametrize("stacking_library", ["odc.stac", "stackstac"])
+def test_to_xarray_with_streamed_search(stacking_library):
+    search = ItemSearch([make_raster_item(i) for i in range(5)])
+    expected = to_xarray(search, stacking_library=stacking_library)
+
+    items = search.items()
+    ds = to_xarray(items, stacking_library=stacking_library)
+    xr.testing.assert_identical(ds, expected)
+
+    ds = to_xarray(search, stacking_library=stacking_library, stream=True)
+    xr.testing.assert_identical(ds, expected)
+
+
+def test_to_xarray_with_streamed_search_is_consumed_lazily(monkeypatch):
+    import odc.stac
+
+    search = ItemSearch([make_raster_item(i) for i in range(5)])
+    load = odc.stac.load
+
+    def check_lazy(items, **kwargs):
+        assert search.yielded == 1, "only the first item should be consumed"
+        return load(items, **kwargs)
+
+    monkeypatch.setattr(odc.stac, "load", check_lazy)
+    ds = to_xarray(search, stacking_library="odc.stac", stream=True)
+    assert ds.sizes["time"] == 5
+
+
 def test_to_xarray_with_drop_variables_raises(simple_search):
     with pytest.raises(KeyError, match="not implemented for pystac items"):
         to_xarray(simple_search, drop_variables=["blue"])
@@ -165,6 +213,48 @@ def test_to_xarray_with_item_with_kerchunk_attrs_in_data_cube(data_cube_kerchunk
     assert ds
 
 
+def test_to_xarray_with_inline_kerchunk_item_collection(inline_kerchunk):
+    ds = to_xarray(inline_kerchunk)
+    assert ds.sizes == {"time": 5, "x": 4}
+    assert ds.indexes["time"].is_monotonic_increasing
+    assert ds.temperature.dims == ("time", "x")
+    assert ds.flow.dims == ("time", "x")
+    assert (ds.temperature.isel(x=0).values == [0, 1, 2, 3, 4]).all()
+    assert (ds.flow.isel(x=0).values == [0, -1, -2, -3, -4]).all()
+
+
+def test_stac_to_kerchunk_combined_matches_multi_zarr_to_zarr(inline_kerchunk):
+    from kerchunk.combine import MultiZarrToZarr
+
+    refs = MultiZarrToZarr(
+        [_stac_to_kerchunk(item) for item in inline_kerchunk], concat_dims="time"
+    ).translate()
+    expected = xr.open_dataset(
+        fsspec.filesystem("reference", fo=refs).get_mapper(),
+        engine="zarr",
+        consolidated=False,
+    )
+    refs = _stac_to_kerchunk_combined(list(inline_kerchunk), concat_dim="time")
+    actual = xr.open_dataset(
+        fsspec.filesystem("reference", fo=refs).get_mapper(),
+        engine="zarr",
+        consolidated=False,
+    )
+    xr.testing.assert_identical(actual.load(), expected.load())
+
+
+def test_stac_to_kerchunk_combined_raises_for_mismatched_items(inline_kerchunk):
+    item = inline_kerchunk.items[0]
+    item.properties["cube:variables"]["flow"]["kerchunk:zattrs"]["units"] = "m3 s-1"
+
+    with pytest.raises(ValueError, match="flow differs across items"):
+        _stac_to_kerchunk_combined(list(inline_kerchunk), concat_dim="time")
+
+    # falls back to MultiZarrToZarr
+    ds = to_xarray(inline_kerchunk)
+    assert ds.sizes == {"time": 5, "x": 4}
+
+
 @requires_icechunk
 def test_to_xarray_virtual_icechunk(virtual_icechunk):
     # Get the latest version of the collection-level asset
@@ -172,3 +262,50 @@ def test_to_xarray_virtual_icechunk(virtual_icechunk):
     asset = next(iter(assets.values()))
 
     to_xarray(asset)
+
+
+def test_to_xarray_many_collects_errors(local_collection):
+    assets = {k: a for k, a in local_collection.assets.items() if k != "thumbnail"}
+    datasets, errors = to_xarray_many(assets, max_workers=2)
+
+    assert list(datasets) == ["zarr", "references"]
+    assert (datasets["zarr"].a.values == [0, 1, 2]).all()
+    assert (datasets["references"].temperature.values == 1).all()
+    assert list(errors) == ["missing"]
+    assert isinstance(errors["missing"], FileNotFoundError)
+
+
+def test_to_xarray_many_keys_iterables_by_position(local_collection):
+    asset = local_collection.assets["zarr"]
+    datasets, errors = to_xarray_many([asset, asset.clone()])
+    assert list(datasets) == [0, 1]
+    assert not errors
+
+
+def test_to_datatree(local_collection):
+    tree = to_datatree(local_collection)
+
+    assert set(tree.children) == {"zarr", "references"}
+    assert (tree["zarr"].a.values == [0, 1, 2]).all()
+    [error] = tree.attrs["xpystac:errors"]
+    assert error.startswith("missing: FileNotFoundError")
+
+
+def test_to_datatree_with_many_collections(local_collection):
+    other = local_collection.clone()
+    other.id = "other"
+
+    tree = to_datatree([local_collection, other])
+
+    assert set(tree.children) == {"local", "other"}
+    assert set(tree["other"].children) == {"zarr", "references"}
+    errors = tree.attrs["xpystac:errors"]
+    assert [e.split(":")[0] for e in errors] == ["local/missing", "other/missing"]
+
+
+def test_to_datatree_without_errors(local_collection):
+    del local_collection.assets["missing"]
+
+    tree = to_datatree(local_collection)
+
+    assert "xpystac:errors" not in tree.attrs
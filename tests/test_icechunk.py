@@ -0,0 +1,237 @@
+import threading
+
+import numpy as np
+import pystac
+import pytest
+import xarray as xr
+
+from tests.utils import requires_icechunk
+
+pytestmark = requires_icechunk
+
+
+@pytest.fixture
+def local_icechunk(tmp_path, monkeypatch):
+    """Collection with an icechunk asset backed by a repository on local disk.
+
+    The repository has a ``v1`` tag and two commits on ``main``.
+    """
+    import icechunk
+
+    repo = icechunk.Repository.create(
+        icechunk.local_filesystem_storage(str(tmp_path / "repo"))
+    )
+    for value in [1, 2]:
+        session = repo.writable_session("main")
+        ds = xr.Dataset({"a": ("x", np.full(3, value))})
+        ds.to_zarr(session.store, zarr_format=3, consolidated=False, mode="w")
+        snapshot_id = session.commit(f"write {value}")
+        if value == 1:
+            repo.create_tag("v1", snapshot_id)
+
+    opened = []
+
+    def s3_storage(bucket, prefix, **kwargs):
+        return icechunk.local_filesystem_storage(str(tmp_path / prefix))
+
+    original_open = icechunk.Repository.open
+
+    def open_repository(*args, **kwargs):
+        opened.append(threading.get_ident())
+        return original_open(*args, **kwargs)
+
+    monkeypatch.setattr(icechunk, "s3_storage", s3_storage)
+    monkeypatch.setattr(icechunk.Repository, "open", staticmethod(open_repository))
+
+    collection = pystac.Collection(
+        id="local-icechunk",
+        description="local icechunk repository",
+        extent=pystac.Extent(
+            pystac.SpatialExtent([[-180, -90, 180, 90]]),
+            pystac.TemporalExtent([[None, None]]),
+        ),
+        extra_fields={
+            "storage:schemes": {
+                "local": {"type": "aws-s3", "bucket": "bucket", "region": "local"}
+            }
+        },
+    )
+    collection.add_asset(
+        "store",
+        pystac.Asset(
+            "s3://bucket/repo",
+            media_type="application/vnd.zarr+icechunk",
+            roles=["data"],
+            extra_fields={"storage:refs": ["local"]},
+        ),
+    )
+    collection.opened = opened
+    collection.root = str(tmp_path / "repo")
+
+    from xpystac._icechunk import clear_icechunk_cache
+
+    clear_icechunk_cache()
+    yield collection
+    clear_icechunk_cache()
+
+
+def _asset_at(collection, version=None):
+    asset = collection.assets["store"].clone()
+    asset.set_owner(collection)
+    if version is not None:
+        asset.extra_fields["version"] = version
+    return asset
+
+
+def test_read_icechunk_pools_repositories(local_icechunk):
+    from xpystac._icechunk import read_icechunk
+
+    for _ in range(3):
+        ds = read_icechunk(_asset_at(local_icechunk))
+        assert (ds.a.values == 2).all()
+
+    assert len(local_icechunk.opened) == 1
+
+
+def test_read_icechunk_resolves_versions(local_icechunk):
+    from xpystac._icechunk import read_icechunk
+
+    assert (read_icechunk(_asset_at(local_icechunk, "v1")).a.values == 1).all()
+    assert (read_icechunk(_asset_at(local_icechunk, "main")).a.values == 2).all()
+
+
+def test_read_icechunk_memoizes_version_resolution(local_icechunk, monkeypatch):
+    import icechunk
+
+    from xpystac._icechunk import read_icechunk
+
+    read_icechunk(_asset_at(local_icechunk, "v1"))
+
+    def fail(self):
+        raise AssertionError("versions should be memoized")
+
+    monkeypatch.setattr(icechunk.Repository, "list_branches", fail)
+    monkeypatch.setattr(icechunk.Repository, "list_tags", fail)
+    assert (read_icechunk(_asset_at(local_icechunk, "v1")).a.values == 1).all()
+
+
+def test_clear_icechunk_cache(local_icechunk):
+    from xpystac._icechunk import clear_icechunk_cache, read_icechunk
+
+    read_icechunk(_asset_at(local_icechunk))
+    clear_icechunk_cache()
+    read_icechunk(_asset_at(local_icechunk))
+
+    assert len(local_icechunk.opened) == 2
+
+
+def test_read_icechunk_shares_in_flight_open(local_icechunk):
+    from xpystac._icechunk import read_icechunk
+
+    barrier = threading.Barrier(8)
+    results = []
+
+    def read():
+        barrier.wait()
+        results.append(read_icechunk(_asset_at(local_icechunk)))
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == 8
+    assert len(local_icechunk.opened) == 1
+
+
+def test_read_icechunk_versions(local_icechunk):
+    from xpystac._icechunk import read_icechunk_versions
+
+    datasets = read_icechunk_versions(
+        _asset_at(local_icechunk), ["v1", "main", "v1"], max_workers=2
+    )
+
+    assert list(datasets) == ["v1", "main"]
+    assert (datasets["v1"].a.values == 1).all()
+    assert (datasets["main"].a.values == 2).all()
+    assert len(local_icechunk.opened) == 1
+
+
+def test_read_icechunk_versions_shares_snapshots(local_icechunk):
+    import icechunk
+
+    from xpystac._icechunk import read_icechunk_versions
+
+    repo = icechunk.Repository.open(
+        icechunk.local_filesystem_storage(local_icechunk.root)
+    )
+    snapshot_id = repo.lookup_tag("v1")
+    datasets = read_icechunk_versions(_asset_at(local_icechunk), ["v1", snapshot_id])
+
+    assert datasets["v1"] is datasets[snapshot_id]
+
+
+def test_open_icechunk_versions(local_icechunk):
+    from xpystac.core import open_icechunk_versions
+
+    ds = open_icechunk_versions(local_icechunk, ["v1", "main"])
+
+    assert ds.sizes == {"version": 2, "x": 3}
+    assert list(ds.version.values) == ["v1", "main"]
+    assert (ds.a.sel(version="v1").values == 1).all()
+
+
+def test_open_icechunk_versions_defaults_to_sibling_assets(local_icechunk):
+    from xpystac.core import open_icechunk_versions
+
+    for key, version in [("store@v1", "v1"), ("store@main", "main")]:
+        asset = _asset_at(local_icechunk, version)
+        asset.roles = ["data", "latest-version"] if version == "main" else ["data"]
+        local_icechunk.add_asset(key, asset)
+
+    datasets = open_icechunk_versions(local_icechunk, concat_dim=None)
+    assert set(datasets) == {"main", "v1"}
+
+
+@pytest.mark.parametrize("scheme", ["", "file://"])
+def test_read_icechunk_from_local_path(local_icechunk, scheme):
+    from xpystac.core import to_xarray
+
+    asset = pystac.Asset(
+        f"{scheme}{local_icechunk.root}",
+        media_type="application/vnd.zarr+icechunk",
+        extra_fields={"version": "v1"},
+    )
+    assert (to_xarray(asset).a.values == 1).all()
+
+
+def test_aread_icechunk_shares_pool(local_icechunk):
+    import asyncio
+
+    from xpystac._icechunk import aread_icechunk, read_icechunk
+    from xpystac.core import ato_xarray_many
+
+    async def main():
+        return await ato_xarray_many(
+            [_asset_at(local_icechunk, v) for v in ["v1", "main", "v1"]]
+        )
+
+    v1, main, v1_again = asyncio.run(main())
+    assert (v1.a.values == 1).all()
+    assert (main.a.values == 2).all()
+    assert (v1_again.a.values == 1).all()
+    # the synchronous reader reuses the repository opened asynchronously
+    assert (read_icechunk(_asset_at(local_icechunk, "v1")).a.values == 1).all()
+    assert local_icechunk.opened == []
+    assert asyncio.run(aread_icechunk(_asset_at(local_icechunk))).a.values[0] == 2
+
+
+def test_plan_open_pins_the_snapshot(local_icechunk):
+    import pickle
+
+    from xpystac.core import plan_open
+
+    plan = pickle.loads(pickle.dumps(plan_open(_asset_at(local_icechunk, "main"))))
+    assert plan.kind == "icechunk"
+    assert (plan.open().a.values == 2).all()
@@ -0,0 +1,137 @@
+import os
+import warnings
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pystac
+import pytest
+import xarray as xr
+
+from xpystac._mmap import open_geotiff, open_zarr
+from xpystac.core import plan_open, to_xarray
+
+
+def _write_store(path, zarr_format: int, compressed: bool = False) -> str:
+    ds = xr.Dataset(
+        {
+            "t": (("time", "y", "x"), np.random.rand(3, 50, 60).astype("float32")),
+            "i": (
+                ("y", "x"),
+                np.arange(3000, dtype="int16").reshape(50, 60),
+                {"scale_factor": 0.5, "_FillValue": -1},
+            ),
+        },
+        coords={
+            "time": pd.date_range("2020-01-01", periods=3),
+            "y": np.arange(50.0),
+            "x": np.arange(60.0),
+        },
+    )
+    encoding: dict[str, dict[str, Any]] = {
+        "t": {"chunks": (1, 20, 20)},
+        "i": {"chunks": (20, 20)},
+    }
+    if not compressed:
+        encoding["t"]["compressors"] = None
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        ds.to_zarr(path, zarr_format=zarr_format, encoding=encoding)
+    return str(path)
+
+
+def _write_geotiff(path, count: int = 2, **profile) -> str:
+    rasterio = pytest.importorskip("rasterio")
+    from rasterio.transform import from_origin
+
+    data = np.arange(count * 600 * 700, dtype="uint16").reshape(count, 600, 700)
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        width=700,
+        height=600,
+        count=count,
+        dtype="uint16",
+        crs="EPSG:32613",
+        transform=from_origin(300_000.0, 4_000_000.0, 10.0, 10.0),
+        nodata=0,
+        **profile,
+    ) as dst:
+        dst.write(data)
+    return str(path)
+
+
+@pytest.mark.parametrize("zarr_format", [2, 3])
+def test_open_zarr_matches_zarr_engine(tmp_path, zarr_format):
+    href = _write_store(tmp_path / "store.zarr", zarr_format)
+    asset = pystac.Asset(href, media_type="application/vnd+zarr")
+
+    expected = to_xarray(asset)
+    actual = to_xarray(asset, mmap=True)
+
+    xr.testing.assert_identical(actual, expected)
+    assert actual.t.chunks == expected.t.chunks
+    # only the uncompressed variable is mapped
+    assert all(k[0].startswith("mmap-") for k in actual.t.data.__dask_keys__()[0][0])
+    assert not str(actual.i.data.name).startswith("mmap-")
+
+
+def test_open_plan_of_store_that_can_no_longer_be_mapped(tmp_path):
+    import shutil
+
+    href = _write_store(tmp_path / "store.zarr", 3)
+    plan = plan_open(pystac.Asset(href, media_type="application/vnd+zarr"), mmap=True)
+    assert plan.kind == "mmap"
+
+    shutil.rmtree(href)
+    _write_store(href, 3, compressed=True)
+    with pytest.raises(ValueError, match="can no longer be memory-mapped"):
+        plan.open()
+
+
+def test_open_zarr_fills_missing_chunks(tmp_path):
+    href = _write_store(tmp_path / "store.zarr", 3)
+    os.remove(os.path.join(href, "t", "c", "0", "0", "0"))
+
+    ds = open_zarr(href, engine="zarr")
+    assert np.isnan(ds.t[0, :20, :20]).all()
+    assert not np.isnan(ds.t[1]).any()
+
+
+def test_open_zarr_returns_none_when_nothing_can_be_mapped(tmp_path):
+    href = _write_store(tmp_path / "store.zarr", 3, compressed=True)
+    assert open_zarr(href, engine="zarr") is None
+
+
+@pytest.mark.parametrize(
+    "profile",
+    [
+        {"tiled": True, "blockxsize": 256, "blockysize": 256},
+        {"tiled": True, "blockxsize": 256, "blockysize": 256, "interleave": "band"},
+        {"tiled": False},
+    ],
+    ids=["pixel-interleaved", "band-interleaved", "stripped"],
+)
+def test_open_geotiff_matches_rasterio_engine(tmp_path, profile):
+    href = _write_geotiff(tmp_path / "image.tif", **profile)
+    asset = pystac.Asset(f"file://{href}", media_type=pystac.MediaType.COG)
+
+    expected = to_xarray(asset)
+    actual = to_xarray(asset, mmap=True)
+
+    xr.testing.assert_equal(actual.band_data, expected.band_data)
+    assert actual.band_data.dtype == expected.band_data.dtype
+    assert actual.band_data.encoding["_FillValue"] == 0
+    assert actual.band_data.chunks == expected.band_data.chunks
+    if profile["tiled"]:
+        blocks = to_xarray(asset, mmap=True, chunks={}).band_data.chunks
+        assert blocks[1:] == ((256, 256, 88), (256, 256, 188))
+
+
+def test_open_geotiff_returns_none_for_compressed_files(tmp_path):
+    href = _write_geotiff(tmp_path / "image.tif", compress="deflate")
+    assert open_geotiff(href) is None
+
+    asset = pystac.Asset(href, media_type=pystac.MediaType.COG)
+    assert to_xarray(asset, mmap=True).band_data.shape == (2, 600, 700)
@@ -0,0 +1,105 @@
+import pickle
+
+import dask
+import numpy as np
+import pystac
+import pytest
+import xarray as xr
+
+from tests.factories import make_kerchunk_item, make_raster_item
+from tests.test_stores import _store_item
+from xpystac.core import plan_open, to_xarray
+from xpystac.plan import OpenPlan
+from xpystac.xarray_plugin import STACBackend
+
+
+@pytest.fixture
+def zarr_asset(tmp_path):
+    ds = xr.Dataset({"t": (("y", "x"), np.arange(12.0).reshape(3, 4))})
+    ds.to_zarr(tmp_path / "store.zarr")
+    return pystac.Asset(str(tmp_path / "store.zarr"), media_type="application/vnd+zarr")
+
+
+def test_plan_open_asset_round_trips(zarr_asset, tmp_path):
+    plan = plan_open(zarr_asset)
+    assert plan.kind == "asset"
+
+    plan.save(tmp_path / "asset.plan")
+    loaded = OpenPlan.load(tmp_path / "asset.plan")
+    xr.testing.assert_identical(loaded.open(), to_xarray(zarr_asset))
+    backend = STACBackend()
+    assert backend.guess_can_open(loaded)
+    xr.testing.assert_identical(backend.open_dataset(loaded), loaded.open())
+
+
+def test_plan_open_kerchunk_items():
+    items = [make_kerchunk_item(i) for i in range(3)]
+    plan = pickle.loads(pickle.dumps(plan_open(items)))
+
+    assert plan.kind == "item_references"
+    xr.testing.assert_identical(plan.open(), to_xarray(items))
+
+
+def test_plan_open_store_items(tmp_path):
+    items = [_store_item(tmp_path, i) for i in [1, 0]]
+    plan = pickle.loads(pickle.dumps(plan_open(items)))
+
+    assert plan.kind == "stores"
+    assert [p.kind for p in plan.spec["plans"]] == ["asset", "asset"]
+    xr.testing.assert_identical(plan.open(), to_xarray(items))
+
+
+@pytest.mark.parametrize("stacking_library", ["odc.stac", "stackstac"])
+def test_plan_open_raster_items_signs_once(stacking_library):
+    items = [make_raster_item(i) for i in range(2)]
+    signed = []
+
+    def patch_url(href):
+        signed.append(href)
+        return href + "?token=1"
+
+    plan = plan_open(items, stacking_library=stacking_library, patch_url=patch_url)
+    plan = pickle.loads(pickle.dumps(plan))
+    assert len(signed) == 4
+
+    # --- Lazy, the COGs of the test items do not exist
+    ds = plan.open()
+    expected = to_xarray(items, stacking_library=stacking_library)
+    xr.testing.assert_identical(ds.coords.to_dataset(), expected.coords.to_dataset())
+    assert ds.red.chunks == expected.red.chunks
+    assert len(signed) == 4
+    assert all(
+        asset["href"].endswith("?token=1")
+        for item in plan.spec["items"]
+        for asset in item["assets"].values()
+    )
+
+
+def test_plan_keeps_the_chunk_size(tmp_path):
+    ds = xr.Dataset({"t": (("y", "x"), np.arange(12.0).reshape(3, 4))})
+    ds.to_zarr(tmp_path / "store.zarr", encoding={"t": {"chunks": (1, 4)}})
+    asset = pystac.Asset(
+        str(tmp_path / "store.zarr"), media_type="application/vnd+zarr"
+    )
+
+    with dask.config.set({"array.chunk-size": "64B"}):
+        plan = plan_open(asset)
+    assert plan.open().t.chunks == ((2, 1), (4,))
+    assert to_xarray(asset).t.chunks == ((3,), (4,))
+
+
+def test_plan_open_raises_for_unplannable_objects():
+    items = [make_raster_item(i) for i in range(2)]
+    with pytest.raises(ValueError, match="cannot be planned"):
+        plan_open(items, metadata_only=True)
+
+
+def test_open_plan_rejects_kwargs(zarr_asset):
+    with pytest.raises(TypeError, match="chunks"):
+        to_xarray(plan_open(zarr_asset), chunks={})
+
+
+def test_open_plan_load_checks_the_type(tmp_path):
+    OpenPlan.save(["not", "a", "plan"], tmp_path / "list.plan")
+    with pytest.raises(TypeError, match="OpenPlan"):
+        OpenPlan.load(tmp_path / "list.plan")
@@ -0,0 +1,121 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from tests.factories import make_raster_item
+from xpystac._prefilter import ItemIndex, _time_range, prefilter_items
+from xpystac.core import to_xarray
+from xpystac.tracing import trace
+
+
+@pytest.fixture
+def tiled_items():
+    # 4 tiles side by side, 3 days each
+    return [
+        make_raster_item(day, origin=(500_000.0 + tile * 2560, 4_000_000.0))
+        for tile in range(4)
+        for day in range(3)
+    ]
+
+
+def test_time_range():
+    assert _time_range("2023-01") == (
+        np.datetime64("2023-01-01T00:00:00"),
+        np.datetime64("2023-01-31T23:59:59.999999999"),
+    )
+    start, end = _time_range("2023-01-02/..")
+    assert start == np.datetime64("2023-01-02")
+    assert end > np.datetime64("2200-01-01")
+    assert _time_range(
+        (
+            datetime.datetime(
+                2023, 1, 2, 1, tzinfo=datetime.timezone(datetime.timedelta(hours=1))
+            ),
+            "2023-01-03",
+        )
+    ) == (np.datetime64("2023-01-02T00:00"), np.datetime64("2023-01-03"))
+
+
+def test_item_index_query_by_bbox_and_time(tiled_items):
+    index = ItemIndex(tiled_items)
+    tile_1 = tiled_items[3].bbox
+
+    assert len(index.query()) == 12
+    indices = index.query(bbox=tile_1)
+    # the neighbouring tiles share an edge with tile 1
+    assert indices.tolist() == list(range(9))
+    bbox = [(tile_1[0] + tile_1[2]) / 2, tile_1[1], tile_1[2] - 1e-4, tile_1[3]]
+    assert index.query(bbox=bbox).tolist() == [3, 4, 5]
+    assert index.query(bbox=bbox, time="2023-01-02").tolist() == [4]
+
+
+def test_item_index_query_by_geometry(tiled_items):
+    shapely = pytest.importorskip("shapely")
+    index = ItemIndex(tiled_items)
+    geometry = shapely.geometry.shape(tiled_items[6].geometry).centroid
+
+    assert index.query(geometry=geometry, time=("2023-01-02", None)).tolist() == [7, 8]
+
+
+def test_item_index_handles_antimeridian_and_missing_bboxes(tiled_items):
+    items = tiled_items[:3]
+    items[0].bbox = [179.0, 0.0, -179.0, 1.0]
+    items[1].bbox = None
+    index = ItemIndex(items)
+
+    assert index.query(bbox=[-179.5, 0.0, -179.2, 1.0]).tolist() == [0, 1]
+
+
+def test_duplicates_keep_the_last_updated_item(tiled_items):
+    items = tiled_items[:3] + [make_raster_item(1), make_raster_item(1)]
+    items[1].properties["updated"] = "2023-02-01T00:00:00Z"
+    items[3].properties["updated"] = "2023-03-01T00:00:00Z"
+    index = ItemIndex(items)
+
+    duplicated = index.duplicates(np.arange(5))
+    assert duplicated.tolist() == [False, True, False, False, True]
+
+
+def test_prefilter_items_reports_stats(tiled_items):
+    bbox = tiled_items[3].bbox
+    inner = [(bbox[0] + bbox[2]) / 2, bbox[1], bbox[2] - 1e-4, bbox[3]]
+    items = tiled_items + [make_raster_item(13, origin=(502_560.0, 4_000_000.0))]
+    items[-1].datetime = items[4].datetime
+
+    with trace() as t:
+        kept, kwargs = prefilter_items(items, {"bbox": inner, "time": "2023-01"})
+    assert [i.bbox for i in kept] == [bbox] * 3
+    assert kwargs == {"bbox": inner}
+    assert {k: v for k, v in t.summary()["prefilter"].items() if k != "seconds"} == {
+        "count": 1,
+        "n_items": 13,
+        "kept": 3,
+        "dropped": 9,
+        "duplicates": 1,
+    }
+
+
+@pytest.mark.parametrize("stacking_library", ["odc.stac", "stackstac"])
+def test_to_xarray_prefilter(tiled_items, stacking_library):
+    bbox = tiled_items[3].bbox
+    inner = [(bbox[0] + bbox[2]) / 2, bbox[1], bbox[2] - 1e-4, bbox[3]]
+    region = (
+        {"bbox": inner} if stacking_library == "odc.stac" else {"bounds_latlon": inner}
+    )
+
+    expected = to_xarray(tiled_items[3:6], stacking_library=stacking_library, **region)
+    actual = to_xarray(
+        tiled_items,
+        stacking_library=stacking_library,
+        prefilter=True,
+        time=("2023-01-01", "2023-01-03"),
+        **region,
+    )
+    assert actual.sizes == expected.sizes
+    np.testing.assert_array_equal(actual.time, expected.time)
+
+
+def test_to_xarray_prefilter_raises_when_no_items_are_left(tiled_items):
+    with pytest.raises(ValueError, match="prefiltering by {'time': '2020'}"):
+        to_xarray(tiled_items, prefilter=True, time="2020")
@@ -0,0 +1,149 @@
+import asyncio
+import gzip
+import json
+
+import pystac
+import pytest
+import xarray as xr
+
+import xpystac.core
+from tests.factories import make_kerchunk_item
+from xpystac._references import (
+    _get_session,
+    aload_references,
+    load_references,
+)
+from xpystac._xstac_kerchunk import _stac_to_kerchunk
+from xpystac.core import (
+    ato_xarray,
+    ato_xarray_many,
+    open_reference_assets,
+    to_xarray,
+)
+
+
+def _reference_asset(href: str) -> pystac.Asset:
+    return pystac.Asset(href, media_type=pystac.MediaType.JSON, roles=["references"])
+
+
+@pytest.fixture
+def references(http_server):
+    for i in range(4):
+        refs = json.dumps(_stac_to_kerchunk(make_kerchunk_item(i))).encode()
+        http_server.routes[f"/{i}.json"] = (refs, {})
+        http_server.routes[f"/{i}.json.gz"] = (
+            gzip.compress(refs),
+            {"Content-Encoding": "gzip"},
+        )
+    return http_server
+
+
+def test_load_references(references):
+    refs = load_references(f"{references.url}/0.json")
+    assert refs["version"] == 1
+    assert "temperature/.zarray" in refs["refs"]
+
+
+def test_load_references_decodes_gzip(references):
+    refs = load_references(f"{references.url}/1.json.gz")
+    assert refs == load_references(f"{references.url}/1.json")
+
+
+def test_load_references_raises_for_missing_file(references):
+    with pytest.raises(Exception, match="404"):
+        load_references(f"{references.url}/missing.json")
+
+
+def test_load_references_reuses_connections(references):
+    assert _get_session() is _get_session()
+    for i in range(4):
+        load_references(f"{references.url}/{i}.json")
+
+    clients = {client for _, client in references.requests}
+    assert len(clients) < len(references.requests)
+
+
+def test_load_references_from_local_file(tmp_path):
+    path = tmp_path / "refs.json.gz"
+    refs = _stac_to_kerchunk(make_kerchunk_item(0))
+    path.write_bytes(gzip.compress(json.dumps(refs).encode()))
+
+    assert load_references(str(path)) == refs
+
+
+def test_aload_references(references):
+    async def main():
+        return await asyncio.gather(
+            *[aload_references(f"{references.url}/{i}.json.gz") for i in range(4)]
+        )
+
+    assert asyncio.run(main()) == [
+        load_references(f"{references.url}/{i}.json") for i in range(4)
+    ]
+
+
+def test_to_xarray_with_reference_asset(references):
+    ds = to_xarray(_reference_asset(f"{references.url}/2.json"))
+    assert (ds.temperature.values == 2).all()
+
+
+def test_open_reference_assets(references):
+    assets = [_reference_asset(f"{references.url}/{i}.json") for i in range(4)]
+    datasets = open_reference_assets(assets, max_workers=2)
+
+    assert [int(ds.temperature.values.max()) for ds in datasets] == [0, 1, 2, 3]
+
+
+def test_open_reference_assets_raises_for_other_assets(references):
+    with pytest.raises(ValueError, match="not a kerchunk reference asset"):
+        open_reference_assets([pystac.Asset(f"{references.url}/0.json")])
+
+
+def test_ato_xarray_with_reference_asset(references):
+    ds = asyncio.run(ato_xarray(_reference_asset(f"{references.url}/2.json")))
+    assert (ds.temperature.values == 2).all()
+
+
+def test_ato_xarray_many_respects_limit(monkeypatch):
+    entered = []
+
+    async def main():
+        release = asyncio.Event()
+
+        async def held_open(obj, **kwargs):
+            entered.append(obj)
+            await release.wait()
+            return obj
+
+        monkeypatch.setattr(xpystac.core, "ato_xarray", held_open)
+        task = asyncio.ensure_future(ato_xarray_many(range(12), limit=3))
+        # --- Let every open that the limit allows start and block
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert entered == [0, 1, 2]
+        release.set()
+        return await task
+
+    assert asyncio.run(main()) == list(range(12))
+
+
+def test_ato_xarray_many_return_exceptions(references, inline_kerchunk):
+    objs = [
+        _reference_asset(f"{references.url}/0.json"),
+        _reference_asset(f"{references.url}/missing.json"),
+        inline_kerchunk,
+    ]
+    ds, error, cube = asyncio.run(ato_xarray_many(objs, return_exceptions=True))
+
+    assert (ds.temperature.values == 0).all()
+    assert isinstance(error, Exception)
+    assert cube.sizes["time"] == 5
+
+
+@pytest.mark.parametrize("kwargs", [{"metadata_only": True}, {"mmap": True}])
+def test_ato_xarray_accepts_the_kwargs_of_to_xarray(references, kwargs):
+    asset = _reference_asset(f"{references.url}/1.json")
+
+    ds = asyncio.run(ato_xarray(asset, **kwargs))
+
+    xr.testing.assert_identical(ds, to_xarray(asset, **kwargs))
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from tests.factories import make_kerchunk_item, make_raster_item
+from tests.test_stores import _store_item
+from xpystac.core import refresh, to_xarray
+from xpystac.tracing import trace
+
+
+@pytest.mark.parametrize("stacking_library", ["odc.stac", "stackstac"])
+def test_refresh_stacks_only_the_new_items(stacking_library):
+    items = [make_raster_item(i) for i in range(5)]
+    ds = to_xarray(items[:3], stacking_library=stacking_library)
+
+    with trace() as t:
+        refreshed = refresh(ds, items[2:])
+
+    (stage,) = [s for s in t.stages if s.name == "refresh"]
+    assert stage.attrs == {"reader": stacking_library, "n_items": 3}
+    assert t.summary()["append"]["n_steps"] == 2
+
+    # --- Lazy, the COGs of the test items do not exist
+    expected = to_xarray(items, stacking_library=stacking_library)
+    xr.testing.assert_identical(
+        refreshed.coords.to_dataset(), expected.coords.to_dataset()
+    )
+    assert refreshed.red.chunks == expected.red.chunks
+    assert refreshed.red.dtype == expected.red.dtype
+
+
+def test_refresh_appends_new_tiles_of_existing_times():
+    items = [make_raster_item(i) for i in range(2)]
+    tile = make_raster_item(1, origin=(501_280.0, 4_000_000.0))
+    tile.id = "item-1-east"
+    ds = to_xarray(items, stacking_library="stackstac")
+
+    with trace() as t:
+        refreshed = refresh(ds, [items[1], tile])
+
+    assert t.summary()["append"]["n_steps"] == 1
+    assert list(refreshed.id.values) == ["item-0", "item-1", "item-1-east"]
+
+
+def test_refresh_keeps_the_grid_of_the_dataset():
+    items = [make_raster_item(i) for i in range(2)]
+    items.append(make_raster_item(2, origin=(501_000.0, 4_000_000.0)))
+    ds = to_xarray(items[:2], stacking_library="odc.stac")
+
+    refreshed = refresh(ds, items[2:])
+
+    assert refreshed.sizes == {"time": 3, "y": 256, "x": 256}
+    xr.testing.assert_identical(refreshed.x, ds.x)
+
+
+def test_refresh_kerchunk_items():
+    items = [make_kerchunk_item(i) for i in range(5)]
+    ds = to_xarray(items[:3])
+
+    refreshed = refresh(ds, items[3:])
+
+    xr.testing.assert_identical(refreshed, to_xarray(items))
+
+
+def test_refresh_store_items(tmp_path):
+    items = [_store_item(tmp_path, i) for i in range(4)]
+    ds = to_xarray(items[:2])
+
+    refreshed = refresh(ds, items[3:] + items[:1])
+
+    assert refreshed.t.chunks == ((1, 1, 1), (3,), (4,))
+    np.testing.assert_array_equal(refreshed.t[:, 0, 0], [0, 1, 3])
+
+
+def test_refresh_without_new_items_returns_the_dataset(tmp_path):
+    items = [_store_item(tmp_path, i) for i in range(2)]
+    ds = to_xarray(items)
+
+    assert refresh(ds, []) is ds
+    assert refresh(ds, items[1]) is ds
+
+
+def test_refresh_raises_for_other_grids(tmp_path):
+    items = [_store_item(tmp_path, i) for i in range(3)]
+    xr.Dataset(
+        {"t": (("y", "x"), np.zeros((3, 5), dtype="float32"))},
+        coords={"y": np.arange(3.0), "x": np.arange(5.0)},
+    ).to_zarr(items[2].assets["zarr"].href, mode="w")
+    ds = to_xarray(items[:2])
+
+    with pytest.raises(ValueError, match="sizes"):
+        refresh(ds, items[2:])
@@ -0,0 +1,151 @@
+import json
+
+import numpy as np
+import pystac
+import pytest
+import xarray as xr
+
+from tests.factories import make_kerchunk_item
+from tests.test_stores import _store_item
+from xpystac._xstac_kerchunk import _stac_to_kerchunk
+from xpystac.core import list_representations, to_xarray
+from xpystac.tracing import trace
+
+
+def _collection() -> pystac.Collection:
+    return pystac.Collection(
+        id="representations",
+        description="the same data in several representations",
+        extent=pystac.Extent(
+            pystac.SpatialExtent([[-180, -90, 180, 90]]),
+            pystac.TemporalExtent([[None, None]]),
+        ),
+    )
+
+
+@pytest.fixture
+def collection(tmp_path):
+    collection = _collection()
+    refs = _stac_to_kerchunk(make_kerchunk_item(0))
+    (tmp_path / "refs.json").write_text(json.dumps(refs))
+    xr.Dataset({"t": ("x", np.arange(4.0))}).to_zarr(tmp_path / "store.zarr")
+
+    zarr = "application/vnd+zarr"
+    assets = {
+        "thumbnail": pystac.Asset("thumb.png", media_type=pystac.MediaType.PNG),
+        "overview": pystac.Asset("overview.tif", media_type=pystac.MediaType.COG),
+        "refs": pystac.Asset(
+            str(tmp_path / "refs.json"),
+            media_type=pystac.MediaType.JSON,
+            roles=["references"],
+        ),
+        "unconsolidated": pystac.Asset(
+            str(tmp_path / "store.zarr"),
+            media_type=zarr,
+            extra_fields={"xarray:open_kwargs": {"consolidated": False}},
+        ),
+        "unconsolidated-field": pystac.Asset(
+            str(tmp_path / "store.zarr"),
+            media_type=zarr,
+            extra_fields={"zarr:consolidated": False},
+        ),
+        "mirror": pystac.Asset(str(tmp_path / "store.zarr"), media_type=zarr),
+        "store": pystac.Asset(
+            str(tmp_path / "store.zarr"), media_type=zarr, roles=["data"]
+        ),
+    }
+    for key, asset in assets.items():
+        collection.add_asset(key, asset)
+    return collection
+
+
+def test_list_representations_ranks_by_kind_and_role(collection):
+    representations = list_representations(collection)
+
+    assert [(r.kind, r.key) for r in representations] == [
+        ("zarr", "store"),
+        ("zarr", "mirror"),
+        ("kerchunk", "refs"),
+        ("zarr-unconsolidated", "unconsolidated"),
+        ("zarr-unconsolidated", "unconsolidated-field"),
+    ]
+
+
+def test_to_xarray_opens_the_cheapest_representation(collection):
+    with trace() as t:
+        ds = to_xarray(collection)
+
+    assert ds.attrs["xpystac:representation"] == "store"
+    assert ds.attrs["xpystac:reason"].startswith("consolidated zarr")
+    (stage,) = [s for s in t.stages if s.name == "open_representation"]
+    assert stage.attrs == {"kind": "zarr", "key": "store"}
+
+    ds = to_xarray(collection, asset_key="refs")
+    assert ds.attrs["xpystac:representation"] == "refs"
+    assert (ds.temperature.values == 0).all()
+
+
+def test_to_xarray_skips_representations_missing_a_dependency(collection, monkeypatch):
+    import xpystac._icechunk
+
+    def read_icechunk(asset):
+        raise ImportError("Missing optional dependency 'icechunk'")
+
+    monkeypatch.setattr(xpystac._icechunk, "read_icechunk", read_icechunk)
+    del collection.assets["store"]
+    del collection.assets["mirror"]
+    collection.add_asset(
+        "icechunk",
+        pystac.Asset("s3://bucket/repo", media_type="application/vnd.zarr+icechunk"),
+    )
+
+    ds = to_xarray(collection)
+
+    assert ds.attrs["xpystac:representation"] == "refs"
+    assert "skipped icechunk" in ds.attrs["xpystac:reason"]
+
+
+def test_to_xarray_skips_representations_that_fail_to_open(collection, tmp_path):
+    collection.assets["store"].href = str(tmp_path / "missing.zarr")
+
+    ds = to_xarray(collection)
+
+    assert ds.attrs["xpystac:representation"] == "mirror"
+    assert "skipped zarr (FileNotFoundError" in ds.attrs["xpystac:reason"]
+
+    for key in ["mirror", "refs", "unconsolidated", "unconsolidated-field"]:
+        collection.assets[key].href = str(tmp_path / "missing.zarr")
+    with pytest.raises(ValueError, match="none of the representations") as e:
+        to_xarray(collection)
+    assert str(e.value).count("FileNotFoundError") == 5
+
+
+def test_to_xarray_stacks_the_items_of_a_collection(tmp_path):
+    collection = _collection()
+    collection.add_items([_store_item(tmp_path, i) for i in range(3)])
+
+    ds = to_xarray(collection)
+
+    assert ds.attrs["xpystac:representation"] == "items"
+    assert ds.sizes["time"] == 3
+
+
+def test_to_xarray_raises_without_representations(collection, tmp_path):
+    with pytest.raises(KeyError, match="thumbnail"):
+        to_xarray(collection, asset_key="thumbnail")
+
+    empty = _collection()
+    with pytest.raises(ValueError, match="neither"):
+        to_xarray(empty)
+
+    # --- a link to an API that has no items is not a representation
+    empty.add_link(pystac.Link("items", "https://example.com/items"))
+    assert list_representations(empty) == []
+    with pytest.raises(ValueError, match="neither"):
+        to_xarray(empty)
+
+    # --- item links are only followed when the items are opened
+    empty.add_link(pystac.Link("item", str(tmp_path / "missing.json")))
+    assert [r.kind for r in list_representations(empty)] == ["items"]
+    with pytest.raises(FileNotFoundError):
+        to_xarray(empty)
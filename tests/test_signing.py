@@ -0,0 +1,126 @@
+import datetime
+
+import pytest
+
+from tests.factories import make_raster_item
+from xpystac.core import to_xarray
+from xpystac.signing import Signer, Token, container_of
+
+
+class StubSigner:
+    """Batch signer handing out numbered tokens valid for ``valid_for``"""
+
+    def __init__(self, valid_for=datetime.timedelta(hours=1), naive=False):
+        self.valid_for = valid_for
+        self.naive = naive
+        self.calls: list[list[str]] = []
+
+    def __call__(self, containers):
+        self.calls.append(containers)
+        expiry = datetime.datetime.now(datetime.timezone.utc) + self.valid_for
+        if self.naive:
+            expiry = expiry.replace(tzinfo=None)
+        return {c: Token(f"token={len(self.calls)}", expiry) for c in containers}
+
+
+def _remote_items(n: int, n_containers: int = 3):
+    items = [make_raster_item(i) for i in range(n)]
+    for item in items:
+        for key, asset in item.assets.items():
+            container = int(item.id.split("-")[1]) % n_containers
+            asset.href = f"https://account.blob.core.windows.net/c{container}/{key}.tif"
+    return items
+
+
+def test_container_of():
+    assert container_of("https://acc.blob.core.windows.net/c/a/b.tif") == (
+        "https://acc.blob.core.windows.net/c"
+    )
+    assert container_of("s3://bucket/a/b.tif") == "s3://bucket"
+    assert container_of("/data/b.tif") is None
+    assert container_of("file:///data/b.tif") is None
+
+
+def test_signer_fetches_tokens_in_one_batch():
+    stub = StubSigner()
+    signer = Signer(stub)
+    items = _remote_items(9)
+
+    signed = signer(items)
+
+    assert stub.calls == [
+        [f"https://account.blob.core.windows.net/c{i}" for i in range(3)]
+    ]
+    assert signed[0].assets["red"].href.endswith("red.tif?token=1")
+    assert items[0].assets["red"].href.endswith("red.tif")
+    assert signer("https://account.blob.core.windows.net/c1/x.tif?a=1").endswith(
+        "x.tif?a=1&token=1"
+    )
+    assert signer("/data/local.tif") == "/data/local.tif"
+    assert signer.stats == {"calls": 1, "tokens": 3}
+
+
+def test_signer_refreshes_expiring_tokens():
+    stub = StubSigner(valid_for=datetime.timedelta(minutes=1))
+    signer = Signer(stub)
+
+    signer("s3://bucket/a.tif")
+    assert signer("s3://bucket/a.tif") == "s3://bucket/a.tif?token=2"
+
+    signer = Signer(stub, margin=datetime.timedelta(0))
+    signer("s3://bucket/a.tif")
+    assert signer("s3://bucket/a.tif") == "s3://bucket/a.tif?token=3"
+    signer.clear()
+    assert signer("s3://bucket/a.tif") == "s3://bucket/a.tif?token=4"
+
+
+def test_signer_takes_naive_expiries_as_utc():
+    stub = StubSigner(naive=True)
+    signer = Signer(stub)
+
+    signer("s3://bucket/a.tif")
+    assert signer("s3://bucket/a.tif") == "s3://bucket/a.tif?token=1"
+    assert signer.tokens(["s3://bucket/a.tif"])["s3://bucket"].expiry.tzinfo
+
+
+def test_signer_signs_kerchunk_references():
+    signer = Signer(StubSigner())
+    refs = {
+        "version": 1,
+        "refs": {
+            ".zgroup": '{"zarr_format": 2}',
+            "t/0": ["s3://bucket/a.nc", 0, 10],
+            "t/1": ["s3://other/b.nc"],
+        },
+    }
+
+    signed = signer(refs)
+
+    assert signed["refs"]["t/0"] == ["s3://bucket/a.nc?token=1", 0, 10]
+    assert signed["refs"]["t/1"] == ["s3://other/b.nc?token=1"]
+    assert signed["refs"][".zgroup"] == refs["refs"][".zgroup"]
+    assert refs["refs"]["t/0"][0] == "s3://bucket/a.nc"
+
+
+def test_signer_raises_for_missing_tokens():
+    signer = Signer(lambda containers: {})
+    with pytest.raises(ValueError, match="s3://bucket"):
+        signer("s3://bucket/a.tif")
+
+
+@pytest.mark.parametrize("stacking_library", ["odc.stac", "stackstac"])
+@pytest.mark.parametrize("partition", [None, 2])
+def test_to_xarray_signs_items_in_one_call(stacking_library, partition):
+    stub = StubSigner()
+    signer = Signer(stub)
+    items = _remote_items(12)
+
+    for _ in range(2):
+        to_xarray(
+            items,
+            stacking_library=stacking_library,
+            patch_url=signer,
+            partition=partition,
+        )
+
+    assert len(stub.calls) == 1
@@ -0,0 +1,182 @@
+import numpy as np
+import pystac
+import pytest
+import xarray as xr
+
+from tests.factories import make_raster_item
+from xpystac._skeleton import _MissingMetadata, skeleton
+from xpystac.core import to_xarray
+
+
+def _assert_same_schema(skeleton_ds: xr.Dataset, ds: xr.Dataset):
+    assert dict(skeleton_ds.sizes) == dict(ds.sizes)
+    assert set(skeleton_ds.data_vars) == set(ds.data_vars)
+    for name, var in ds.data_vars.items():
+        assert skeleton_ds[name].dims == var.dims
+        assert skeleton_ds[name].dtype == var.dtype, name
+        assert skeleton_ds[name].chunks == var.chunks, name
+    for name in ds.dims:
+        if name in ds.coords:
+            np.testing.assert_allclose(
+                skeleton_ds[name].values.astype("float64"),
+                ds[name].values.astype("float64"),
+            )
+
+
+def test_metadata_only_kerchunk_items(inline_kerchunk):
+    ds = to_xarray(inline_kerchunk, metadata_only=True)
+
+    assert ds.attrs["xpystac:metadata_only"]
+    _assert_same_schema(ds, to_xarray(inline_kerchunk))
+    assert ds.temperature.chunks == ((5,), (4,))
+
+
+def test_metadata_only_kerchunk_item(inline_kerchunk):
+    _assert_same_schema(
+        to_xarray(inline_kerchunk[0], metadata_only=True),
+        to_xarray(inline_kerchunk[0]),
+    )
+
+
+def test_metadata_only_kerchunk_items_without_kerchunk(inline_kerchunk):
+    # --- the items are stacked as rasters, which they hold no fields for
+    with pytest.raises(_MissingMetadata):
+        skeleton(list(inline_kerchunk), datacube=False)
+    with pytest.raises(ValueError, match="CRS/resolution"):
+        to_xarray(inline_kerchunk, metadata_only=True, allow_kerchunk=False)
+
+
+def test_metadata_only_raster_items_match_odc_stac():
+    items = [
+        make_raster_item(0, origin=(500_000.0, 4_000_000.0)),
+        make_raster_item(1, origin=(502_560.0, 4_000_000.0)),
+        make_raster_item(2, origin=(500_000.0, 3_997_440.0)),
+    ]
+
+    ds = to_xarray(items, metadata_only=True)
+
+    _assert_same_schema(ds, to_xarray(items, stacking_library="odc.stac"))
+    assert ds.red.chunks[0] == (1, 1, 1)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"bbox": [-104.99, 36.125, -104.98, 36.135]},
+        {"resolution": 20},
+        {"crs": "EPSG:4326", "resolution": 0.001},
+        {"chunks": {"x": 256, "y": 256}},
+        {"dtype": "float32"},
+        {"stacking_library": "stackstac"},
+        {"stacking_library": "stackstac", "resolution": 20},
+    ],
+)
+def test_metadata_only_raster_items_honor_kwargs(kwargs):
+    items = [make_raster_item(i) for i in range(2)]
+
+    ds = to_xarray(items, metadata_only=True, **kwargs)
+
+    assert "xpystac:metadata_only" not in ds.attrs
+    _assert_same_schema(ds, to_xarray(items, **kwargs))
+
+
+def test_metadata_only_kerchunk_items_honor_chunks(inline_kerchunk):
+    ds = to_xarray(inline_kerchunk, metadata_only=True, chunks={"time": 1})
+
+    assert "xpystac:metadata_only" not in ds.attrs
+    _assert_same_schema(ds, to_xarray(inline_kerchunk, chunks={"time": 1}))
+
+
+def test_metadata_only_raster_items_bands():
+    items = [make_raster_item(i) for i in range(2)]
+    ds = to_xarray(items, metadata_only=True, bands=["green"])
+    assert list(ds.data_vars) == ["green"]
+
+
+def test_metadata_only_cog_asset(tmp_path):
+    import rasterio
+    from rasterio.transform import from_origin
+
+    path = tmp_path / "image.tif"
+    transform = from_origin(500_000.0, 4_000_000.0, 10.0, 10.0)
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        width=20,
+        height=10,
+        count=2,
+        dtype="int16",
+        crs="EPSG:32613",
+        transform=transform,
+    ) as dst:
+        dst.write(np.zeros((2, 10, 20), "int16"))
+
+    asset = pystac.Asset(
+        str(path),
+        media_type=pystac.MediaType.COG,
+        extra_fields={
+            "proj:epsg": 32613,
+            "proj:shape": [10, 20],
+            "proj:transform": list(transform)[:6],
+            "raster:bands": [{"data_type": "int16"}, {"data_type": "int16"}],
+        },
+    )
+
+    ds = to_xarray(asset, metadata_only=True)
+
+    assert ds.attrs["xpystac:metadata_only"]
+    _assert_same_schema(ds, to_xarray(asset))
+
+
+def test_metadata_only_collection_asset_with_datacube_extent():
+    collection = pystac.Collection(
+        id="cube",
+        description="collection with datacube fields",
+        extent=pystac.Extent(
+            pystac.SpatialExtent([[-180, -90, 180, 90]]),
+            pystac.TemporalExtent([[None, None]]),
+        ),
+        extra_fields={
+            "cube:dimensions": {
+                "time": {
+                    "type": "temporal",
+                    "extent": ["2020-01-01T00:00:00Z", "2020-01-10T00:00:00Z"],
+                    "step": "P1D",
+                },
+                "lat": {"type": "spatial", "axis": "y", "extent": [0, 1], "step": 0.25},
+            },
+            "cube:variables": {
+                "tmax": {
+                    "type": "data",
+                    "dimensions": ["time", "lat"],
+                    "data_type": "float32",
+                    "unit": "degC",
+                }
+            },
+        },
+    )
+    collection.add_asset(
+        "zarr",
+        pystac.Asset("s3://does/not/exist.zarr", media_type="application/vnd+zarr"),
+    )
+
+    ds = to_xarray(collection.assets["zarr"], metadata_only=True)
+
+    assert dict(ds.sizes) == {"time": 10, "lat": 5}
+    assert ds.tmax.dtype == "float32"
+    assert ds.tmax.attrs["unit"] == "degC"
+    assert ds.time.values[-1] == np.datetime64("2020-01-10")
+
+
+def test_metadata_only_falls_back_to_opening(local_collection):
+    ds = to_xarray(local_collection.assets["zarr"], metadata_only=True)
+
+    assert "xpystac:metadata_only" not in ds.attrs
+    assert (ds.a.values == [0, 1, 2]).all()
+
+
+def test_skeleton_raises_for_items_on_different_grids():
+    items = [make_raster_item(0), make_raster_item(1, epsg=32614)]
+    with pytest.raises(_MissingMetadata, match="shared grid"):
+        skeleton(items)
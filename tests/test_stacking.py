@@ -0,0 +1,133 @@
+import datetime
+
+import dask.array
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from tests.factories import legacy_stackstac_to_dataset, make_raster_item
+from xpystac._stacking import partition_items, stackstac_to_dataset
+from xpystac.core import to_xarray
+
+
+@pytest.fixture
+def raster_items():
+    # two items share a datetime so that they get grouped by odc.stac
+    items = [make_raster_item(i) for i in range(10)]
+    items[4].datetime = items[5].datetime
+    return items
+
+
+def assert_same_structure(actual: xr.Dataset, expected: xr.Dataset):
+    assert actual.sizes == expected.sizes
+    assert list(actual.data_vars) == list(expected.data_vars)
+    for name, var in expected.data_vars.items():
+        assert actual[name].dtype == var.dtype
+        assert actual[name].attrs == var.attrs
+    for name in expected.indexes:
+        xr.testing.assert_identical(actual[name], expected[name])
+
+
+def test_partition_items_by_count(raster_items):
+    partitions = partition_items(raster_items[::-1], 3)
+
+    assert [len(p) for p in partitions] == [3, 3, 3, 1]
+    datetimes = [i.datetime for p in partitions for i in p]
+    assert datetimes == sorted(i.datetime for i in raster_items)
+
+
+def test_partition_items_by_count_keeps_same_datetime_together(raster_items):
+    partitions = partition_items(raster_items, 5)
+
+    assert [len(p) for p in partitions] == [6, 4]
+
+
+def test_partition_items_by_time_window(raster_items):
+    partitions = partition_items(raster_items, "7D")
+
+    assert [len(p) for p in partitions] == [7, 3]
+
+
+def test_partition_items_raises_for_bad_partition(raster_items):
+    with pytest.raises(ValueError, match="positive number"):
+        partition_items(raster_items, 0)
+
+
+@pytest.mark.parametrize("stacking_library", ["odc.stac", "stackstac"])
+@pytest.mark.parametrize("partition", [3, "7D"])
+def test_to_xarray_partitioned(raster_items, stacking_library, partition):
+    expected = to_xarray(raster_items, stacking_library=stacking_library)
+    actual = to_xarray(
+        raster_items,
+        stacking_library=stacking_library,
+        partition=partition,
+        max_workers=2,
+    )
+
+    assert_same_structure(actual, expected)
+
+
+def test_to_xarray_partitioned_keeps_solar_days_together():
+    # --- two items a minute apart on each of three days
+    items = [make_raster_item(i) for i in range(6)]
+    for i, item in enumerate(items):
+        item.datetime = datetime.datetime(
+            2023, 1, 1 + i // 2, 17, 2 + i % 2, tzinfo=datetime.timezone.utc
+        )
+    kwargs = {"stacking_library": "odc.stac", "groupby": "solar_day"}
+
+    expected = to_xarray(items, **kwargs)
+    actual = to_xarray(items, partition=3, **kwargs)
+
+    assert actual.sizes["time"] == 3
+    xr.testing.assert_identical(actual.time, expected.time)
+
+
+def synthetic_stack(n_bands=4, n_times=3, size=8, chunked=True):
+    """DataArray shaped like the output of stackstac.stack"""
+    bands = [f"B{i:02}" for i in range(n_bands)]
+    data = np.arange(n_times * n_bands * size * size, dtype="float64").reshape(
+        n_times, n_bands, size, size
+    )
+    if chunked:
+        data = dask.array.from_array(data, chunks=(1, 1, size, size))
+    return xr.DataArray(
+        data,
+        dims=("time", "band", "y", "x"),
+        coords={
+            "time": pd.date_range("2023-01-01", periods=n_times),
+            "band": bands,
+            "y": np.arange(size),
+            "x": np.arange(size),
+            "id": ("time", [f"item-{i}" for i in range(n_times)]),
+            "title": ("band", [f"Band {b}" for b in bands]),
+            "gsd": ("band", [10.0] * (n_bands - 1) + [None]),
+            "raster:bands": ("band", [{"nodata": 0}] * n_bands),
+            "epsg": 32613,
+            "platform": None,
+        },
+        attrs={"crs": "epsg:32613", "resolution": 10.0},
+    )
+
+
+@pytest.mark.parametrize("chunked", [True, False])
+def test_stackstac_to_dataset_matches_legacy(chunked):
+    da = synthetic_stack(chunked=chunked)
+    expected = legacy_stackstac_to_dataset(da)
+    actual = stackstac_to_dataset(da)
+
+    xr.testing.assert_identical(actual, expected)
+    for name in expected.data_vars:
+        assert actual[name].attrs == expected[name].attrs
+
+
+def test_stackstac_to_dataset_moves_band_coords_to_attrs():
+    ds = stackstac_to_dataset(synthetic_stack())
+
+    assert list(ds.data_vars) == ["B00", "B01", "B02", "B03"]
+    assert set(ds.coords) == {"time", "y", "x", "id"}
+    assert ds.B00.attrs["title"] == "Band B00"
+    assert ds.B00.attrs["epsg"] == 32613
+    assert "gsd" not in ds.B03.attrs
+    assert "platform" not in ds.B00.attrs
@@ -0,0 +1,113 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pystac
+import pytest
+import xarray as xr
+
+from tests.factories import make_raster_item
+from xpystac._stores import stack_stores, store_asset_key
+from xpystac.core import to_xarray
+from xpystac.tracing import trace
+
+
+def _store_item(path, index: int, with_time: bool = False) -> pystac.Item:
+    """Item of a zarr store of one day of a 3 x 4 grid, with or without a
+    time dim in the store itself"""
+    day = datetime.datetime(2023, 1, 1) + datetime.timedelta(days=index)
+    ds = xr.Dataset(
+        {"t": (("y", "x"), np.full((3, 4), index, dtype="float32"))},
+        coords={"y": np.arange(3.0), "x": np.arange(4.0)},
+    )
+    if with_time:
+        ds = ds.expand_dims(time=pd.date_range(day, periods=2, freq="12h"))
+    ds.to_zarr(path / f"day-{index}.zarr")
+
+    item = pystac.Item(
+        id=f"day-{index}",
+        geometry=None,
+        bbox=None,
+        datetime=day.replace(tzinfo=datetime.timezone.utc),
+        properties={},
+    )
+    item.add_asset(
+        "thumbnail", pystac.Asset("thumb.png", media_type=pystac.MediaType.PNG)
+    )
+    item.add_asset(
+        "zarr",
+        pystac.Asset(
+            str(path / f"day-{index}.zarr"),
+            media_type="application/vnd+zarr",
+            roles=["data"],
+        ),
+    )
+    return item
+
+
+def test_store_asset_key(tmp_path):
+    item = _store_item(tmp_path, 0)
+    assert store_asset_key(item) == "zarr"
+    del item.assets["zarr"]
+    assert store_asset_key(item) is None
+
+
+def test_stack_stores_without_store_asset_raises():
+    with pytest.raises(ValueError, match="no store asset"):
+        stack_stores([make_raster_item(0)], to_xarray)
+
+
+def test_cog_items_with_other_stores_are_stacked_by_a_library(tmp_path):
+    items = [make_raster_item(i) for i in range(2)]
+    for item in items:
+        item.add_asset(
+            "overview",
+            pystac.Asset(
+                str(tmp_path / "overview.zarr"),
+                media_type="application/vnd+zarr",
+                roles=["overview"],
+            ),
+        )
+    assert store_asset_key(items[0]) is None
+
+    ds = to_xarray(items)
+
+    assert set(ds.data_vars) == {"red", "green"}
+    assert ds.sizes["time"] == 2
+
+
+def test_to_xarray_stacks_store_items_along_item_datetimes(tmp_path):
+    items = [_store_item(tmp_path, i) for i in [2, 0, 1]]
+
+    with trace() as t:
+        ds = to_xarray(items)
+
+    assert ds.t.dims == ("time", "y", "x")
+    np.testing.assert_array_equal(
+        ds.time, pd.date_range("2023-01-01", periods=3).values
+    )
+    np.testing.assert_array_equal(ds.t[:, 0, 0], [0, 1, 2])
+    assert t.summary()["open_stores"]["n_items"] == 3
+    (combine,) = [s for s in t.stages if s.name == "combine_stores"]
+    assert combine.attrs["aligned"]
+
+
+def test_to_xarray_concatenates_store_items_with_time(tmp_path):
+    items = [_store_item(tmp_path, i, with_time=True) for i in [1, 0]]
+
+    ds = to_xarray(pystac.ItemCollection(items))
+
+    expected = xr.concat(
+        [to_xarray(items[1].assets["zarr"]), to_xarray(items[0].assets["zarr"])], "time"
+    )
+    xr.testing.assert_identical(ds, expected)
+
+
+def test_to_xarray_store_items_must_share_a_schema(tmp_path):
+    items = [_store_item(tmp_path, i) for i in range(2)]
+    xr.Dataset({"t": ("x", np.zeros(5))}).to_zarr(
+        items[1].assets["zarr"].href, mode="w"
+    )
+
+    with pytest.raises(ValueError, match="day-1"):
+        to_xarray(items)
@@ -0,0 +1,119 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pystac
+import pytest
+
+from xpystac.core import to_xarray
+from xpystac.tracing import _NULL_STAGE, propagate, stage, trace
+
+
+def test_stage_is_a_no_op_without_trace():
+    assert stage("anything", value=1) is _NULL_STAGE
+    with stage("anything") as s:
+        s.record(value=2)
+
+
+def test_trace_records_nested_stages():
+    with trace() as t:
+        with stage("outer") as outer:
+            with stage("inner", n=1):
+                pass
+            outer.record(n=2)
+
+    inner, outer = t.stages
+    assert [s.name for s in t.roots] == ["outer"]
+    assert outer.children == [inner]
+    assert inner.parent is outer
+    assert outer.attrs == {"n": 2}
+    assert outer.duration >= inner.duration
+
+
+def test_trace_records_errors():
+    with trace() as t:
+        with pytest.raises(KeyError):
+            with stage("failing"):
+                raise KeyError("x")
+
+    assert isinstance(t.stages[0].error, KeyError)
+
+
+def test_propagate_keeps_stages_of_pool_threads():
+    def work(i):
+        with stage("work", i=i):
+            return i
+
+    with trace() as t:
+        with stage("pool"):
+            with ThreadPoolExecutor(2) as pool:
+                assert list(pool.map(propagate(work), range(3))) == [0, 1, 2]
+
+    (pool_stage,) = t.roots
+    assert sorted(s.attrs["i"] for s in pool_stage.children) == [0, 1, 2]
+    work_summary = t.summary()["work"]
+    assert work_summary["count"] == 3
+    assert work_summary["i"] == 3
+
+
+def test_trace_to_xarray_kerchunk_items(inline_kerchunk):
+    with trace() as t:
+        to_xarray(inline_kerchunk)
+
+    summary = t.summary()
+    assert summary["combine_references"]["n_items"] == 5
+    assert summary["open_dataset"]["count"] == 1
+    (combine,) = [s for s in t.stages if s.name == "combine_references"]
+    assert combine.attrs["method"] == "native"
+
+
+def test_trace_to_xarray_reference_asset_counts_bytes(tmp_path, inline_kerchunk):
+    from xpystac._xstac_kerchunk import _stac_to_kerchunk
+
+    path = tmp_path / "refs.json"
+    path.write_text(json.dumps(_stac_to_kerchunk(inline_kerchunk[0])))
+    asset = pystac.Asset(
+        str(path), media_type=pystac.MediaType.JSON, roles=["references"]
+    )
+
+    with trace() as t:
+        to_xarray(asset)
+
+    fetch = t.summary()["fetch_references"]
+    assert fetch["requests"] == 1
+    assert fetch["bytes"] == path.stat().st_size
+
+
+def test_trace_callback():
+    seen = []
+    with trace(seen.append):
+        with stage("a"):
+            pass
+    with stage("b"):
+        pass
+
+    assert [s.name for s in seen] == ["a"]
+
+
+def test_opentelemetry_callback():
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    from xpystac.tracing import opentelemetry_callback
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+
+    with trace(opentelemetry_callback(provider.get_tracer("test"))):
+        with stage("outer"):
+            with stage("inner", n=1):
+                pass
+
+    inner, outer = exporter.get_finished_spans()
+    assert outer.name == "xpystac.outer"
+    assert inner.parent.span_id == outer.context.span_id
+    assert inner.attributes["n"] == 1
@@ -15,3 +15,57 @@ def test_xarray_open_dataset_can_guess_for_pystac_client_searchs(simple_search):
 def test_xarray_open_dataset_with_drop_variables_raises(simple_search):
     with pytest.raises(KeyError, match="not implemented for pystac items"):
         xarray.open_dataset(simple_search, engine="stac", drop_variables=["B0"])
+
+
+def _imported_modules(*statements: str) -> set[str]:
+    """Modules imported by the last statement, in a fresh interpreter that
+    ran the other statements first"""
+    import json
+    import subprocess
+    import sys
+
+    code = "\n".join(
+        [
+            "import json, sys",
+            *statements[:-1],
+            "before = set(sys.modules)",
+            statements[-1],
+            "print(json.dumps(sorted(set(sys.modules) - before)))",
+        ]
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return set(json.loads(result.stdout))
+
+
+def test_plugin_import_is_light():
+    # xarray is already imported when it loads the backend entrypoints
+    modules = _imported_modules(
+        "import xarray.backends", "import xpystac.xarray_plugin"
+    )
+    for heavy in ["pystac", "xpystac.core", "odc", "icechunk", "zarr", "fsspec"]:
+        assert heavy not in modules
+
+
+def test_icechunk_module_does_not_import_icechunk():
+    modules = _imported_modules("import xarray, pystac", "import xpystac._icechunk")
+    assert "icechunk" not in modules
+
+
+def test_guess_can_open():
+    import pystac
+
+    from tests.factories import make_kerchunk_item
+    from xpystac.xarray_plugin import STACBackend
+
+    class SubAsset(pystac.Asset):
+        pass
+
+    backend = STACBackend()
+    item = make_kerchunk_item(0)
+    assert backend.guess_can_open(item)
+    assert backend.guess_can_open(pystac.ItemCollection([item]))
+    assert backend.guess_can_open(SubAsset("file.tif"))
+    assert not backend.guess_can_open("file.tif")
+    assert not backend.guess_can_open(pystac.Link("self", "file.json"))
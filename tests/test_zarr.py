@@ -0,0 +1,97 @@
+import os
+import warnings
+
+import numpy as np
+import pystac
+import pytest
+import xarray as xr
+
+from xpystac._zarr import clear_zarr_cache, detect_layout
+from xpystac.cache import ReferenceCache
+from xpystac.core import to_xarray
+
+
+@pytest.fixture(autouse=True)
+def _clear_zarr_cache():
+    clear_zarr_cache()
+    yield
+    clear_zarr_cache()
+
+
+def _write_store(path, zarr_format: int, consolidated: bool) -> str:
+    ds = xr.Dataset(
+        {"a": (("t", "x"), np.arange(12.0).reshape(3, 4))},
+        coords={"x": np.arange(4)},
+    )
+    ds.to_zarr(path, zarr_format=zarr_format, consolidated=consolidated)
+    return str(path)
+
+
+def _zarr_asset(href: str) -> pystac.Asset:
+    return pystac.Asset(href, media_type="application/vnd+zarr")
+
+
+@pytest.mark.parametrize("zarr_format", [2, 3])
+@pytest.mark.parametrize("consolidated", [True, False])
+def test_detect_layout(tmp_path, zarr_format, consolidated):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        href = _write_store(tmp_path / "store.zarr", zarr_format, consolidated)
+
+    assert detect_layout(href) == {
+        "zarr_format": zarr_format,
+        "consolidated": consolidated,
+    }
+
+
+def test_detect_layout_is_memoized(tmp_path, monkeypatch):
+    import xpystac._zarr
+
+    href = _write_store(tmp_path / "store.zarr", 3, False)
+    detect_layout(href)
+
+    def fail(*args):
+        raise AssertionError("layout should be memoized")
+
+    monkeypatch.setattr(xpystac._zarr, "_url_to_fs", fail)
+    assert detect_layout(f"{href}?signature=abc")["zarr_format"] == 3
+
+
+def test_detect_layout_of_missing_store_is_not_memoized(tmp_path):
+    href = str(tmp_path / "store.zarr")
+    assert detect_layout(href) == {"zarr_format": None, "consolidated": None}
+    with pytest.raises(FileNotFoundError):
+        to_xarray(_zarr_asset(href))
+
+    _write_store(href, 3, True)
+    assert detect_layout(href) == {"zarr_format": 3, "consolidated": True}
+
+
+def test_to_xarray_unconsolidated_store_does_not_probe(tmp_path):
+    href = _write_store(tmp_path / "store.zarr", 2, False)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        ds = to_xarray(_zarr_asset(href))
+    assert ds.a.sum() == 66
+
+
+@pytest.mark.parametrize("zarr_format", [2, 3])
+def test_to_xarray_unconsolidated_store_with_sidecar(tmp_path, zarr_format):
+    href = _write_store(tmp_path / "store.zarr", zarr_format, False)
+    cache = ReferenceCache(tmp_path / "cache")
+
+    expected = to_xarray(_zarr_asset(href), cache=cache)
+    assert cache.stats["entries"] == 1
+
+    # --- reopening only reads the sidecar, not the metadata of the store,
+    # except for the root document that tells its format
+    metadata = {".zarray", ".zattrs", ".zgroup", "zarr.json"}
+    for root, _, files in os.walk(href):
+        for name in files:
+            if name in metadata and not (root == href and name != ".zattrs"):
+                os.remove(os.path.join(root, name))
+    clear_zarr_cache()
+
+    ds = to_xarray(_zarr_asset(href), cache=cache)
+    xr.testing.assert_identical(ds.load(), expected.load())
+    assert cache.stats["hits"] == 1
@@ -0,0 +1,23 @@
+"""Kinds of assets, shared by the readers and the ranking of representations"""
+
+import pystac
+
+
+def _is_reference_asset(obj: pystac.Asset) -> bool:
+    """Whether the asset points to a kerchunk reference file"""
+    return obj.media_type == pystac.MediaType.JSON and bool(
+        {"index", "references"}.intersection(obj.roles or [])
+    )
+
+
+def _asset_backend(obj: pystac.Asset) -> str | None:
+    """Name of the backend that ``to_xarray`` uses for an asset, if any"""
+    if _is_reference_asset(obj):
+        return "kerchunk"
+    if obj.media_type == "application/vnd.zarr+icechunk":
+        return "icechunk"
+    if obj.media_type in ["application/vnd+zarr", "application/vnd.zarr"]:
+        return "zarr"
+    if obj.media_type == pystac.MediaType.COG:
+        return "rasterio"
+    return None
@@ -0,0 +1,132 @@
+"""Dask chunks that are whole multiples of the blocks of the data on disk.
+
+Reading a block that straddles two dask chunks means reading it twice, and
+chunks much smaller than the blocks make for graphs with many more tasks
+than reads. Every reader of ``to_xarray`` therefore asks ``plan_chunks`` for
+chunks made of whole native blocks (zarr or kerchunk chunks, GeoTIFF tiles)
+that are as large as possible within the ``array.chunk-size`` of dask.
+"""
+
+import math
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import numpy as np
+import pystac
+import xarray
+
+from xpystac.utils import _import_optional_dependency
+
+# used when dask is not configured
+DEFAULT_BUDGET = 128 * 2**20
+# tile size of GeoTIFFs written by the GDAL COG driver, assumed for COG
+# assets since STAC has no field for it
+COG_BLOCK = 512
+# largest (y, x) chunk of stacked COGs, the fixed chunks used before planning
+MAX_RASTER_CHUNK = 1024
+
+
+def chunk_budget() -> int:
+    """Target size in bytes of one chunk, ``array.chunk-size`` in the dask
+    config"""
+    dask = _import_optional_dependency("dask")
+    from dask.utils import parse_bytes
+
+    return parse_bytes(dask.config.get("array.chunk-size", DEFAULT_BUDGET))
+
+
+def plan_chunks(
+    shape: Sequence[int],
+    blocks: Sequence[int],
+    itemsize: int,
+    budget: int | None = None,
+    fixed: Iterable[int] = (),
+) -> tuple[int, ...]:
+    """Chunk size along each axis, a whole multiple of the native block.
+
+    Starting from one block, the chunk is doubled along each axis in turn
+    (last axis first) for as long as it fits in ``budget`` bytes, without
+    growing past the size of the array. Axes in ``fixed`` keep one block.
+    """
+    if budget is None:
+        budget = chunk_budget()
+    fixed = set(fixed)
+    blocks = [max(1, min(b, n)) for b, n in zip(blocks, shape)]
+    chunks = list(blocks)
+    growing = [i for i in reversed(range(len(shape))) if i not in fixed]
+    while growing:
+        for i in list(growing):
+            candidate = chunks[i] * 2
+            if candidate >= shape[i]:
+                candidate = shape[i]
+            nbytes = math.prod(chunks[:i] + [candidate] + chunks[i + 1 :]) * itemsize
+            if candidate == chunks[i] or nbytes > budget:
+                growing.remove(i)
+            else:
+                chunks[i] = candidate
+    return tuple(chunks)
+
+
+def plan_variables(ds: xarray.Dataset, budget: int | None = None) -> xarray.Dataset:
+    """Chunk the lazily loaded variables of a dataset opened with
+    ``chunks=None``, from the native chunks in their ``preferred_chunks``
+    encoding. Variables without one are left in a single chunk, like
+    ``chunks={}`` does, and variables that are already chunked are kept."""
+    variables = {}
+    for name, var in ds.variables.items():
+        if name in ds.indexes or var.ndim == 0 or var.chunks is not None:
+            variables[name] = var
+            continue
+        preferred = var.encoding.get("preferred_chunks", {})
+        blocks = [preferred.get(d, n) for d, n in zip(var.dims, var.shape)]
+        chunks = plan_chunks(var.shape, blocks, var.dtype.itemsize, budget)
+        variables[name] = var.chunk(dict(zip(var.dims, chunks)))
+
+    planned = xarray.Dataset(
+        {k: variables[k] for k in ds.data_vars},
+        coords={k: variables[k] for k in ds.coords},
+        attrs=ds.attrs,
+    )
+    planned.encoding = dict(ds.encoding)
+    # --- the files of ``ds`` are closed along with the planned dataset
+    planned.set_close(ds.close)
+    return planned
+
+
+def _raster_itemsize(item: pystac.Item, dtype: Any = None) -> int:
+    """Largest item size of the bands of the assets of an item, or of
+    ``dtype``"""
+    if dtype is not None:
+        return np.dtype(dtype).itemsize
+    sizes = [
+        np.dtype(band["data_type"]).itemsize
+        for asset in item.assets.values()
+        for band in asset.extra_fields.get("raster:bands") or []
+        if "data_type" in band
+    ]
+    return max(sizes, default=np.dtype("float64").itemsize)
+
+
+def raster_chunks(
+    item: pystac.Item, dtype: Any = None, budget: int | None = None
+) -> tuple[int, int]:
+    """(y, x) chunks for stacking COG assets like those of ``item``, in whole
+    ``COG_BLOCK`` tiles.
+
+    Each chunk holds one band at one time, so the whole budget goes to the
+    spatial dims, up to ``MAX_RASTER_CHUNK`` along each of them. The output
+    grid is only known to the stacking library, so the chunks are not capped
+    by it.
+    """
+    itemsize = _raster_itemsize(item, dtype)
+    limit = (MAX_RASTER_CHUNK, MAX_RASTER_CHUNK)
+    return plan_chunks(  # type: ignore[return-value]
+        limit, (COG_BLOCK, COG_BLOCK), itemsize, budget
+    )
+
+
+def open_planned(filename_or_obj: Any, **kwargs) -> xarray.Dataset:
+    """``xarray.open_dataset`` with planned chunks, unless ``chunks`` is given"""
+    if "chunks" in kwargs:
+        return xarray.open_dataset(filename_or_obj, **kwargs)
+    return plan_variables(xarray.open_dataset(filename_or_obj, chunks=None, **kwargs))
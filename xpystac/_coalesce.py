@@ -0,0 +1,184 @@
+import asyncio
+import bisect
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import Future
+from typing import Any
+
+from fsspec.core import split_protocol
+from fsspec.implementations.reference import (
+    ReferenceFileSystem,
+    ReferenceNotReachable,
+)
+from fsspec.utils import merge_offset_ranges
+
+from xpystac.tracing import stage
+
+# neighbouring chunks closer than this many bytes are read together
+MAX_GAP = 64_000
+# upper bound on the size of one coalesced read
+MAX_BLOCK = 4_000_000
+# number of coalesced reads kept in memory for each file
+BLOCK_CACHE_SIZE = 4
+# number of files with blocks kept in memory
+MAX_FILES = 16
+
+
+def plan_reads(
+    references: Mapping[str, Any], max_gap: int = MAX_GAP, max_block: int = MAX_BLOCK
+) -> dict[str, tuple[list[int], list[int]]]:
+    """Merge the byte ranges of a reference table into blocks, per file.
+
+    Ranges of the same file that are at most ``max_gap`` bytes apart are
+    merged into blocks of at most ``max_block`` bytes. Returns the sorted
+    start and end offsets of the blocks of every file.
+    """
+    paths, starts, ends = [], [], []
+    for ref in references.values():
+        if isinstance(ref, list) and len(ref) == 3:
+            url, offset, size = ref
+            paths.append(url)
+            starts.append(offset)
+            ends.append(offset + size)
+
+    with stage("plan_reads", references=len(paths)) as s:
+        blocks: dict[str, tuple[list[int], list[int]]] = {}
+        for url, start, end in zip(
+            *merge_offset_ranges(paths, starts, ends, max_gap, max_block, sort=True)
+        ):
+            file_starts, file_ends = blocks.setdefault(url, ([], []))
+            file_starts.append(start)
+            file_ends.append(end)
+        n_blocks = sum(len(file_starts) for file_starts, _ in blocks.values())
+        s.record(blocks=n_blocks, coalesced=len(paths) - n_blocks)
+    return blocks
+
+
+class CoalescingReferenceFileSystem(ReferenceFileSystem):
+    """Reference filesystem that reads neighbouring chunks in one request.
+
+    Zarr reads chunks one at a time, so the range merging that
+    ``ReferenceFileSystem.cat`` does for batches of keys never kicks in. This
+    filesystem plans the blocks of every referenced file up front with
+    ``plan_reads`` and, when a chunk is read, fetches the whole block that
+    holds it. The other chunks of the block are then served from a small
+    per-file LRU of blocks (for the ``MAX_FILES`` files read last), and
+    concurrent reads of the same block share one request.
+
+    ``stats`` counts the planned blocks, the requests that
+    were actually made and the reads served from an already fetched block.
+    """
+
+    # the references can be huge, so skip tokenizing them for the instance cache
+    cachable = False
+
+    def __init__(
+        self,
+        fo,
+        *,
+        max_gap: int = MAX_GAP,
+        max_block: int = MAX_BLOCK,
+        block_cache_size: int = BLOCK_CACHE_SIZE,
+        **kwargs,
+    ):
+        super().__init__(fo, max_gap=max_gap, max_block=max_block, **kwargs)
+        self.block_cache_size = block_cache_size
+        # lazily loaded (parquet) references are not planned
+        self._plan = (
+            plan_reads(self.references, max_gap, max_block)
+            if isinstance(self.references, dict)
+            else {}
+        )
+        n_blocks = sum(len(starts) for starts, _ in self._plan.values())
+        self.stats = {"blocks": n_blocks, "requests": 0, "hits": 0}
+        self._lock = threading.Lock()
+        self._blocks: OrderedDict[str, OrderedDict[int, Future]] = OrderedDict()
+
+    def _find_block(self, path, start, end):
+        """The url, block and absolute byte range of a read, if it is planned"""
+        url, start1, end1 = self._cat_common(path, start=start, end=end)
+        if isinstance(url, bytes) or url not in self._plan or start1 is None:
+            return None
+        starts, ends = self._plan[url]
+        i = bisect.bisect_right(starts, start1) - 1
+        if i < 0 or end1 is None or end1 > ends[i]:
+            return None
+        return url, (starts[i], ends[i]), (start1, end1)
+
+    def _claim(self, url: str, block_start: int) -> tuple[Future, bool]:
+        """Get the future of a block, and whether the caller has to fetch it"""
+        with self._lock:
+            blocks = self._blocks.setdefault(url, OrderedDict())
+            self._blocks.move_to_end(url)
+            while len(self._blocks) > MAX_FILES:
+                self._blocks.popitem(last=False)
+            if block_start in blocks:
+                blocks.move_to_end(block_start)
+                self.stats["hits"] += 1
+                return blocks[block_start], False
+            future: Future = Future()
+            blocks[block_start] = future
+            while len(blocks) > self.block_cache_size:
+                blocks.popitem(last=False)
+            self.stats["requests"] += 1
+            return future, True
+
+    def _fail(self, url: str, block_start: int, future: Future, e: Exception):
+        with self._lock:
+            blocks = self._blocks.get(url)
+            if blocks is not None and blocks.get(block_start) is future:
+                del blocks[block_start]
+        future.set_exception(e)
+
+    async def _cat_file(self, path, start=None, end=None, **kwargs):
+        found = self._find_block(path, start, end)
+        if found is None:
+            return await super()._cat_file(path, start=start, end=end, **kwargs)
+        url, (block_start, block_end), (start1, end1) = found
+
+        future, fetch = self._claim(url, block_start)
+        if fetch:
+            protocol, _ = split_protocol(url)
+            try:
+                data = await self.fss[protocol]._cat_file(
+                    url, start=block_start, end=block_end
+                )
+            except Exception as e:
+                self._fail(url, block_start, future, e)
+                raise ReferenceNotReachable(path, url) from e
+            future.set_result(data)
+        data = await asyncio.wrap_future(future)
+        return data[start1 - block_start : end1 - block_start]
+
+    def cat_file(self, path, start=None, end=None, **kwargs):
+        found = self._find_block(path, start, end)
+        if found is None:
+            return super().cat_file(path, start=start, end=end, **kwargs)
+        url, (block_start, block_end), (start1, end1) = found
+
+        future, fetch = self._claim(url, block_start)
+        if fetch:
+            protocol, _ = split_protocol(url)
+            try:
+                data = self.fss[protocol].cat_file(
+                    url, start=block_start, end=block_end
+                )
+            except Exception as e:
+                self._fail(url, block_start, future, e)
+                raise ReferenceNotReachable(path, url) from e
+            future.set_result(data)
+        return future.result()[start1 - block_start : end1 - block_start]
+
+
+def reference_store(refs: dict, **options):
+    """Read-only zarr store over a ``CoalescingReferenceFileSystem``.
+
+    The filesystem is created async and handed to zarr as is, since zarr
+    would otherwise rebuild it from its JSON (the whole reference table) to
+    make it async.
+    """
+    from zarr.storage import FsspecStore
+
+    fs = CoalescingReferenceFileSystem(refs, asynchronous=True, **options)
+    return FsspecStore(fs, read_only=True, path="")
@@ -1,20 +1,34 @@
+import functools
+import threading
 import warnings
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, TypedDict
 
-import icechunk
 import pystac
 import xarray as xr
 
-warnings.filterwarnings(
-    "ignore",
-    message="Numcodecs codecs are not in the Zarr version 3 specification*",
-    category=UserWarning,
-)
+from xpystac._chunks import plan_variables
+from xpystac.plan import record
+from xpystac.tracing import propagate, stage
+from xpystac.utils import _import_optional_dependency, _local_path
 
+if TYPE_CHECKING:
+    import icechunk
 
-def construct_virtual_containers_config(
-    collection: pystac.Collection, asset: pystac.Asset
-):
-    # --- Configure icechunk storage for data store
+
+@functools.cache
+def _import_icechunk():
+    """Import icechunk the first time a repository is needed"""
+    warnings.filterwarnings(
+        "ignore",
+        message="Numcodecs codecs are not in the Zarr version 3 specification*",
+        category=UserWarning,
+    )
+    return _import_optional_dependency("icechunk")
+
+
+def _virtual_container(collection: pystac.Collection, asset: pystac.Asset):
+    """Get the (href, region, anonymous) of the data store of a virtual asset"""
     data_buckets = asset.extra_fields["vrt:hrefs"]
 
     if len(data_buckets) != 1:
@@ -35,7 +49,11 @@ def construct_virtual_containers_config(
 
     data_region = data_storage_scheme["region"]
     data_anonymous = data_storage_scheme.get("anonymous", False)
+    return data_href, data_region, data_anonymous
 
+
+def _virtual_containers_config(data_href: str, data_region: str, data_anonymous: bool):
+    icechunk = _import_icechunk()
     config = icechunk.RepositoryConfig.default()
     config.set_virtual_chunk_container(
         icechunk.VirtualChunkContainer(data_href, icechunk.s3_store(region=data_region))
@@ -49,15 +67,180 @@ def construct_virtual_containers_config(
     return config, virtual_credentials
 
 
-def read_icechunk(asset: pystac.Asset) -> xr.Dataset:
-    """Read a icechunk asset
+def construct_virtual_containers_config(
+    collection: pystac.Collection, asset: pystac.Asset
+):
+    # --- Configure icechunk storage for data store
+    return _virtual_containers_config(*_virtual_container(collection, asset))
 
-    The asset's parent must contain:
-     * "storage:schemes" where at least one key matches "storage:ref" in the asset
 
-    For virtual assets the parent must contain:
-     * another asset that matches the key in the primary asset's ["vrt:hrefs"] list
+class _SessionKwargs(TypedDict, total=False):
+    """Kwargs of ``Repository.readonly_session`` for a resolved version"""
+
+    branch: str
+    snapshot_id: str
+
+
+# --- Process-wide pool of opened repositories and resolved versions
+_lock = threading.Lock()
+_repositories: dict[tuple, Future] = {}
+_versions: dict[tuple, _SessionKwargs] = {}
+
+
+def clear_icechunk_cache():
+    """Forget every pooled repository and every resolved version.
+
+    Call this after creating or moving branches and tags that xpystac has
+    already resolved, or to pick up new credentials.
     """
+    with _lock:
+        _repositories.clear()
+        _versions.clear()
+
+
+def _storage_and_config(key: tuple) -> tuple:
+    """Get the storage and the ``Repository.open`` kwargs for a pool key"""
+    icechunk = _import_icechunk()
+    bucket, prefix, region, anonymous, virtual_container = key
+    if bucket is None:
+        storage = icechunk.local_filesystem_storage(prefix)
+    else:
+        storage = icechunk.s3_storage(
+            bucket=bucket,
+            prefix=prefix,
+            region=region,
+            anonymous=anonymous,
+            from_env=not anonymous,
+        )
+    if virtual_container is not None:
+        config, virtual_credentials = _virtual_containers_config(*virtual_container)
+        repo_kwargs = dict(
+            config=config, authorize_virtual_chunk_access=virtual_credentials
+        )
+    else:
+        repo_kwargs = dict(config=icechunk.RepositoryConfig.default())
+    return storage, repo_kwargs
+
+
+def _claim_repository(key: tuple) -> tuple[Future, bool]:
+    """Get the pooled future for ``key`` and whether the caller must open it"""
+    with _lock:
+        pooled = _repositories.get(key)
+        if pooled is not None:
+            return pooled, False
+        future = _repositories[key] = Future()
+    return future, True
+
+
+def _release_repository(key: tuple, future: Future, e: BaseException):
+    with _lock:
+        _repositories.pop(key, None)
+    future.set_exception(e)
+
+
+def _open_repository(key: tuple) -> "icechunk.Repository":
+    """Open the repository described by ``key`` at most once per process.
+
+    Concurrent callers asking for the same repository share a single
+    in-flight ``Repository.open`` call.
+    """
+    future, is_owner = _claim_repository(key)
+    if is_owner:
+        icechunk = _import_icechunk()
+        try:
+            with stage("open_repository", prefix=key[1]):
+                storage, repo_kwargs = _storage_and_config(key)
+                future.set_result(
+                    icechunk.Repository.open(storage=storage, **repo_kwargs)
+                )
+        except BaseException as e:
+            _release_repository(key, future, e)
+
+    return future.result()
+
+
+async def _aopen_repository(key: tuple) -> "icechunk.Repository":
+    """Async version of ``_open_repository`` sharing the same pool"""
+    import asyncio
+
+    future, is_owner = _claim_repository(key)
+    if is_owner:
+        icechunk = _import_icechunk()
+        try:
+            with stage("open_repository", prefix=key[1]):
+                storage, repo_kwargs = _storage_and_config(key)
+                repo = await icechunk.Repository.open_async(
+                    storage=storage, **repo_kwargs
+                )
+                future.set_result(repo)
+        except BaseException as e:
+            _release_repository(key, future, e)
+
+    return await asyncio.wrap_future(future)
+
+
+def _resolve_version(
+    key: tuple, repo: "icechunk.Repository", version: str | None
+) -> _SessionKwargs:
+    """Get the session kwargs for a branch, tag or snapshot id.
+
+    Branches stay branches so that sessions see new commits, tags are
+    resolved to their snapshot. The result is memoized per repository.
+    """
+    if not version:
+        return {"branch": "main"}
+
+    with _lock:
+        if (key, version) in _versions:
+            return _versions[(key, version)]
+
+    session_kwargs: _SessionKwargs
+    with stage("resolve_version", version=version):
+        if version in repo.list_branches():
+            session_kwargs = {"branch": version}
+        elif version in repo.list_tags():
+            session_kwargs = {"snapshot_id": repo.lookup_tag(version)}
+        else:
+            session_kwargs = {"snapshot_id": version}
+
+    with _lock:
+        _versions[(key, version)] = session_kwargs
+    return session_kwargs
+
+
+async def _aresolve_version(
+    key: tuple, repo: "icechunk.Repository", version: str | None
+) -> _SessionKwargs:
+    """Async version of ``_resolve_version`` sharing the same memo"""
+    if not version:
+        return {"branch": "main"}
+
+    with _lock:
+        if (key, version) in _versions:
+            return _versions[(key, version)]
+
+    session_kwargs: _SessionKwargs
+    with stage("resolve_version", version=version):
+        if version in await repo.list_branches_async():
+            session_kwargs = {"branch": version}
+        elif version in await repo.list_tags_async():
+            session_kwargs = {"snapshot_id": await repo.lookup_tag_async(version)}
+        else:
+            session_kwargs = {"snapshot_id": version}
+
+    with _lock:
+        _versions[(key, version)] = session_kwargs
+    return session_kwargs
+
+
+def _repository_key(asset: pystac.Asset) -> tuple:
+    """Get the key identifying the repository of an asset in the pool"""
+    # --- Repositories on the local filesystem need no storage scheme
+    if "storage:refs" not in asset.extra_fields:
+        path = _local_path(asset.href)
+        if path is not None:
+            return (None, path, None, False, None)
+
     # --- Get storage schemes off the parent
     collection = asset.owner
     storage_schemes = collection.extra_fields["storage:schemes"]
@@ -76,37 +259,106 @@ def read_icechunk(asset: pystac.Asset) -> xr.Dataset:
     anonymous = storage_scheme.get("anonymous", False)
     prefix = asset.href.split(f"{bucket}/")[1]
 
-    storage = icechunk.s3_storage(
-        bucket=bucket,
-        prefix=prefix,
-        region=region,
-        anonymous=anonymous,
-        from_env=not anonymous,
-    )
-
     if "virtual" in asset.roles:
-        config, virtual_credentials = construct_virtual_containers_config(
-            collection, asset
-        )
-        repo_kwargs = dict(
-            config=config, authorize_virtual_chunk_access=virtual_credentials
-        )
+        virtual_container = _virtual_container(collection, asset)
     else:
-        repo_kwargs = dict(config=icechunk.RepositoryConfig.default())
+        virtual_container = None
 
-    repo = icechunk.Repository.open(storage=storage, **repo_kwargs)
+    return (bucket, prefix, region, anonymous, virtual_container)
 
-    # --- Open icechunk session at a particular branch/tag/snapshot
-    if version := asset.extra_fields.get("version"):
-        if version in repo.list_branches():
-            session_kwargs = {"branch": version}
-        elif version in repo.list_tags():
-            session_kwargs = {"tag": version}
-        else:
-            session_kwargs = {"snapshot_id": version}
-    else:
-        session_kwargs = {"branch": "main"}
 
+def _open_store(key: tuple, session) -> xr.Dataset:
+    """Open the zarr store of a session, chunked by ``plan_variables``"""
+    from xpystac._zarr import with_chunk_cache
+
+    # --- Chunks of a snapshot never change, so it is all the version needed
+    store = with_chunk_cache(session.store, "icechunk", *key, session.snapshot_id)
+    return plan_variables(
+        xr.open_zarr(store, chunks=None, zarr_format=3, consolidated=False)
+    )
+
+
+def read_icechunk(asset: pystac.Asset) -> xr.Dataset:
+    """Read a icechunk asset
+
+    Assets without "storage:refs" whose href is a local path are read from
+    the local filesystem. Otherwise the asset's parent must contain:
+     * "storage:schemes" where at least one key matches "storage:ref" in the asset
+
+    For virtual assets the parent must contain:
+     * another asset that matches the key in the primary asset's ["vrt:hrefs"] list
+
+    Opened repositories and resolved versions are pooled for the life of the
+    process, see ``clear_icechunk_cache``.
+    """
+    key = _repository_key(asset)
+    repo = _open_repository(key)
+
+    # --- Open icechunk session at a particular branch/tag/snapshot
+    session_kwargs = _resolve_version(key, repo, asset.extra_fields.get("version"))
     session = repo.readonly_session(**session_kwargs)
 
-    return xr.open_zarr(session.store, zarr_format=3, consolidated=False)
+    record("icechunk", key=key, snapshot_id=session.snapshot_id)
+    with stage("open_dataset", engine="icechunk"):
+        return _open_store(key, session)
+
+
+def read_icechunk_snapshot(key: tuple, snapshot_id: str) -> xr.Dataset:
+    """Read a snapshot of the repository identified by ``key``, like
+    ``read_icechunk`` does once it has resolved the version of an asset"""
+    repo = _open_repository(key)
+    session = repo.readonly_session(snapshot_id=snapshot_id)
+    with stage("open_dataset", engine="icechunk"):
+        return _open_store(key, session)
+
+
+async def aread_icechunk(asset: pystac.Asset) -> xr.Dataset:
+    """Async version of ``read_icechunk``.
+
+    The repository is opened, the version resolved and the session created
+    with the async icechunk API. Only decoding the metadata into a dataset
+    runs in a thread.
+    """
+    import asyncio
+
+    key = _repository_key(asset)
+    repo = await _aopen_repository(key)
+
+    session_kwargs = await _aresolve_version(
+        key, repo, asset.extra_fields.get("version")
+    )
+    session = await repo.readonly_session_async(**session_kwargs)
+    record("icechunk", key=key, snapshot_id=session.snapshot_id)
+
+    with stage("open_dataset", engine="icechunk"):
+        return await asyncio.to_thread(_open_store, key, session)
+
+
+def read_icechunk_versions(
+    asset: pystac.Asset, versions: list[str], max_workers: int | None = None
+) -> dict[str, xr.Dataset]:
+    """Read several versions of the same icechunk asset.
+
+    The repository is opened once, the read-only sessions are created in
+    parallel and versions that resolve to the same snapshot are only read
+    once.
+    """
+    key = _repository_key(asset)
+    repo = _open_repository(key)
+
+    def open_session(version: str):
+        return repo.readonly_session(**_resolve_version(key, repo, version))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        sessions = dict(zip(versions, pool.map(propagate(open_session), versions)))
+
+        # --- Only read the metadata of each distinct snapshot once
+        unique = {s.snapshot_id: s for s in sessions.values()}
+        datasets = dict(
+            zip(
+                unique,
+                pool.map(propagate(lambda s: _open_store(key, s)), unique.values()),
+            )
+        )
+
+    return {version: datasets[s.snapshot_id] for version, s in sessions.items()}
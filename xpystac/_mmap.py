@@ -0,0 +1,324 @@
+"""Open local uncompressed zarr stores and GeoTIFFs through memory maps.
+
+The chunks of an uncompressed zarr array and the tiles or strips of an
+uncompressed GeoTIFF are plain arrays at known offsets of known files, so
+each of them is mapped with ``numpy.memmap`` instead of being read through
+zarr or GDAL. The dask chunks of the resulting dataset are whole multiples
+of the on-disk chunks, tiles or strips as planned by ``plan_chunks``: chunks
+of a single block are views of the mapped file and larger ones are
+assembled from the blocks they span.
+"""
+
+import os
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+import xarray
+
+from xpystac._chunks import plan_chunks, plan_variables
+from xpystac.utils import _import_optional_dependency
+
+# kwargs of ``xarray.open_dataset`` that are applied by ``xarray.decode_cf``
+_DECODE_KWARGS = (
+    "mask_and_scale",
+    "decode_times",
+    "decode_timedelta",
+    "concat_characters",
+    "decode_coords",
+    "use_cftime",
+)
+
+
+def _read_block(
+    path: str,
+    offset: int,
+    dtype: np.dtype,
+    shape: tuple[int, ...],
+    index: tuple,
+    fill_value: Any,
+) -> np.ndarray:
+    """Map one block of a file, or fill it in when it was never written"""
+    if offset is None or not os.path.exists(path):
+        return np.full(np.empty(shape, dtype="b1")[index].shape, fill_value, dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)[index]
+
+
+def _read_pixel_block(*args) -> np.ndarray:
+    """Map one block of a pixel interleaved GeoTIFF, with the bands first"""
+    return np.moveaxis(_read_block(*args), -1, 0)
+
+
+def _merge_blocks(nested: list) -> np.ndarray:
+    """Assemble the blocks of a nested list, already read by dask"""
+    return np.block(nested)
+
+
+def _nested(tasks: dict, ranges: list[range], prefix: tuple = ()) -> Any:
+    """Tasks of the blocks in ``ranges`` as nested lists, one level per axis"""
+    if len(prefix) == len(ranges):
+        return tasks[prefix]
+    return [_nested(tasks, ranges, (*prefix, i)) for i in ranges[len(prefix)]]
+
+
+def _array(
+    name: str,
+    tasks: dict[tuple[int, ...], tuple],
+    blocks: tuple[tuple[int, ...], ...],
+    dtype: np.dtype,
+    chunks: Sequence[int] | None = None,
+):
+    """Dask array of the blocks made by ``tasks``, with chunks of whole
+    blocks of the given size (or of one block each)"""
+    dask_array = _import_optional_dependency("dask.array")
+    if chunks is None:
+        graph = {(name, *i): task for i, task in tasks.items()}
+        return dask_array.Array(graph, name, blocks, dtype=dtype.newbyteorder("="))
+
+    # --- Group consecutive blocks along each axis into chunks
+    groups = []
+    for sizes, chunk in zip(blocks, chunks):
+        axis_groups, start, total = [], 0, 0
+        for i, size in enumerate(sizes):
+            total += size
+            if total >= chunk or i == len(sizes) - 1:
+                axis_groups.append((range(start, i + 1), total))
+                start, total = i + 1, 0
+        groups.append(axis_groups)
+
+    graph = {}
+    for index in np.ndindex(*(len(g) for g in groups)):
+        ranges = [groups[axis][i][0] for axis, i in enumerate(index)]
+        if all(len(r) == 1 for r in ranges):
+            graph[(name, *index)] = tasks[tuple(r[0] for r in ranges)]
+        else:
+            graph[(name, *index)] = (_merge_blocks, _nested(tasks, ranges))
+    merged = tuple(tuple(size for _, size in g) for g in groups)
+    return dask_array.Array(graph, name, merged, dtype=dtype.newbyteorder("="))
+
+
+def _regular_chunks(shape: Sequence[int], chunks: Sequence[int]) -> tuple:
+    return tuple(
+        tuple(min(c, n - start) for start in range(0, n, c)) or (0,)
+        for n, c in zip(shape, chunks)
+    )
+
+
+# --- zarr
+
+
+def _zarr_disk_dtype(array) -> np.dtype | None:
+    """Dtype of the uncompressed chunks of a zarr array as they are on disk,
+    or None if the chunks are encoded"""
+    metadata = array.metadata
+    dtype = np.dtype(array.dtype)
+    if dtype.kind not in "biufcmM":
+        return None
+    if metadata.zarr_format == 2:
+        if metadata.compressor is not None or metadata.filters or metadata.order != "C":
+            return None
+        return np.dtype(metadata.to_dict()["dtype"])
+
+    (codec, *others) = metadata.codecs
+    if others or type(codec).__name__ != "BytesCodec":
+        return None
+    if codec.endian is None:
+        return dtype
+    return dtype.newbyteorder("<" if codec.endian.value == "little" else ">")
+
+
+def _zarr_array(path: str, array, itemsize: int | None) -> Any:
+    """Memory mapped dask array of an uncompressed zarr array, or None.
+
+    Chunks are planned for data of ``itemsize`` bytes per element, or are
+    the zarr chunks if None.
+    """
+    dtype = _zarr_disk_dtype(array)
+    if dtype is None or array.ndim == 0:
+        return None
+
+    root = os.path.join(path, *array.path.split("/"))
+    chunks = _regular_chunks(array.shape, array.chunks)
+    fill_value = array.fill_value if array.fill_value is not None else 0
+    tasks = {}
+    for i in np.ndindex(*(len(c) for c in chunks)):
+        key = array.metadata.encode_chunk_key(i)
+        valid = tuple(slice(0, c[j]) for c, j in zip(chunks, i))
+        tasks[i] = (
+            _read_block,
+            os.path.join(root, *key.split("/")),
+            0,
+            dtype,
+            tuple(array.chunks),
+            valid,
+            fill_value,
+        )
+    planned = None
+    if itemsize is not None:
+        planned = plan_chunks(array.shape, array.chunks, itemsize)
+    token = f"{root}-{os.stat(root).st_mtime_ns}-{planned}"
+    return _array(f"mmap-{token}", tasks, chunks, dtype, planned)
+
+
+def open_zarr(path: str, **kwargs) -> xarray.Dataset | None:
+    """Open a local zarr store, mapping the chunks of uncompressed arrays.
+
+    The store is opened undecoded, the data of its uncompressed arrays is
+    swapped for memory mapped dask arrays and only then decoded, so that
+    the dataset is the same as the one opened by the zarr engine. Returns
+    None when none of the arrays can be mapped.
+    """
+    zarr = _import_optional_dependency("zarr")
+    decode_cf = kwargs.pop("decode_cf", True)
+    decode_kwargs = {k: kwargs.pop(k) for k in _DECODE_KWARGS if k in kwargs}
+    chunks = kwargs.pop("chunks", None)
+
+    group = zarr.open_group(path, mode="r", path=kwargs.get("group") or "")
+    raw = xarray.open_dataset(
+        path, **kwargs, chunks=None if chunks is None else {}, decode_cf=False
+    )
+    # chunks are planned for the decoded dtypes, which decoding lazily tells
+    decoded = xarray.decode_cf(raw, **decode_kwargs) if decode_cf else raw
+    mapped = {}
+    for name, variable in raw.variables.items():
+        if name in raw.indexes or name not in group:
+            continue
+        itemsize = decoded[name].dtype.itemsize if chunks is None else None
+        if (data := _zarr_array(path, group[name], itemsize)) is not None:
+            mapped[name] = variable.copy(data=data)
+    if not mapped:
+        return None
+
+    ds = raw.assign({k: v for k, v in mapped.items() if k not in raw.coords})
+    ds = ds.assign_coords({k: v for k, v in mapped.items() if k in raw.coords})
+    if decode_cf:
+        ds = xarray.decode_cf(ds, **decode_kwargs)
+    if chunks is None:
+        return plan_variables(ds)
+    return ds.chunk(chunks) if chunks else ds
+
+
+# --- GeoTIFF
+
+
+def _tiff_byte_order(path: str) -> str:
+    with open(path, "rb") as f:
+        return "<" if f.read(2) == b"II" else ">"
+
+
+def open_geotiff(path: str, **kwargs) -> xarray.Dataset | None:
+    """Open a local uncompressed GeoTIFF like the rasterio engine does,
+    mapping its tiles or strips.
+
+    Returns None when the file is compressed, has bands of different types,
+    is scaled, or when ``kwargs`` asks for anything but ``chunks``.
+    """
+    rasterio = _import_optional_dependency("rasterio")
+    chunks = kwargs.pop("chunks", None)
+    if kwargs:
+        return None
+
+    with rasterio.open(path) as src:
+        if (
+            src.compression is not None
+            or len(set(src.dtypes)) != 1
+            or any(s != 1 for s in src.scales)
+            or any(o != 0 for o in src.offsets)
+            or not src.transform.is_rectilinear
+        ):
+            return None
+        count, height, width = src.count, src.height, src.width
+        block_height, block_width = src.block_shapes[0]
+        dtype = np.dtype(src.dtypes[0]).newbyteorder(_tiff_byte_order(path))
+        nodata = src.nodata
+        pixel_interleaved = count > 1 and src.interleaving.name == "pixel"
+        transform, crs, tags = src.transform, src.crs, src.tags()
+
+        row_chunks = _regular_chunks([height], [block_height])[0]
+        col_chunks = _regular_chunks([width], [block_width])[0]
+        band_chunks = (count,) if pixel_interleaved else (1,) * count
+        read = _read_pixel_block if pixel_interleaved else _read_block
+        row_size = block_width * dtype.itemsize * (count if pixel_interleaved else 1)
+        tasks: dict[tuple[int, ...], tuple] = {}
+        for b in range(len(band_chunks)):
+            for i, rows in enumerate(row_chunks):
+                for j, cols in enumerate(col_chunks):
+                    offset, size = (
+                        src.get_tag_item(f"BLOCK_{tag}_{j}_{i}", "TIFF", bidx=b + 1)
+                        for tag in ("OFFSET", "SIZE")
+                    )
+                    # tiles are padded to the full block, the last strip is not
+                    stored_rows = int(size or 0) // row_size if offset else rows
+                    shape: tuple[int, ...] = (
+                        min(block_height, stored_rows),
+                        block_width,
+                    )
+                    index: tuple[slice | None, ...]
+                    if pixel_interleaved:
+                        shape = (*shape, count)
+                        index = (slice(0, rows), slice(0, cols), slice(None))
+                    else:
+                        index = (None, slice(0, rows), slice(0, cols))
+                    tasks[(b, i, j)] = (
+                        read,
+                        path,
+                        int(offset) if offset else None,
+                        dtype,
+                        shape,
+                        index,
+                        nodata or 0,
+                    )
+
+    # the rasterio engine masks nodata, which promotes to float
+    float_dtype = np.result_type(dtype.newbyteorder("="), np.float32)
+    planned = None
+    if chunks is None:
+        planned = plan_chunks(
+            (count, height, width),
+            (band_chunks[0], block_height, block_width),
+            float_dtype.itemsize,
+        )
+    token = f"{path}-{os.stat(path).st_mtime_ns}-{planned}"
+    blocks = (band_chunks, row_chunks, col_chunks)
+    raw = _array(f"mmap-{token}", tasks, blocks, dtype, planned)
+
+    dask_array = _import_optional_dependency("dask.array")
+    data = raw.astype(float_dtype)
+    encoding = {"dtype": raw.dtype, "scale_factor": 1.0, "add_offset": 0.0}
+    if nodata is not None and not np.isnan(nodata):
+        data = dask_array.where(raw == nodata, float_dtype.type(np.nan), data)
+        encoding["_FillValue"] = float_dtype.type(nodata)
+
+    x = transform.c + (np.arange(width) + 0.5) * transform.a
+    y = transform.f + (np.arange(height) + 0.5) * transform.e
+    spatial_ref = xarray.DataArray(
+        0,
+        attrs={
+            "crs_wkt": crs.to_wkt(),
+            "spatial_ref": crs.to_wkt(),
+            "GeoTransform": " ".join(str(v) for v in transform.to_gdal()),
+        },
+    )
+    band_data = xarray.Variable(("band", "y", "x"), data, attrs=tags)
+    band_data.encoding = {**encoding, "grid_mapping": "spatial_ref", "source": path}
+    ds = xarray.Dataset(
+        {"band_data": band_data},
+        coords={
+            "band": np.arange(1, count + 1),
+            "x": x,
+            "y": y,
+            "spatial_ref": spatial_ref,
+        },
+    )
+    return ds.chunk(chunks) if chunks else ds
+
+
+def open_memmapped(path: str, **kwargs) -> xarray.Dataset | None:
+    """Open a local zarr store or GeoTIFF through memory maps, or return
+    None if it cannot be mapped and has to be opened by xarray"""
+    engine = kwargs.pop("engine", None)
+    if engine == "zarr" and os.path.isdir(path):
+        return open_zarr(path, engine=engine, **kwargs)
+    if engine == "rasterio" and os.path.isfile(path):
+        return open_geotiff(path, **kwargs)
+    return None
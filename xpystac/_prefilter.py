@@ -0,0 +1,196 @@
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pystac
+
+from xpystac.tracing import stage
+from xpystac.utils import _import_optional_dependency
+
+# kwargs of the stacking libraries that define the region of a query
+REGION_KWARGS = ("bbox", "bounds_latlon", "lon", "lat", "geopolygon", "intersects")
+
+
+def _to_datetime64(values: list) -> np.ndarray:
+    """Naive UTC datetime64 values, NaT where missing"""
+    times = pd.DatetimeIndex(pd.to_datetime(values, utc=True)).tz_convert(None)
+    return times.values
+
+
+def _time_range(time: Any) -> tuple[np.datetime64, np.datetime64]:
+    """Start and end of a ``time`` query.
+
+    ``time`` is a ``start/end`` interval string (with ``..`` for open ends),
+    a ``(start, end)`` pair, or a single date or datetime, which covers the
+    whole period it names (e.g. ``"2020-01"`` is all of January).
+    """
+    if isinstance(time, str) and "/" in time:
+        time = tuple(time.split("/"))
+    if isinstance(time, (tuple, list)):
+        start, end = (None if t in (None, "..", "") else t for t in time)
+        start = pd.Timestamp.min if start is None else pd.Timestamp(start)
+        end = pd.Timestamp.max if end is None else pd.Timestamp(end)
+    elif isinstance(time, str):
+        period = pd.Period(time)
+        start, end = period.start_time, period.end_time
+    else:
+        start = end = pd.Timestamp(time)
+    start, end = (
+        t.tz_convert("UTC").tz_localize(None) if t.tzinfo is not None else t
+        for t in (start, end)
+    )
+    return start.to_datetime64(), end.to_datetime64()
+
+
+def _bbox_2d(bbox: list | None) -> list:
+    """The 2D part of a 2D or 3D bbox, NaN when missing"""
+    if not bbox:
+        return [np.nan] * 4
+    half = len(bbox) // 2
+    return bbox[:2] + bbox[half : half + 2]
+
+
+def _query_geometry(kwargs: dict) -> tuple[tuple | None, Any]:
+    """Lon/lat bbox and geometry of the region asked for in the stacking kwargs"""
+    if kwargs.get("bbox") is not None:
+        return tuple(kwargs["bbox"]), None
+    if kwargs.get("bounds_latlon") is not None:
+        return tuple(kwargs["bounds_latlon"]), None
+    if kwargs.get("lon") is not None and kwargs.get("lat") is not None:
+        (x0, x1), (y0, y1) = kwargs["lon"], kwargs["lat"]
+        return (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)), None
+
+    geometry = kwargs.get("geopolygon", kwargs.get("intersects"))
+    if geometry is None:
+        return None, None
+    shapely = _import_optional_dependency("shapely")
+    if hasattr(geometry, "to_crs"):
+        # odc.geo geometries carry their own crs
+        geometry = geometry.to_crs("EPSG:4326").geom
+    elif isinstance(geometry, dict):
+        geometry = shapely.geometry.shape(geometry)
+    return tuple(geometry.bounds), geometry
+
+
+class ItemIndex:
+    """Bboxes and time ranges of items held as arrays for vectorized queries.
+
+    Item geometries are only put in a ``shapely.STRtree`` when a query
+    region is a geometry rather than a bbox.
+    """
+
+    def __init__(self, items: list[pystac.Item]):
+        self.items = items
+        self.bboxes = np.array(
+            [_bbox_2d(item.bbox) for item in items], dtype=float
+        ).reshape(-1, 4)
+        self.start = _to_datetime64(
+            [item.datetime or item.common_metadata.start_datetime for item in items]
+        )
+        self.end = _to_datetime64(
+            [item.common_metadata.end_datetime or item.datetime for item in items]
+        )
+        self._tree = None
+
+    @property
+    def tree(self):
+        """``shapely.STRtree`` of the item geometries, built on first use"""
+        if self._tree is None:
+            shapely = _import_optional_dependency("shapely")
+            geometries = [
+                shapely.geometry.shape(item.geometry)
+                if item.geometry
+                else shapely.box(*bbox)
+                for item, bbox in zip(self.items, self.bboxes)
+            ]
+            self._tree = shapely.STRtree(geometries)
+        return self._tree
+
+    def intersects_bbox(self, bbox: tuple) -> np.ndarray:
+        """Mask of the items whose bbox intersects a lon/lat bbox"""
+        minx, miny, maxx, maxy = self.bboxes.T
+        qminx, qminy, qmaxx, qmaxy = bbox
+        # items crossing the antimeridian have minx > maxx
+        crossing = minx > maxx
+        overlap_x = np.where(
+            crossing,
+            (qmaxx >= minx) | (qminx <= maxx),
+            (minx <= qmaxx) & (maxx >= qminx),
+        )
+        overlap = overlap_x & (miny <= qmaxy) & (maxy >= qminy)
+        # items without a bbox are always kept
+        return overlap | np.isnan(self.bboxes).any(axis=1)
+
+    def intersects_time(self, time: Any) -> np.ndarray:
+        """Mask of the items whose time range overlaps a ``time`` query"""
+        start, end = _time_range(time)
+        overlap = (self.start <= end) & (self.end >= start)
+        return overlap | np.isnat(self.start)
+
+    def query(
+        self, bbox: tuple | None = None, geometry: Any = None, time: Any = None
+    ) -> np.ndarray:
+        """Indices of the items that intersect the query region and time"""
+        mask = np.ones(len(self.items), dtype=bool)
+        if time is not None:
+            mask &= self.intersects_time(time)
+        if geometry is not None:
+            hits = np.zeros(len(self.items), dtype=bool)
+            hits[self.tree.query(geometry, predicate="intersects")] = True
+            mask &= hits
+        elif bbox is not None:
+            mask &= self.intersects_bbox(bbox)
+        return np.flatnonzero(mask)
+
+    def duplicates(self, indices: np.ndarray) -> np.ndarray:
+        """Mask of the items among ``indices`` that cover the same tile at the
+        same time as another one.
+
+        Tiles are identified by the ``grid:code`` property, or else by the
+        bbox. The most recently ``updated`` item of each group is kept.
+        """
+        items = [self.items[i] for i in indices]
+        frame = pd.DataFrame(
+            {
+                "collection": [item.collection_id for item in items],
+                "tile": [
+                    item.properties.get("grid:code")
+                    or tuple(np.round(bbox, 6).tolist())
+                    for item, bbox in zip(items, self.bboxes[indices])
+                ],
+                "start": self.start[indices],
+                "end": self.end[indices],
+                "updated": pd.to_datetime(
+                    [item.properties.get("updated") for item in items], utc=True
+                ),
+            }
+        )
+        frame = frame.sort_values("updated", ascending=False, kind="stable")
+        duplicated = frame.duplicated(["collection", "tile", "start", "end"])
+        return duplicated.sort_index().to_numpy()
+
+
+def prefilter_items(
+    items: list[pystac.Item], kwargs: dict
+) -> tuple[list[pystac.Item], dict]:
+    """Drop the items that fall outside of the region and time asked for in
+    the stacking kwargs, and the duplicates of the same tile and time.
+
+    ``time`` is only understood by the prefilter, so it is removed from the
+    kwargs that are returned. The kwargs defining the region are kept, since
+    the stacking library needs them for the output grid.
+    """
+    kwargs = dict(kwargs)
+    time = kwargs.pop("time", None)
+    with stage("prefilter", n_items=len(items)) as s:
+        index = ItemIndex(items)
+        bbox, geometry = _query_geometry(kwargs)
+        indices = index.query(bbox=bbox, geometry=geometry, time=time)
+        duplicated = index.duplicates(indices)
+        kept = indices[~duplicated]
+        s.record(
+            kept=len(kept),
+            dropped=len(items) - len(indices),
+            duplicates=int(duplicated.sum()),
+        )
+    return [items[i] for i in kept], kwargs
@@ -0,0 +1,87 @@
+import functools
+import json
+from typing import Any
+
+from xpystac.tracing import stage
+from xpystac.utils import _import_optional_dependency
+
+# size of the shared connection pool, also used as the default number of
+# concurrent fetches in ``open_reference_assets``
+POOL_SIZE = 16
+
+
+def _is_http(href: str) -> bool:
+    return href.startswith(("http://", "https://"))
+
+
+def _accept_encoding() -> str:
+    """Content codings that urllib3 can decode in this environment.
+
+    urllib3 only advertises ``br`` and ``zstd`` when the libraries needed to
+    decode them are installed.
+    """
+    from urllib3.util.request import ACCEPT_ENCODING
+
+    return ACCEPT_ENCODING
+
+
+@functools.cache
+def _get_session():
+    """Shared ``requests.Session`` so that connections are reused across reads"""
+    requests = _import_optional_dependency("requests")
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["Accept-Encoding"] = _accept_encoding()
+    return session
+
+
+def load_references(href: str) -> dict[str, Any]:
+    """Fetch and parse a kerchunk reference file.
+
+    HTTP(S) hrefs go through a pooled session. The response body is
+    decompressed by urllib3 and parsed from bytes, without the decoded copy
+    of the whole text that ``Response.json`` makes. Other hrefs are opened
+    with fsspec with the compression inferred from the file extension.
+    """
+    with stage("fetch_references", href=href, requests=1) as s:
+        if _is_http(href):
+            r = _get_session().get(href, stream=True)
+            with r:
+                r.raise_for_status()
+                r.raw.decode_content = True
+                refs = json.load(r.raw)
+                # bytes received over the wire, before decompression
+                s.record(bytes=r.raw.tell())
+                return refs
+
+        fsspec = _import_optional_dependency("fsspec")
+        with fsspec.open(href, mode="rb", compression="infer") as f:
+            refs = json.load(f)
+            s.record(bytes=f.tell())
+            return refs
+
+
+async def aload_references(href: str, session: Any = None) -> dict[str, Any]:
+    """Async version of ``load_references`` using aiohttp.
+
+    Pass an ``aiohttp.ClientSession`` to reuse its connections across calls,
+    otherwise a session is created for this one request.
+    """
+    if not _is_http(href):
+        import asyncio
+
+        return await asyncio.to_thread(load_references, href)
+
+    aiohttp = _import_optional_dependency("aiohttp")
+    if session is None:
+        async with aiohttp.ClientSession() as session:
+            return await aload_references(href, session=session)
+
+    async with session.get(href) as r:
+        r.raise_for_status()
+        return json.loads(await r.read())
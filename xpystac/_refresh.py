@@ -0,0 +1,118 @@
+"""Appending the time steps of new items to a dataset opened before.
+
+The kwargs that fix the output grid and chunks of each reader are read
+back from the existing dataset, so that the new items are opened straight
+onto the same grid, with the same chunks, and appended without reindexing.
+"""
+
+import numpy as np
+import xarray
+
+from xpystac._stacking import _ODC_GEOBOX_KWARGS
+from xpystac.tracing import stage
+
+_ODC_GRID_KWARGS = (*_ODC_GEOBOX_KWARGS, "geobox", "intersects")
+_STACKSTAC_GRID_KWARGS = (
+    "epsg",
+    "resolution",
+    "bounds",
+    "bounds_latlon",
+    "snap_bounds",
+)
+
+
+def _first_chunks(ds: xarray.Dataset, exclude: tuple[str, ...] = ()) -> dict:
+    """Size of the first chunk along each dim of a chunked dataset"""
+    return {d: c[0] for d, c in ds.chunksizes.items() if d not in exclude}
+
+
+def pinned_kwargs(ds: xarray.Dataset, reader: str, kwargs: dict) -> dict:
+    """``to_xarray`` kwargs that open new items like the ones of ``ds``.
+
+    ``reader`` is the branch that opens the new items: ``kerchunk``,
+    ``stores``, ``odc.stac`` or ``stackstac``. Kwargs passed by the caller
+    take precedence over the ones read from ``ds``, except for the ones
+    setting the output grid of the stacking libraries, which are dropped.
+    """
+    dim = kwargs.get("concat_dims", "time")
+    chunks = _first_chunks(ds)
+    pinned: dict = {}
+    if reader == "kerchunk":
+        if chunks:
+            pinned["chunks"] = chunks
+    elif reader == "stores":
+        # --- Each store has its own length along ``dim``, if it has it
+        if chunks:
+            pinned["chunks"] = _first_chunks(ds, exclude=(dim,))
+    elif reader == "odc.stac":
+        kwargs = {k: v for k, v in kwargs.items() if k not in _ODC_GRID_KWARGS}
+        pinned["stacking_library"] = reader
+        pinned["geobox"] = ds.odc.geobox
+        pinned["bands"] = list(ds.data_vars)
+        if chunks:
+            pinned["chunks"] = {"x": chunks["x"], "y": chunks["y"]}
+    elif reader == "stackstac":
+        spec = ds.attrs.get("spec")
+        if spec is None:
+            raise ValueError("the dataset has no RasterSpec in its 'spec' attr")
+        kwargs = {k: v for k, v in kwargs.items() if k not in _STACKSTAC_GRID_KWARGS}
+        pinned.update(
+            stacking_library=reader,
+            epsg=spec.epsg,
+            resolution=spec.resolutions_xy,
+            bounds=spec.bounds,
+            snap_bounds=False,
+            assets=list(ds.data_vars),
+            dtype=next(iter(ds.data_vars.values())).dtype,
+        )
+        if chunks:
+            pinned["chunksize"] = (chunks["y"], chunks["x"])
+    else:
+        raise ValueError(f"{reader=} is not a valid option")
+    return {**pinned, **kwargs}
+
+
+def append_delta(
+    ds: xarray.Dataset, delta: xarray.Dataset, dim: str = "time"
+) -> xarray.Dataset:
+    """Append the steps of ``delta`` along ``dim`` that ``ds`` lacks.
+
+    Steps are matched by the ``id`` coord of their items when both datasets
+    have one along ``dim`` (like stackstac datasets, where adjacent tiles
+    can share a time), and by their value along ``dim`` otherwise.
+    """
+    if dim not in ds.dims or dim not in delta.dims:
+        raise ValueError(f"both datasets must have a {dim!r} dim to append along")
+    if set(delta.data_vars) != set(ds.data_vars):
+        raise ValueError(
+            f"the new items have the variables {sorted(map(str, delta.data_vars))} "
+            f"rather than {sorted(map(str, ds.data_vars))}"
+        )
+    sizes = {d: n for d, n in ds.sizes.items() if d != dim}
+    new_sizes = {d: n for d, n in delta.sizes.items() if d != dim}
+    if new_sizes != sizes:
+        raise ValueError(
+            f"the new items have the sizes {new_sizes} rather than {sizes}"
+        )
+
+    with stage("append", dim=dim) as s:
+        # --- Steps that are already in ``ds`` are not appended twice
+        key = dim
+        if "id" in ds.coords and "id" in delta.coords and ds["id"].dims == (dim,):
+            key = "id"
+        new = ~np.isin(delta[key].values, ds[key].values)
+        s.record(n_steps=int(new.sum()))
+        if not new.any():
+            return ds
+        combined = xarray.concat(
+            [ds, delta.isel({dim: new})],
+            dim=dim,
+            data_vars="minimal",
+            coords="minimal",
+            compat="override",
+            join="override",
+            combine_attrs="override",
+        )
+        if not combined.indexes[dim].is_monotonic_increasing:
+            combined = combined.sortby(dim)
+        return combined
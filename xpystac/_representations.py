@@ -0,0 +1,91 @@
+"""Choosing how to open a collection among the representations it offers.
+
+Collections often catalog the same data several times: as a zarr store, a
+virtual icechunk repository, kerchunk reference files and the COGs of their
+items. They all open to the same dataset but at very different costs, so
+they are ranked by what it takes to build the lazy dataset from each.
+"""
+
+import dataclasses
+
+import pystac
+
+from xpystac._assets import _asset_backend
+
+# --- Cheapest first, with what opening each kind of representation costs
+_RANKS = {
+    "zarr": "consolidated zarr reads the metadata of every array at once",
+    "icechunk": "icechunk reads the metadata of every array from one snapshot",
+    "kerchunk": "kerchunk downloads and parses a whole reference file",
+    "zarr-unconsolidated": "zarr without consolidated metadata reads the "
+    "metadata of every array separately",
+    "items": "stacking items needs a search and the metadata of every item",
+}
+
+# roles of the assets preferred among representations of the same kind
+_PREFERRED_ROLES = ("latest-version", "data")
+
+
+@dataclasses.dataclass(frozen=True)
+class Representation:
+    """One way of opening the data of a collection.
+
+    ``kind`` is ``zarr``, ``icechunk``, ``kerchunk``, ``zarr-unconsolidated``
+    or ``items``, ``key`` is the key of the collection-level asset (None for
+    items) and ``reason`` says what opening it costs.
+    """
+
+    kind: str
+    key: str | None
+    reason: str
+
+
+def _kind(asset: pystac.Asset) -> str | None:
+    """Kind of representation of a collection-level asset, if any"""
+    backend = _asset_backend(asset)
+    if backend == "zarr":
+        # --- like the Asset reader, the open kwargs override the zarr fields
+        open_kwargs = asset.extra_fields.get("xarray:open_kwargs", {})
+        consolidated = asset.extra_fields.get("zarr:consolidated")
+        if open_kwargs.get("consolidated", consolidated) is False:
+            return "zarr-unconsolidated"
+    # --- COGs of a collection are overviews rather than the data itself
+    if backend == "rasterio":
+        return None
+    return backend
+
+
+def _role_rank(asset: pystac.Asset) -> int:
+    roles = asset.roles or []
+    return next(
+        (i for i, role in enumerate(_PREFERRED_ROLES) if role in roles),
+        len(_PREFERRED_ROLES),
+    )
+
+
+def list_representations(collection: pystac.Collection) -> list[Representation]:
+    """Representations of the data of a collection, cheapest to open first.
+
+    Collection-level zarr, icechunk and kerchunk assets are ranked by kind:
+    consolidated zarr, icechunk, kerchunk and zarr known to lack
+    consolidated metadata. Among assets of the same kind, the ones with a
+    ``latest-version`` role come first, then the ones with a ``data`` role.
+    Stacking the items of the collection comes last, when it links to
+    items. Only the STAC metadata of the collection is looked at, nothing
+    is opened.
+    """
+    order = list(_RANKS)
+    assets = [
+        (key, asset, kind)
+        for key, asset in collection.assets.items()
+        if (kind := _kind(asset)) is not None
+    ]
+    assets.sort(key=lambda a: (order.index(a[2]), _role_rank(a[1])))
+    representations = [
+        Representation(kind, key, _RANKS[kind]) for key, _, kind in assets
+    ]
+
+    # --- Items are only read when they are opened
+    if collection.get_links(pystac.RelType.ITEM):
+        representations.append(Representation("items", None, _RANKS["items"]))
+    return representations
@@ -0,0 +1,376 @@
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import numpy as np
+import pystac
+import xarray
+
+from xpystac._chunks import COG_BLOCK, plan_chunks, raster_chunks
+from xpystac.utils import _import_optional_dependency
+
+
+class _MissingMetadata(ValueError):
+    """Raised when the STAC fields are not enough to build a skeleton"""
+
+
+def _lazy(shape: Sequence[int], dtype: Any, chunks: Any, fill_value: Any = None):
+    """Dask array that holds no data, with the given shape, dtype and chunks"""
+    dask_array = _import_optional_dependency("dask.array")
+    if fill_value is None:
+        fill_value = np.nan if np.dtype(dtype).kind in "fc" else 0
+    return dask_array.full(shape, fill_value, dtype=dtype, chunks=chunks)
+
+
+def _data_type(fields: dict) -> str | None:
+    """dtype of an array from its kerchunk, datacube or raster fields"""
+    if "kerchunk:zarray" in fields:
+        return fields["kerchunk:zarray"]["dtype"]
+    if "data_type" in fields:
+        return fields["data_type"]
+    bands = fields.get("raster:bands") or [{}]
+    return bands[0].get("data_type")
+
+
+# --- Skeletons from the datacube extension
+
+
+def _inline_values(name: str, dim: dict) -> np.ndarray:
+    """Raw values of a dimension stored inline in its kerchunk references"""
+    from xpystac._xstac_kerchunk import _decode_inline_chunk
+
+    zarray = dim["kerchunk:zarray"]
+    values = dim["kerchunk:value"]
+    if len(values) != 1:
+        raise _MissingMetadata(f"{name} is not stored in a single chunk")
+    try:
+        (value,) = values.values()
+        return _decode_inline_chunk(zarray, value)[: zarray["shape"][0]]
+    except ValueError as e:
+        raise _MissingMetadata(str(e)) from e
+
+
+def _decode(name: str, values: np.ndarray, attrs: dict) -> np.ndarray:
+    """Apply the CF encoding in ``attrs`` (e.g. time units) to raw values"""
+    ds = xarray.Dataset({name: (name, values, attrs)})
+    return xarray.decode_cf(ds)[name].values
+
+
+def _dimension_values(name: str, dim: dict) -> np.ndarray:
+    """Values of a datacube dimension from its values or extent and step"""
+    import pandas as pd
+
+    if "kerchunk:value" in dim:
+        return _decode(name, _inline_values(name, dim), dim["kerchunk:zattrs"])
+
+    temporal = dim.get("type") == "temporal"
+    if dim.get("values") is not None:
+        if temporal:
+            return pd.DatetimeIndex(dim["values"]).tz_localize(None).values
+        return np.asarray(dim["values"])
+
+    extent, step = dim.get("extent"), dim.get("step")
+    if not extent or None in extent or step is None:
+        raise _MissingMetadata(f"{name} has neither values nor a regular extent")
+    if temporal:
+        try:
+            # only fixed durations, calendar steps like P1M are not regular
+            freq = pd.Timedelta(step)
+        except ValueError as e:
+            raise _MissingMetadata(f"{name} has an irregular step {step}") from e
+        start, end = (pd.Timestamp(t).tz_localize(None) for t in extent)
+        return pd.date_range(start, end, freq=freq).values
+    n = int(round((extent[1] - extent[0]) / step)) + 1
+    return np.linspace(extent[0], extent[1], n)
+
+
+def _datacube(fields: dict, chunks: Any = None) -> xarray.Dataset:
+    """Skeleton of a dataset described by ``cube:dimensions`` and
+    ``cube:variables``"""
+    dimensions = fields.get("cube:dimensions")
+    variables = fields.get("cube:variables")
+    if not dimensions or variables is None:
+        raise _MissingMetadata("no datacube fields")
+
+    coords = {name: _dimension_values(name, dim) for name, dim in dimensions.items()}
+    sizes = {name: len(values) for name, values in coords.items()}
+
+    data_vars = {}
+    for name, var in variables.items():
+        dims = var.get("dimensions")
+        if dims is None and "kerchunk:zattrs" in var:
+            dims = var["kerchunk:zattrs"].get("_ARRAY_DIMENSIONS")
+        if dims is None or any(d not in sizes for d in dims):
+            raise _MissingMetadata(f"the dimensions of {name} are not all known")
+        dtype = _data_type(var)
+        if dtype is None:
+            raise _MissingMetadata(f"the data type of {name} is not known")
+
+        shape = tuple(sizes[d] for d in dims)
+        zarray = var.get("kerchunk:zarray")
+        blocks = tuple(zarray["chunks"]) if zarray else shape
+        var_chunks = chunks
+        if var_chunks is None:
+            var_chunks = plan_chunks(shape, blocks, np.dtype(dtype).itemsize)
+        attrs = {k: var[k] for k in ("description", "unit") if k in var}
+        # --- like opened datasets, keep the native chunks for replanning
+        encoding = {"preferred_chunks": dict(zip(dims, blocks))}
+        data_vars[name] = (dims, _lazy(shape, dtype, var_chunks), attrs, encoding)
+
+    return xarray.Dataset(data_vars, coords=coords)
+
+
+def _datacube_items(items: list[pystac.Item], chunks: Any = None) -> xarray.Dataset:
+    """Skeleton of datacube items concatenated along ``time``.
+
+    The arrays of the first item are used as a template and only the
+    ``time`` values are read from every item.
+    """
+    template = _datacube(items[0].properties, chunks=chunks)
+    if len(items) == 1:
+        return template
+    if "time" not in template.dims:
+        raise _MissingMetadata("items do not have a time dimension")
+
+    time_dims = [item.properties["cube:dimensions"]["time"] for item in items]
+    if "kerchunk:value" in time_dims[0]:
+        # --- decode the raw values of all the items at once
+        from xpystac._xstac_kerchunk import _CONCAT_ENCODING_ATTRS
+
+        def time_encoding(dim):
+            return [dim["kerchunk:zattrs"].get(k) for k in _CONCAT_ENCODING_ATTRS]
+
+        if any(time_encoding(dim) != time_encoding(time_dims[0]) for dim in time_dims):
+            raise _MissingMetadata("time is encoded differently across items")
+        raw = np.concatenate([_inline_values("time", dim) for dim in time_dims])
+        times = _decode("time", raw, time_dims[0]["kerchunk:zattrs"])
+    else:
+        times = np.concatenate([_dimension_values("time", dim) for dim in time_dims])
+    n = template.sizes["time"]
+    if len(times) != n * len(items):
+        raise _MissingMetadata("items have different lengths along time")
+    order = np.argsort(times, kind="stable")
+
+    data_vars = {}
+    for name, var in template.data_vars.items():
+        dims = var.dims
+        blocks = {"time": 1, **var.encoding["preferred_chunks"]}
+        if "time" not in dims and n == 1:
+            # --- like the combined references, variables gain a time axis
+            dims = ("time", *dims)
+        if "time" in dims:
+            shape = tuple(
+                len(times) if d == "time" else template.sizes[d] for d in dims
+            )
+            var_chunks = chunks
+            if var_chunks is None:
+                var_chunks = plan_chunks(
+                    shape, [blocks[d] for d in dims], var.dtype.itemsize
+                )
+            data = _lazy(shape, var.dtype, var_chunks)
+        else:
+            data = var.data
+        encoding = {"preferred_chunks": {d: blocks[d] for d in dims}}
+        data_vars[name] = (dims, data, var.attrs, encoding)
+
+    return xarray.Dataset(
+        data_vars,
+        coords={
+            **{k: v for k, v in template.coords.items() if k != "time"},
+            "time": times[order],
+        },
+    )
+
+
+# --- Skeletons from the projection and raster extensions
+
+
+def _grid(fields: dict, item_fields: dict) -> tuple[int, list[int], list[float]]:
+    """(epsg, shape, transform) of an asset, falling back to its item"""
+
+    def get(key):
+        return fields.get(key, item_fields.get(key))
+
+    epsg = get("proj:epsg")
+    if epsg is None and str(get("proj:code") or "").startswith("EPSG:"):
+        epsg = int(get("proj:code")[len("EPSG:") :])
+    shape, transform = get("proj:shape"), get("proj:transform")
+    if epsg is None or shape is None or transform is None:
+        raise _MissingMetadata("assets do not have projection info")
+    if transform[1] or transform[3]:
+        raise _MissingMetadata("rotated grids are not supported")
+    return epsg, shape, transform
+
+
+def _spatial_ref(epsg: int) -> xarray.DataArray:
+    pyproj = _import_optional_dependency("pyproj")
+    wkt = pyproj.CRS.from_epsg(epsg).to_wkt()
+    return xarray.DataArray(0, attrs={"crs_wkt": wkt, "spatial_ref": wkt})
+
+
+def _raster_bands(item: pystac.Item, bands: Iterable[str] | None) -> dict[str, dict]:
+    """Assets of an item that hold raster data, keyed by band name"""
+    selected = {}
+    for key, asset in item.assets.items():
+        if bands is not None:
+            if key not in bands:
+                continue
+        elif "data" not in (asset.roles or []) or "raster:bands" not in (
+            asset.extra_fields
+        ):
+            continue
+        selected[key] = asset.extra_fields
+    if not selected:
+        raise _MissingMetadata(f"{item.id} has no raster assets")
+    return selected
+
+
+def _raster_items(
+    items: list[pystac.Item], bands: Iterable[str] | None = None
+) -> xarray.Dataset:
+    """Skeleton of items stacked on their shared grid, like ``odc.stac.load``"""
+    if isinstance(bands, str):
+        bands = [bands]
+
+    epsgs, resolutions, lefts, rights, tops, bottoms, times = [], [], [], [], [], [], []
+    variables: dict[str, dict] = {}
+    for item in items:
+        for band, fields in _raster_bands(item, bands).items():
+            epsg, (height, width), transform = _grid(fields, item.properties)
+            epsgs.append(epsg)
+            resolutions.append((transform[0], transform[4]))
+            lefts.append(transform[2])
+            tops.append(transform[5])
+            rights.append(transform[2] + width * transform[0])
+            bottoms.append(transform[5] + height * transform[4])
+            variables.setdefault(band, fields)
+        times.append(item.datetime or item.common_metadata.start_datetime)
+
+    if len(set(epsgs)) != 1 or len(set(resolutions)) != 1:
+        raise _MissingMetadata("items are not on a shared grid")
+    (epsg,) = set(epsgs)
+    ((dx, dy),) = set(resolutions)
+    if dx <= 0 or dy >= 0:
+        raise _MissingMetadata("only north-up grids are supported")
+
+    x0, x1, y0, y1 = min(lefts), max(rights), max(tops), min(bottoms)
+    nx, ny = int(round((x1 - x0) / dx)), int(round((y1 - y0) / dy))
+    x = x0 + (np.arange(nx) + 0.5) * dx
+    y = y0 + (np.arange(ny) + 0.5) * dy
+
+    import pandas as pd
+
+    time = pd.DatetimeIndex(times)
+    if time.tz is not None:
+        time = time.tz_convert(None)
+    time = time.unique().sort_values()
+
+    shape = (len(time), ny, nx)
+    chunks = (1, *raster_chunks(items[0]))
+    data_vars = {}
+    for band, fields in variables.items():
+        dtype = _data_type(fields)
+        if dtype is None:
+            raise _MissingMetadata(f"the data type of {band} is not known")
+        nodata = (fields.get("raster:bands") or [{}])[0].get("nodata")
+        attrs = {} if nodata is None else {"nodata": nodata}
+        data_vars[band] = (
+            ("time", "y", "x"),
+            _lazy(shape, dtype, chunks, fill_value=nodata),
+            attrs,
+        )
+
+    return xarray.Dataset(
+        data_vars,
+        coords={"time": time.values, "y": y, "x": x, "spatial_ref": _spatial_ref(epsg)},
+    )
+
+
+def _raster_asset(asset: pystac.Asset) -> xarray.Dataset:
+    """Skeleton of a GeoTIFF asset, like opening it with the rasterio engine"""
+    item = asset.owner if isinstance(asset.owner, pystac.Item) else None
+    item_fields = item.properties if item is not None else {}
+    epsg, (height, width), transform = _grid(asset.extra_fields, item_fields)
+
+    raster_bands = asset.extra_fields.get("raster:bands")
+    if not raster_bands or any("data_type" not in b for b in raster_bands):
+        raise _MissingMetadata("the data type of the asset is not known")
+    if len({b["data_type"] for b in raster_bands}) != 1:
+        raise _MissingMetadata("bands have different data types")
+
+    dx, dy = transform[0], transform[4]
+    x = transform[2] + (np.arange(width) + 0.5) * dx
+    y = transform[5] + (np.arange(height) + 0.5) * dy
+    # the rasterio engine masks nodata by default, which promotes to float
+    dtype = np.result_type(raster_bands[0]["data_type"], np.float32)
+    shape = (len(raster_bands), height, width)
+    chunks = plan_chunks(shape, (1, COG_BLOCK, COG_BLOCK), dtype.itemsize)
+    data = _lazy(shape, dtype, chunks)
+    return xarray.Dataset(
+        {"band_data": (("band", "y", "x"), data)},
+        coords={
+            "band": np.arange(1, len(raster_bands) + 1),
+            "y": y,
+            "x": x,
+            "spatial_ref": _spatial_ref(epsg),
+        },
+    )
+
+
+def skeleton(
+    obj: pystac.Asset | pystac.Item | list[pystac.Item],
+    stacking_library: str | None = None,
+    datacube: bool = True,
+    **kwargs,
+):
+    """Dataset with the dims, coords, dtypes and chunks that ``to_xarray``
+    would return, built from the STAC fields alone and backed by empty dask
+    arrays.
+
+    With ``datacube=False`` the datacube fields of items are ignored, as
+    ``to_xarray`` does for kerchunk items when ``allow_kerchunk=False``, and
+    the items are laid out as stacked rasters.
+
+    Raises ``ValueError`` if the fields are not enough, or if ``kwargs``
+    change the dataset in ways the fields cannot tell (its region, grid,
+    chunks or dtypes), in which case the object has to be opened.
+    """
+    if isinstance(obj, pystac.Asset):
+        _check_kwargs(kwargs)
+        if "cube:dimensions" in obj.extra_fields:
+            ds = _datacube(obj.extra_fields)
+        elif obj.media_type == pystac.MediaType.COG:
+            ds = _raster_asset(obj)
+        elif isinstance(obj.owner, pystac.Item) and (
+            "cube:dimensions" in obj.owner.properties
+        ):
+            ds = _datacube(obj.owner.properties)
+        elif isinstance(obj.owner, pystac.Collection) and (
+            "cube:dimensions" in obj.owner.extra_fields
+        ):
+            # --- Collection-level assets are described by their collection
+            ds = _datacube(obj.owner.extra_fields)
+        else:
+            raise _MissingMetadata("asset has no datacube or raster fields")
+    else:
+        items = [obj] if isinstance(obj, pystac.Item) else list(obj)
+        if not items:
+            raise _MissingMetadata("no items")
+        if datacube and "cube:dimensions" in items[0].properties:
+            _check_kwargs(kwargs)
+            ds = _datacube_items(items)
+        else:
+            # --- the skeleton of stacked items is laid out like odc.stac's
+            if stacking_library == "stackstac":
+                raise _MissingMetadata("stackstac datasets are not built from fields")
+            _check_kwargs(kwargs, supported=("bands",))
+            ds = _raster_items(items, kwargs.get("bands"))
+
+    ds.attrs["xpystac:metadata_only"] = True
+    return ds
+
+
+def _check_kwargs(kwargs: dict, supported: tuple[str, ...] = ()):
+    """Raise if ``kwargs`` hold options that the skeleton does not reproduce"""
+    unsupported = sorted(set(kwargs).difference(supported))
+    if unsupported:
+        raise _MissingMetadata(f"{unsupported} are not applied to skeletons")
@@ -0,0 +1,256 @@
+import itertools
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Literal
+
+import pystac
+import xarray
+
+from xpystac._chunks import raster_chunks
+from xpystac.signing import prefetch
+from xpystac.tracing import propagate, stage
+from xpystac.utils import _import_optional_dependency
+
+# kwargs of ``odc.stac.load`` that determine the output grid
+_ODC_GEOBOX_KWARGS = (
+    "crs",
+    "resolution",
+    "anchor",
+    "align",
+    "like",
+    "geopolygon",
+    "bbox",
+    "lon",
+    "lat",
+    "x",
+    "y",
+)
+
+
+def odc_stac_load(
+    items: Iterable[pystac.Item],
+    patch_url: None | Callable[[str], str] = None,
+    **kwargs,
+) -> xarray.Dataset:
+    odc_stac = _import_optional_dependency("odc.stac")
+    items = prefetch(patch_url, items)
+    if "chunks" not in kwargs:
+        if isinstance(items, Iterator):
+            # peek at the first item without dropping it from the iterator
+            first = next(items)
+            items = itertools.chain([first], items)
+        else:
+            first = next(iter(items))
+        cy, cx = raster_chunks(first, kwargs.get("dtype"))
+        kwargs["chunks"] = {"x": cx, "y": cy}
+    with stage("stack", library="odc.stac"):
+        return odc_stac.load(items, **{"patch_url": patch_url, **kwargs})
+
+
+def stackstac_stack(
+    obj: pystac.Item | Iterable[pystac.Item],
+    patch_url: None | Callable[[str], str] = None,
+    **kwargs,
+) -> xarray.DataArray:
+    stackstac = _import_optional_dependency("stackstac")
+    if patch_url:
+        if isinstance(obj, pystac.STACObject):
+            obj = patch_url(obj)
+        else:
+            obj = [patch_url(o) for o in prefetch(patch_url, list(obj))]
+    elif not isinstance(obj, (pystac.Item, pystac.ItemCollection, list)):
+        obj = list(obj)
+    if "chunksize" not in kwargs:
+        first = obj if isinstance(obj, pystac.Item) else next(iter(obj))
+        kwargs["chunksize"] = raster_chunks(first, kwargs.get("dtype", "float64"))
+    with stage("stack", library="stackstac"):
+        return stackstac.stack(obj, **kwargs)
+
+
+def stackstac_to_dataset(da: xarray.DataArray) -> xarray.Dataset:
+    """Split the band dimension of a stackstac DataArray into variables.
+
+    Coordinates that vary only along ``band`` (and scalar coordinates) are
+    moved into the attrs of each band variable. Their values are pulled into
+    Python once for all bands rather than once per band.
+    """
+    band_coords = [k for k, v in da.coords.items() if v.dims == ("band",)]
+    scalar_coords = [k for k, v in da.coords.items() if v.ndim == 0]
+
+    shared_attrs = {
+        k: value
+        for k in scalar_coords
+        if (value := da.coords[k].values.item()) is not None
+    }
+    band_values = {k: da.coords[k].values.tolist() for k in band_coords}
+
+    axis = da.get_axis_num("band")
+    dims = da.dims[:axis] + da.dims[axis + 1 :]
+    bands = {}
+    for i, band in enumerate(band_values["band"]):
+        attrs = {
+            **da.attrs,
+            **shared_attrs,
+            **{k: v[i] for k, v in band_values.items() if v[i] is not None},
+        }
+        data = da.data[(slice(None),) * axis + (i,)]
+        bands[band] = xarray.Variable(dims, data, attrs)
+
+    coords = da.coords.to_dataset().drop_vars(band_coords + scalar_coords).coords
+    return xarray.Dataset(bands, coords=coords, attrs=da.attrs)
+
+
+def partition_items(
+    items: list[pystac.Item], partition: int | str, keys: list | None = None
+) -> list[list[pystac.Item]]:
+    """Split items, sorted by datetime, into partitions.
+
+    ``partition`` is either a number of items per partition or a pandas
+    frequency string (e.g. ``"1MS"``) used as the time window of each
+    partition. Items with the same key in ``keys`` (their datetime by
+    default) always end up in the same partition so that they can still be
+    grouped together. Items are sorted by key first, like the groups of
+    ``odc.stac.load``, and time windows start with the first item of each
+    group.
+    """
+    import pandas as pd
+
+    times = pd.DatetimeIndex(
+        [item.datetime or item.common_metadata.start_datetime for item in items]
+    )
+    if times.tz is not None:
+        times = times.tz_convert(None)
+    group_keys = list(times) if keys is None else keys
+    order = sorted(range(len(items)), key=lambda i: (group_keys[i], times[i]))
+    groups = [
+        list(group)
+        for _, group in itertools.groupby(order, key=lambda i: group_keys[i])
+    ]
+
+    if isinstance(partition, str):
+        starts = times[[group[0] for group in groups]]
+        windows = pd.Series(range(len(groups)), index=starts).resample(partition)
+        return [
+            [items[i] for g in window for i in groups[g]]
+            for _, window in windows
+            if len(window)
+        ]
+
+    if partition < 1:
+        raise ValueError(f"{partition=} must be a positive number of items")
+    partitions: list[list[pystac.Item]] = []
+    for group in groups:
+        if not partitions or len(partitions[-1]) >= partition:
+            partitions.append([])
+        partitions[-1].extend(items[i] for i in group)
+    return partitions
+
+
+def _odc_group_keys(items: list[pystac.Item], geobox, groupby) -> list:
+    """Keys that ``odc.stac.load`` groups items by into time steps, with
+    the solar day taken at the centre of ``geobox`` like it does"""
+    odc_stac = _import_optional_dependency("odc.stac")
+    if groupby is None or groupby == "id":
+        return list(range(len(items)))
+    if isinstance(groupby, str) and groupby not in ("time", "solar_day"):
+        return [item.properties.get(groupby) for item in items]
+
+    parsed = list(odc_stac.parse_items(items))
+    if callable(groupby):
+        return [groupby(*args) for args in zip(items, parsed, range(len(items)))]
+    if groupby == "time":
+        return [p.nominal_datetime for p in parsed]
+    ((lon, _),) = geobox.extent.centroid.to_crs("epsg:4326").points
+    return [p.solar_date_at(lon).date() for p in parsed]
+
+
+def _odc_stac_grid(items: list[pystac.Item], **kwargs) -> dict:
+    """Replace the grid kwargs of ``odc.stac.load`` with the geobox of all items"""
+    if kwargs.get("geobox") is not None:
+        return kwargs
+
+    odc_stac = _import_optional_dependency("odc.stac")
+    geobox_kwargs = {k: kwargs.pop(k) for k in _ODC_GEOBOX_KWARGS if k in kwargs}
+    if "intersects" in kwargs:
+        geobox_kwargs.setdefault("geopolygon", kwargs.pop("intersects"))
+    bands = kwargs.get("bands")
+    if isinstance(bands, str):
+        bands = [bands]
+
+    parsed = list(odc_stac.parse_items(items))
+    geobox = odc_stac.output_geobox(parsed, bands=bands, **geobox_kwargs)
+    return {**kwargs, "geobox": geobox}
+
+
+def _stackstac_grid(items: list, **kwargs) -> dict:
+    """Replace the grid kwargs of ``stackstac.stack`` with the grid of all items"""
+    from stackstac.prepare import prepare_items
+    from stackstac.stac_types import items_to_plain
+
+    grid_kwargs: dict[str, Any] = {
+        k: kwargs.pop(k)
+        for k in ("epsg", "resolution", "bounds", "bounds_latlon", "snap_bounds")
+        if k in kwargs
+    }
+    if "assets" in kwargs:
+        grid_kwargs["assets"] = kwargs["assets"]
+
+    _, spec, _, _ = prepare_items(items_to_plain(items), **grid_kwargs)
+    return {
+        **kwargs,
+        "epsg": spec.epsg,
+        "resolution": spec.resolutions_xy,
+        "bounds": spec.bounds,
+        "snap_bounds": False,
+    }
+
+
+def stack_partitioned(
+    items: list[pystac.Item],
+    stacking_library: Literal["odc.stac", "stackstac"],
+    partition: int | str,
+    max_workers: int | None = None,
+    patch_url: None | Callable[[Any], Any] = None,
+    **kwargs,
+) -> xarray.Dataset:
+    """Stack items one partition at a time and concatenate along time.
+
+    The output grid is computed once from all the items and shared by every
+    partition, so each partition only builds the dask graph for its own
+    items and the partial cubes line up without reindexing.
+    """
+    items = prefetch(patch_url, items)
+    if stacking_library == "odc.stac":
+        with stage("grid", library=stacking_library, n_items=len(items)):
+            kwargs = _odc_stac_grid(items, **kwargs)
+        # --- Items of one time step must be loaded by the same partition
+        keys = _odc_group_keys(items, kwargs["geobox"], kwargs.get("groupby", "time"))
+        partitions = partition_items(items, partition, keys)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            datasets = list(
+                pool.map(
+                    propagate(lambda p: odc_stac_load(p, patch_url, **kwargs)),
+                    partitions,
+                )
+            )
+        return xarray.concat(
+            datasets,
+            dim="time",
+            coords="minimal",
+            compat="override",
+            join="override",
+            combine_attrs="override",
+        )
+
+    if patch_url:
+        items = [patch_url(item) for item in items]
+    partitions = partition_items(items, partition)
+    with stage("grid", library=stacking_library, n_items=len(items)):
+        kwargs = _stackstac_grid(items, **kwargs)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        arrays = list(
+            pool.map(propagate(lambda p: stackstac_stack(p, **kwargs)), partitions)
+        )
+    da = xarray.concat(arrays, dim="time", join="override", combine_attrs="override")
+    with stage("split_bands"):
+        return stackstac_to_dataset(da)
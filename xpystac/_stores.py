@@ -0,0 +1,181 @@
+"""Stacking of items whose data lives in zarr or icechunk stores.
+
+Such items hold a whole datacube each (one model run, one day of a
+reanalysis) rather than one file per band, which is not what odc.stac and
+stackstac are built for. Instead the store of each item is opened lazily
+through the Asset reader, on a thread pool, and the datasets are
+concatenated once their schemas have been checked against the first one.
+"""
+
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pystac
+import xarray
+
+from xpystac.plan import is_recording, record, recording
+from xpystac.tracing import propagate, stage
+
+STORE_MEDIA_TYPES = (
+    "application/vnd+zarr",
+    "application/vnd.zarr",
+    "application/vnd.zarr+icechunk",
+)
+
+
+def _is_raster(asset: pystac.Asset) -> bool:
+    """Whether an asset is a GeoTIFF, or has the fields of one"""
+    media_type = asset.media_type or ""
+    return media_type.startswith("image/tiff") or "raster:bands" in asset.extra_fields
+
+
+def store_asset_key(item: pystac.Item) -> str | None:
+    """Key of the zarr or icechunk asset holding the data of an item, if any.
+
+    That is a store with the ``data`` role or, for items without raster
+    assets for the stacking libraries, the first store of any role.
+    """
+    keys = [k for k, a in item.assets.items() if a.media_type in STORE_MEDIA_TYPES]
+    data = [k for k in keys if "data" in (item.assets[k].roles or [])]
+    if data:
+        return data[0]
+    # --- Stores of other roles, like overviews, are not the data of COG items
+    if any(_is_raster(a) for a in item.assets.values()):
+        return None
+    return next(iter(keys), None)
+
+
+def _schema(ds: xarray.Dataset, dim: str) -> tuple:
+    """Names, dims and dtypes of the variables of a dataset and its sizes
+    along every dim but ``dim``"""
+    return (
+        sorted((k, v.dims, v.dtype.str) for k, v in ds.variables.items()),
+        sorted((d, n) for d, n in ds.sizes.items() if d != dim),
+    )
+
+
+def _item_times(items: list[pystac.Item]) -> np.ndarray | None:
+    """Datetimes of the items as naive UTC, or None if one of them has none"""
+    times = [i.datetime or i.common_metadata.start_datetime for i in items]
+    if any(t is None for t in times):
+        return None
+    index = pd.DatetimeIndex(times)
+    if index.tz is not None:
+        index = index.tz_convert(None)
+    return index.values
+
+
+def stack_stores(
+    items: list[pystac.Item],
+    open_asset: Callable[[pystac.Asset], xarray.Dataset],
+    key: str | None = None,
+    concat_dim: str = "time",
+    max_workers: int | None = None,
+) -> xarray.Dataset:
+    """Open the ``key`` store asset of every item with ``open_asset`` and
+    concatenate the datasets with ``combine_stores``."""
+    if key is None:
+        key = store_asset_key(items[0])
+        if key is None:
+            raise ValueError(f"item {items[0].id!r} has no store asset to open")
+    missing = [item.id for item in items if key not in item.assets]
+    if missing:
+        raise ValueError(f"items {missing} have no {key!r} asset")
+
+    planning = is_recording()
+
+    def open_item(item: pystac.Item):
+        if not planning:
+            return open_asset(item.assets[key]), None
+        with recording() as steps:
+            ds = open_asset(item.assets[key])
+        return ds, steps[-1] if steps else None
+
+    with stage("open_stores", n_items=len(items)):
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            datasets, plans = zip(*pool.map(propagate(open_item), items))
+
+    ids = [item.id for item in items]
+    times = _item_times(items)
+    record(
+        "stores",
+        plans=list(plans),
+        ids=ids,
+        times=times,
+        concat_dim=concat_dim,
+        max_workers=max_workers,
+    )
+    return combine_stores(list(datasets), ids, times, concat_dim)
+
+
+def open_planned_stores(
+    plans: list,
+    ids: list[str],
+    times: np.ndarray | None,
+    concat_dim: str,
+    max_workers: int | None,
+) -> xarray.Dataset:
+    """Reopen the stores recorded by ``stack_stores`` from their plans"""
+    if any(plan is None for plan in plans):
+        raise ValueError("some of the stores were opened without a plan")
+    with stage("open_stores", n_items=len(plans)):
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            datasets = list(pool.map(propagate(lambda plan: plan.open()), plans))
+    return combine_stores(datasets, ids, times, concat_dim)
+
+
+def combine_stores(
+    datasets: list[xarray.Dataset],
+    ids: list[str],
+    times: np.ndarray | None,
+    concat_dim: str = "time",
+) -> xarray.Dataset:
+    """Concatenate the stores of items with ``ids`` along ``concat_dim``.
+
+    Stores that already have ``concat_dim`` are ordered by its first value.
+    Stores without it gain it from the ``times`` of their items, or are
+    stacked along a new ``item`` dim when the items have no datetime. The
+    other coordinates are only aligned when they differ between stores;
+    when they all match, those of the first store are used as they are.
+    """
+    with stage("combine_stores", n_items=len(datasets)) as s:
+        first = datasets[0]
+        schema = _schema(first, concat_dim)
+        for id, ds in zip(ids[1:], datasets[1:]):
+            if _schema(ds, concat_dim) != schema:
+                raise ValueError(
+                    f"the store of {id} does not have the same variables, "
+                    f"dtypes or sizes as the one of {ids[0]}"
+                )
+
+        if concat_dim in first.dims:
+            starts = [ds[concat_dim].values[0] for ds in datasets]
+            datasets = [datasets[i] for i in np.argsort(starts, kind="stable")]
+        elif times is not None:
+            order = np.argsort(times, kind="stable")
+            datasets = [
+                datasets[i].expand_dims({concat_dim: times[i : i + 1]}) for i in order
+            ]
+        else:
+            concat_dim = "item"
+            datasets = [ds.expand_dims({"item": [id]}) for id, ds in zip(ids, datasets)]
+
+        # --- Only reindex when the coordinates of the stores disagree
+        aligned = all(
+            ds.indexes[d].equals(first.indexes[d])
+            for ds in datasets
+            for d in first.indexes
+            if d != concat_dim
+        )
+        s.record(dim=concat_dim, aligned=aligned)
+        return xarray.concat(
+            datasets,
+            dim=concat_dim,
+            data_vars="minimal",
+            coords="minimal",
+            compat="override",
+            join="override" if aligned else "outer",
+            combine_attrs="override",
+        )
@@ -1,4 +1,6 @@
+import base64
 import json
+from collections.abc import Sequence
 from typing import Any, Dict
 
 import pystac
@@ -26,3 +28,187 @@ def _stac_to_kerchunk(item: pystac.Item, kerchunk_version: int = 1) -> Dict[str,
 
     d = {"version": kerchunk_version, "refs": refs}
     return d
+
+
+# attributes of the concat coordinate that must agree for its raw values to be
+# concatenated without re-encoding
+_CONCAT_ENCODING_ATTRS = ("units", "calendar", "scale_factor", "add_offset")
+
+
+class _IncompatibleItems(ValueError):
+    """Raised when items cannot be combined without MultiZarrToZarr"""
+
+
+def _decode_inline_chunk(zarray: dict, value: Any):
+    """Decode a chunk that is stored inline in the kerchunk references"""
+    import numcodecs
+    import numpy as np
+
+    if isinstance(value, list):
+        raise _IncompatibleItems("concat coordinate is not stored inline")
+    if value.startswith("base64:"):
+        data = base64.b64decode(value[len("base64:") :])
+    else:
+        data = value.encode()
+
+    if zarray.get("compressor"):
+        data = numcodecs.get_codec(zarray["compressor"]).decode(data)
+    for f in reversed(zarray.get("filters") or []):
+        data = numcodecs.get_codec(f).decode(data)
+
+    arr = np.frombuffer(data, dtype=zarray["dtype"])
+    return arr.reshape(zarray["chunks"], order=zarray.get("order", "C"))
+
+
+def _concat_coordinate(name: str, cubes: list[dict]):
+    """Decode the inline values of the concat coordinate for every item"""
+
+    first = cubes[0][name]
+    zarray = first["kerchunk:zarray"]
+    if len(zarray["shape"]) != 1:
+        raise _IncompatibleItems(f"{name} is not one-dimensional")
+
+    encoding = {k: first["kerchunk:zattrs"].get(k) for k in _CONCAT_ENCODING_ATTRS}
+    values = []
+    for cube in cubes:
+        dim = cube[name]
+        if {
+            k: dim["kerchunk:zattrs"].get(k) for k in _CONCAT_ENCODING_ATTRS
+        } != encoding:
+            raise _IncompatibleItems(f"{name} is encoded differently across items")
+        item_zarray = dim["kerchunk:zarray"]
+        if len(dim["kerchunk:value"]) != 1 or item_zarray["dtype"] != zarray["dtype"]:
+            raise _IncompatibleItems(f"{name} must be a single chunk of one dtype")
+        (value,) = dim["kerchunk:value"].values()
+        chunk = _decode_inline_chunk(item_zarray, value)
+        values.append(chunk[: item_zarray["shape"][0]])
+
+    return values
+
+
+def _chunk_key(key: str, sep: str, offset: int, axis: int | None, ndim: int) -> str:
+    """Shift or prepend the chunk index along the concat axis"""
+    if axis is None:
+        # the concat axis is a new leading axis
+        return f"{offset}{sep}{key}" if ndim else str(offset)
+    parts = key.split(sep)
+    parts[axis] = str(int(parts[axis]) + offset)
+    return sep.join(parts)
+
+
+def _stac_to_kerchunk_combined(
+    items: Sequence[pystac.Item], concat_dim: str = "time", kerchunk_version: int = 1
+) -> Dict[str, Any]:
+    """Derive combined Kerchunk indices for many STAC items along ``concat_dim``.
+
+    This is a fast path for the common case where every item describes the
+    same arrays (same ``kerchunk:zarray`` and ``kerchunk:zattrs``) and only
+    the chunk references differ. The datacube metadata of the first item is
+    used as a template and serialized once, the values of the concat
+    coordinate are decoded in memory and the chunk keys of every other item
+    are written into the output with their index along ``concat_dim`` shifted.
+
+    Raises ``ValueError`` if the items cannot be combined this way, in which
+    case ``kerchunk.combine.MultiZarrToZarr`` should be used instead.
+    """
+    import numpy as np
+
+    if not items:
+        raise _IncompatibleItems("no items to combine")
+
+    cubes = [
+        {**item.properties["cube:dimensions"], **item.properties["cube:variables"]}
+        for item in items
+    ]
+    template = cubes[0]
+    if concat_dim not in template:
+        raise _IncompatibleItems(f"{concat_dim} is not a dimension of the datacube")
+    for cube in cubes[1:]:
+        if cube.keys() != template.keys():
+            raise _IncompatibleItems("items do not share the same arrays")
+
+    # --- Order the items by the values of the concat coordinate
+    values = _concat_coordinate(concat_dim, cubes)
+    length = len(values[0])
+    if any(len(v) != length for v in values) or length == 0:
+        raise _IncompatibleItems(f"items have different lengths along {concat_dim}")
+    order = np.argsort([v[0] for v in values], kind="stable")
+    coord = np.concatenate([values[i] for i in order])
+    if np.unique(coord).size != coord.size:
+        raise _IncompatibleItems(f"items have overlapping values of {concat_dim}")
+    n_items = len(items)
+
+    first_props = items[0].properties
+    refs: Dict[str, Any] = {
+        ".zgroup": json.dumps(first_props["kerchunk:zgroup"]),
+        ".zattrs": json.dumps(first_props["kerchunk:zattrs"]),
+    }
+
+    coord_zarray = {
+        **template[concat_dim]["kerchunk:zarray"],
+        "shape": [coord.size],
+        "chunks": [coord.size],
+        "compressor": None,
+        "filters": None,
+        "order": "C",
+    }
+    refs[f"{concat_dim}/.zarray"] = json.dumps(coord_zarray)
+    refs[f"{concat_dim}/.zattrs"] = json.dumps(template[concat_dim]["kerchunk:zattrs"])
+    refs[f"{concat_dim}/0"] = "base64:" + base64.b64encode(coord.tobytes()).decode()
+
+    dimensions = first_props["cube:dimensions"]
+    for name, meta in template.items():
+        if name == concat_dim:
+            continue
+
+        zarray = meta["kerchunk:zarray"]
+        zattrs = meta["kerchunk:zattrs"]
+        array_dims = zattrs.get("_ARRAY_DIMENSIONS", [])
+        for cube in cubes[1:]:
+            if (
+                cube[name]["kerchunk:zarray"] != zarray
+                or cube[name]["kerchunk:zattrs"] != zattrs
+            ):
+                raise _IncompatibleItems(f"{name} differs across items")
+
+        # --- Other coordinates are taken from the first item
+        if name in dimensions:
+            refs[f"{name}/.zarray"] = json.dumps(zarray)
+            refs[f"{name}/.zattrs"] = json.dumps(zattrs)
+            refs.update({f"{name}/{k}": v for k, v in meta["kerchunk:value"].items()})
+            continue
+
+        sep = zarray.get("dimension_separator", ".")
+        if concat_dim in array_dims:
+            index = array_dims.index(concat_dim)
+            chunk = zarray["chunks"][index]
+            if length % chunk:
+                raise _IncompatibleItems(f"{name} chunks do not tile {concat_dim}")
+            step = length // chunk
+            shape = list(zarray["shape"])
+            shape[index] = length * n_items
+            axis: int | None = index
+            new_zarray = {**zarray, "shape": shape}
+            new_zattrs = zattrs
+        else:
+            # --- Variables without the concat dimension gain it as a leading axis
+            if length != 1:
+                raise _IncompatibleItems(f"{name} does not have {concat_dim}")
+            axis = None
+            step = 1
+            new_zarray = {
+                **zarray,
+                "shape": [n_items, *zarray["shape"]],
+                "chunks": [1, *zarray["chunks"]],
+            }
+            new_zattrs = {**zattrs, "_ARRAY_DIMENSIONS": [concat_dim, *array_dims]}
+
+        refs[f"{name}/.zarray"] = json.dumps(new_zarray)
+        refs[f"{name}/.zattrs"] = json.dumps(new_zattrs)
+        for position, i in enumerate(order):
+            offset = int(position) * step
+            for key, value in cubes[i][name]["kerchunk:value"].items():
+                new_key = _chunk_key(key, sep, offset, axis, len(zarray["shape"]))
+                refs[f"{name}/{new_key}"] = value
+
+    return {"version": kerchunk_version, "refs": refs}
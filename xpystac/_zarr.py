@@ -0,0 +1,261 @@
+import json
+import posixpath
+import threading
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from zarr.storage import FsspecStore, LocalStore, WrapperStore
+
+from xpystac.tracing import stage
+from xpystac.utils import _import_optional_dependency, _local_path
+
+# names of the metadata documents of each zarr format
+_V2_METADATA = (".zgroup", ".zarray", ".zattrs")
+_V3_METADATA = "zarr.json"
+_METADATA = (*_V2_METADATA, ".zmetadata", _V3_METADATA)
+
+# --- Process-wide memo of the layout of every zarr store that was opened
+_lock = threading.Lock()
+_layouts: dict[str, dict[str, Any]] = {}
+
+
+def clear_zarr_cache():
+    """Forget the detected zarr format and consolidation of every store"""
+    with _lock:
+        _layouts.clear()
+
+
+def _url_to_fs(href: str, storage_options: dict | None):
+    fsspec = _import_optional_dependency("fsspec")
+    return fsspec.core.url_to_fs(href, **(storage_options or {}))
+
+
+def detect_layout(href: str, storage_options: dict | None = None) -> dict[str, Any]:
+    """Find the zarr format of a store and whether it has consolidated
+    metadata, remembering the answer per href.
+
+    Costs one read for zarr v3 stores (the root ``zarr.json``) and two or
+    three for v2 stores. When ``href`` holds no zarr metadata at all, both
+    keys are None and nothing is remembered, so that opening the store
+    raises as usual.
+    """
+    # signed urls of the same store only differ by their query
+    key = href.partition("?")[0]
+    with _lock:
+        if key in _layouts:
+            return _layouts[key]
+
+    with stage("detect_consolidated", href=href) as s:
+        fs, root = _url_to_fs(href, storage_options)
+        try:
+            root_metadata = json.loads(fs.cat_file(f"{root}/{_V3_METADATA}"))
+        except FileNotFoundError:
+            if fs.exists(f"{root}/.zmetadata"):
+                layout = {"zarr_format": 2, "consolidated": True}
+            elif any(fs.exists(f"{root}/{name}") for name in (".zgroup", ".zarray")):
+                layout = {"zarr_format": 2, "consolidated": False}
+            else:
+                # --- not a store, or not written yet
+                s.record(zarr_format=None)
+                return {"zarr_format": None, "consolidated": None}
+        else:
+            layout = {
+                "zarr_format": 3,
+                "consolidated": root_metadata.get("consolidated_metadata") is not None,
+            }
+        s.record(**layout)
+
+    with _lock:
+        _layouts[key] = layout
+    return layout
+
+
+def consolidate(href: str, zarr_format: int, storage_options: dict | None = None):
+    """Gather the metadata of every node of a store into one document.
+
+    Returns the ``.zmetadata`` document of a v2 store or the root
+    ``zarr.json`` with inline ``consolidated_metadata`` of a v3 store. This
+    lists the whole store once, so the result is meant to be persisted.
+    """
+    fs, root = _url_to_fs(href, storage_options)
+    root = root.rstrip("/")
+    names = _V2_METADATA if zarr_format == 2 else (_V3_METADATA,)
+
+    with stage("consolidate", href=href) as s:
+        paths = [p for p in fs.find(root) if posixpath.basename(p) in names]
+        contents = fs.cat(paths)
+        s.record(requests=len(paths) + 1)
+    metadata = {
+        posixpath.relpath(path, root): json.loads(data)
+        for path, data in contents.items()
+    }
+
+    if zarr_format == 2:
+        return {"zarr_consolidated_format": 1, "metadata": metadata}
+
+    root_metadata = metadata.pop(_V3_METADATA)
+    nodes = {
+        posixpath.dirname(path): doc
+        for path, doc in metadata.items()
+        if posixpath.dirname(path)
+    }
+    return {
+        **root_metadata,
+        "consolidated_metadata": {
+            "kind": "inline",
+            "must_understand": False,
+            "metadata": nodes,
+        },
+    }
+
+
+class SidecarStore(WrapperStore):
+    """Read-only store that serves metadata documents kept outside of it"""
+
+    def __init__(self, store, documents: dict[str, bytes]):
+        super().__init__(store)
+        self._documents = documents
+
+    def _with_store(self, store):
+        return type(self)(store, self._documents)
+
+    async def get(self, key, prototype, byte_range=None):
+        if key in self._documents:
+            # metadata documents are always read whole
+            return prototype.buffer.from_bytes(self._documents[key])
+        return await self._store.get(key, prototype, byte_range)
+
+    async def exists(self, key):
+        return key in self._documents or await self._store.exists(key)
+
+
+class ChunkCacheStore(WrapperStore):
+    """Read-only store that serves chunks from a ``ChunkCache``.
+
+    ``resolve`` maps the key of a chunk to where it really lives, which is
+    what the chunk is cached under. Keys resolved to None, like the metadata
+    documents, are always read from the wrapped store.
+    """
+
+    def __init__(self, store, cache, resolve: Callable[[str], Hashable | None]):
+        super().__init__(store)
+        self._cache = cache
+        self._resolve = resolve
+
+    def _with_store(self, store):
+        return type(self)(store, self._cache, self._resolve)
+
+    async def get(self, key, prototype, byte_range=None):
+        location = None
+        if posixpath.basename(key) not in _METADATA:
+            location = self._resolve(key)
+        if location is None:
+            return await self._store.get(key, prototype, byte_range)
+
+        cache_key = (location, repr(byte_range))
+        data = self._cache.get(cache_key)
+        if data is not None:
+            return prototype.buffer.from_bytes(data)
+        buffer = await self._store.get(key, prototype, byte_range)
+        if buffer is not None:
+            self._cache.set(cache_key, buffer.to_bytes())
+        return buffer
+
+
+def with_chunk_cache(store, *location: Hashable) -> Any:
+    """Wrap a zarr store with the installed chunk cache, if any.
+
+    Chunks are cached under ``location`` (the href of the store without its
+    query, which only holds signatures, and its version) and their key.
+    Stores over kerchunk references cache chunks under the file and byte
+    range they point to instead.
+    """
+    from xpystac.cache import get_chunk_cache
+
+    cache = get_chunk_cache()
+    if cache is None:
+        return store
+
+    references = getattr(getattr(store, "fs", None), "references", None)
+    if references is not None:
+
+        def resolve(key):
+            ref = references.get(key)
+            if not isinstance(ref, (list, tuple)):
+                # inline data is already in memory
+                return None
+            url, *byte_range = ref
+            return (url.partition("?")[0], *byte_range)
+
+    else:
+
+        def resolve(key):
+            return (*location, key)
+
+    return ChunkCacheStore(store, cache, resolve)
+
+
+def plain_reference_store(refs: dict, **storage_options):
+    """Read-only zarr store over a ``ReferenceFileSystem``, created async
+    like the one of ``reference_store``"""
+    from fsspec.implementations.reference import ReferenceFileSystem
+
+    fs = ReferenceFileSystem(
+        refs, asynchronous=True, skip_instance_cache=True, **storage_options
+    )
+    return FsspecStore(fs, read_only=True, path="")
+
+
+def zarr_store(href: str, storage_options: dict | None = None):
+    """Read-only zarr store for an href, on the local filesystem or through
+    fsspec"""
+    path = _local_path(href)
+    if path is not None:
+        return LocalStore(path, read_only=True)
+    return FsspecStore.from_url(href, storage_options=storage_options, read_only=True)
+
+
+def _sidecar_store(
+    href: str, zarr_format: int, document: dict, storage_options: dict | None
+) -> SidecarStore:
+    if zarr_format == 2:
+        # --- the root group documents are read along with .zmetadata
+        documents = {k: v for k, v in document["metadata"].items() if k in _V2_METADATA}
+        documents[".zmetadata"] = document
+    else:
+        documents = {_V3_METADATA: document}
+
+    store = FsspecStore.from_url(href, storage_options=storage_options, read_only=True)
+    return SidecarStore(
+        store, {k: json.dumps(v).encode() for k, v in documents.items()}
+    )
+
+
+def zarr_open_args(
+    href: str,
+    storage_options: dict | None = None,
+    cache: Any = None,
+) -> tuple[Any, dict[str, Any]]:
+    """Get what to pass to ``xarray.open_dataset`` to open a zarr store with
+    the fewest metadata reads.
+
+    Consolidated stores are opened as such. When a ``ReferenceCache`` is
+    given, the metadata of unconsolidated stores is consolidated once,
+    persisted in the cache and served from there on the following opens.
+
+    Returns the store (or href) to open and the zarr kwargs.
+    """
+    layout = detect_layout(href, storage_options)
+    zarr_format = layout["zarr_format"]
+    if zarr_format is None or layout["consolidated"] or cache is None:
+        return href, {
+            "zarr_format": zarr_format,
+            "consolidated": layout["consolidated"],
+        }
+
+    key = cache.key({"zarr": href.partition("?")[0], "zarr_format": zarr_format})
+    document = cache.get_or_set(
+        key, lambda: consolidate(href, zarr_format, storage_options)
+    )
+    store = _sidecar_store(href, zarr_format, document, storage_options)
+    return store, {"zarr_format": zarr_format, "consolidated": True}
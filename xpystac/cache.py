@@ -0,0 +1,322 @@
+import datetime
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from pathlib import Path
+from typing import Any
+
+# every entry starts with the time at which it was written
+_HEADER = struct.Struct(">d")
+_SUFFIX = ".refs"
+_CHUNK_SUFFIX = ".chunk"
+
+
+class ReferenceCache:
+    """On-disk cache of translated kerchunk references.
+
+    Entries are keyed by a hash of the STAC JSON that produced them, so
+    reopening the same items or assets skips both fetching the reference file
+    and combining the per-item references. Entries are stored as compressed
+    JSON, evicted least-recently-used first once the cache grows past
+    ``max_size`` bytes and ignored once they are older than ``ttl``.
+
+    Parameters
+    ----------
+    directory : str or Path
+        Where to store the cache. Created if it does not exist.
+    max_size : int, (1 GiB by default)
+        Maximum total size of the entries in bytes.
+    ttl : float or timedelta, optional (1 day by default)
+        Maximum age of an entry. In seconds if given as a float. Pass
+        ``None`` to keep entries until they are evicted.
+
+    Examples
+    --------
+    >>> cache = ReferenceCache("~/.cache/xpystac")
+    >>> ds = to_xarray(item_collection, cache=cache)
+    >>> cache.stats
+    {'hits': 0, 'misses': 1, 'entries': 1, 'size': 5013}
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike,
+        max_size: int = 2**30,
+        ttl: float | datetime.timedelta | None = datetime.timedelta(days=1),
+    ):
+        self.directory = Path(directory).expanduser()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        if isinstance(ttl, datetime.timedelta):
+            ttl = ttl.total_seconds()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"ReferenceCache({str(self.directory)!r})"
+
+    @staticmethod
+    def key(obj: Any) -> str:
+        """Hash of the canonical JSON representation of ``obj``"""
+        data = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{_SUFFIX}"
+
+    def _entries(self) -> list[os.DirEntry]:
+        return [e for e in os.scandir(self.directory) if e.name.endswith(_SUFFIX)]
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Return the references stored under ``key`` or None"""
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            self._count(hit=False)
+            return None
+
+        (written,) = _HEADER.unpack_from(data)
+        if self.ttl is not None and time.time() - written > self.ttl:
+            path.unlink(missing_ok=True)
+            self._count(hit=False)
+            return None
+
+        # bump the access time used for LRU eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self._count(hit=True)
+        return json.loads(zlib.decompress(data[_HEADER.size :]))
+
+    def set(self, key: str, refs: dict[str, Any]):
+        """Store ``refs`` under ``key`` and evict old entries if needed"""
+        payload = zlib.compress(json.dumps(refs, separators=(",", ":")).encode())
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(time.time()))
+            f.write(payload)
+        os.replace(tmp, self._path(key))
+        self._evict()
+
+    def get_or_set(
+        self, key: str, func: Callable[[], dict[str, Any]]
+    ) -> dict[str, Any]:
+        """Return the references under ``key``, computing them with ``func``
+        and storing them if they are not in the cache."""
+        refs = self.get(key)
+        if refs is None:
+            refs = func()
+            self.set(key, refs)
+        return refs
+
+    def clear(self):
+        """Remove every entry and reset the counters"""
+        for entry in self._entries():
+            Path(entry.path).unlink(missing_ok=True)
+        with self._lock:
+            self.hits = self.misses = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "size": sum(e.stat().st_size for e in entries),
+        }
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda e: e.stat().st_mtime)
+        size = sum(e.stat().st_size for e in entries)
+        for entry in entries:
+            if size <= self.max_size:
+                break
+            size -= entry.stat().st_size
+            Path(entry.path).unlink(missing_ok=True)
+
+
+class ChunkCache:
+    """Bounded in-memory cache of the chunks read from zarr stores.
+
+    Chunks are kept as the bytes read from the store, keyed by the resolved
+    location of the chunk (store href or referenced file and range, chunk
+    key and version), and evicted least-recently-used first once they take
+    more than ``max_size`` bytes. When a ``directory`` is given, evicted
+    chunks spill to files there, up to ``max_disk_size`` bytes, and are
+    read back from disk instead of from the store. The spilled files only
+    live as long as the cache.
+
+    The cache is used by every zarr, kerchunk and icechunk store opened by
+    ``to_xarray`` once it is installed with ``set_chunk_cache``.
+
+    Parameters
+    ----------
+    max_size : int, (256 MiB by default)
+        Maximum total size in bytes of the chunks kept in memory.
+    directory : str or Path, optional
+        Where to spill chunks evicted from memory. Created if it does not
+        exist. Chunks are dropped on eviction when not given.
+    max_disk_size : int, (1 GiB by default)
+        Maximum total size in bytes of the spilled chunks.
+
+    Examples
+    --------
+    >>> set_chunk_cache(ChunkCache(2**30, directory="/tmp/xpystac-chunks"))
+    >>> to_xarray(asset).load()
+    >>> to_xarray(asset).load()
+    >>> get_chunk_cache().stats
+    {'hits': 12, 'disk_hits': 0, 'misses': 12, 'hit_rate': 0.5, ...}
+    """
+
+    def __init__(
+        self,
+        max_size: int = 2**28,
+        directory: str | os.PathLike | None = None,
+        max_disk_size: int = 2**30,
+    ):
+        self.max_size = max_size
+        self.max_disk_size = max_disk_size
+        self.directory = None
+        if directory is not None:
+            self.directory = Path(directory).expanduser()
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.hits = self.disk_hits = self.misses = 0
+        self._memory: OrderedDict[Hashable, bytes] = OrderedDict()
+        self._disk: OrderedDict[Hashable, int] = OrderedDict()
+        self._size = self._disk_size = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"ChunkCache(max_size={self.max_size})"
+
+    def _path(self, key: Hashable) -> Path:
+        assert self.directory is not None
+        name = hashlib.sha256(repr(key).encode()).hexdigest()
+        return self.directory / f"{name}{_CHUNK_SUFFIX}"
+
+    def get(self, key: Hashable) -> bytes | None:
+        """Return the chunk stored under ``key`` or None"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return data
+            on_disk = key in self._disk
+            if not on_disk:
+                self.misses += 1
+                return None
+
+        try:
+            data = self._path(key).read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        self.set(key, data)
+        return data
+
+    def set(self, key: Hashable, data: bytes):
+        """Keep ``data`` under ``key``, spilling or dropping old chunks"""
+        if len(data) > self.max_size:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._memory[key] = data
+            self._size += len(data)
+            evicted = []
+            while self._size > self.max_size:
+                old_key, old_data = self._memory.popitem(last=False)
+                self._size -= len(old_data)
+                evicted.append((old_key, old_data))
+        if self.directory is not None:
+            for old_key, old_data in evicted:
+                self._spill(old_key, old_data)
+
+    def _spill(self, key: Hashable, data: bytes):
+        if len(data) > self.max_disk_size:
+            return
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+                return
+        self._path(key).write_bytes(data)
+        with self._lock:
+            self._disk[key] = len(data)
+            self._disk_size += len(data)
+            dropped = []
+            while self._disk_size > self.max_disk_size:
+                old_key, size = self._disk.popitem(last=False)
+                self._disk_size -= size
+                dropped.append(old_key)
+        for old_key in dropped:
+            self._path(old_key).unlink(missing_ok=True)
+
+    def clear(self):
+        """Drop every chunk, in memory and on disk, and reset the counters"""
+        with self._lock:
+            spilled = list(self._disk)
+            self._memory.clear()
+            self._disk.clear()
+            self._size = self._disk_size = 0
+            self.hits = self.disk_hits = self.misses = 0
+        for key in spilled:
+            self._path(key).unlink(missing_ok=True)
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            reads = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / reads if reads else 0.0,
+                "entries": len(self._memory),
+                "size": self._size,
+                "disk_entries": len(self._disk),
+                "disk_size": self._disk_size,
+            }
+
+
+# --- Process-wide chunk cache used by every store that xpystac opens
+_chunk_cache: ChunkCache | None = None
+
+
+def set_chunk_cache(cache: ChunkCache | None) -> ChunkCache | None:
+    """Install ``cache`` as the chunk cache of the process, or remove it
+    when given None. Returns the cache that was installed before.
+
+    Only datasets opened after the call use the new cache.
+    """
+    global _chunk_cache
+    previous, _chunk_cache = _chunk_cache, cache
+    return previous
+
+
+def get_chunk_cache() -> ChunkCache | None:
+    """The chunk cache installed with ``set_chunk_cache``, if any"""
+    return _chunk_cache
@@ -1,12 +1,128 @@
+import asyncio
 import functools
-from collections.abc import Callable, Mapping
-from typing import Literal
+import itertools
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Literal
 
 import pystac
 import xarray
 
-from xpystac._xstac_kerchunk import _stac_to_kerchunk
-from xpystac.utils import _import_optional_dependency, _is_item_search
+from xpystac._assets import _asset_backend, _is_reference_asset
+from xpystac._chunks import open_planned
+from xpystac._prefilter import REGION_KWARGS, prefilter_items
+from xpystac._references import POOL_SIZE, _is_http, aload_references, load_references
+from xpystac._refresh import append_delta, pinned_kwargs
+from xpystac._representations import list_representations
+from xpystac._skeleton import _MissingMetadata, skeleton
+from xpystac._stacking import (
+    _odc_stac_grid,
+    _stackstac_grid,
+    odc_stac_load,
+    stack_partitioned,
+    stackstac_stack,
+    stackstac_to_dataset,
+)
+from xpystac._stores import open_planned_stores, stack_stores, store_asset_key
+from xpystac._xstac_kerchunk import _stac_to_kerchunk, _stac_to_kerchunk_combined
+from xpystac.cache import ReferenceCache, get_chunk_cache
+from xpystac.plan import OpenPlan, is_recording, record, recording
+from xpystac.signing import prefetch
+from xpystac.tracing import propagate, stage
+from xpystac.utils import _import_optional_dependency, _is_item_search, _local_path
+
+
+def _is_kerchunked(item: pystac.Item) -> bool:
+    """Whether the item holds kerchunk references in its properties"""
+    return any("kerchunk:" in k for k in item.properties.keys())
+
+
+def _open_references(
+    obj: pystac.Asset,
+    refs: dict,
+    patch_url: None | Callable[[Any], Any] = None,
+    **kwargs,
+) -> xarray.Dataset:
+    """Open the kerchunk references loaded from a reference asset"""
+    open_kwargs = obj.extra_fields.get("xarray:open_kwargs", {})
+    storage_options = obj.extra_fields.get("xarray:storage_options", None)
+    if storage_options:
+        open_kwargs = {**open_kwargs, "storage_options": storage_options}
+
+    if patch_url is not None:
+        refs = patch_url(refs)
+
+    open_kwargs = {"engine": "kerchunk", **open_kwargs, **kwargs}
+    record("references", refs=refs, open_kwargs=open_kwargs)
+    return _open_reference_table(refs, open_kwargs)
+
+
+def _open_reference_table(refs: dict, open_kwargs: dict) -> xarray.Dataset:
+    """Open resolved kerchunk references with the kwargs of their asset"""
+    if open_kwargs["engine"] == "kerchunk" and get_chunk_cache() is not None:
+        # --- Build the store of the kerchunk engine here, to wrap it
+        from xpystac._zarr import plain_reference_store, with_chunk_cache
+
+        storage_options = open_kwargs.pop("storage_options", None) or {}
+        refs = with_chunk_cache(plain_reference_store(refs, **storage_options))
+        open_kwargs = {
+            **(open_kwargs.pop("open_dataset_options", None) or {}),
+            **open_kwargs,
+            "engine": "zarr",
+            "zarr_format": 2,
+            "consolidated": False,
+        }
+    with stage("open_dataset", engine="kerchunk"):
+        return open_planned(refs, **open_kwargs)
+
+
+def _combine_kerchunk_items(
+    items: list[pystac.Item], concat_dims: str | list[str]
+) -> dict:
+    """Combine the kerchunk references stored in the datacube fields of items"""
+    if isinstance(concat_dims, str):
+        concat_dims = [concat_dims]
+    with stage("combine_references", n_items=len(items)) as s:
+        try:
+            if len(concat_dims) != 1:
+                raise ValueError("Only one concat dim is supported natively")
+            refs = _stac_to_kerchunk_combined(items, concat_dim=concat_dims[0])
+            s.record(method="native")
+            return refs
+        except ValueError:
+            s.record(method="kerchunk")
+            kerchunk_combine = _import_optional_dependency("kerchunk.combine")
+            return kerchunk_combine.MultiZarrToZarr(
+                [_stac_to_kerchunk(item) for item in items],
+                concat_dims=concat_dims,
+            ).translate()
+
+
+def _open_item_references(
+    refs: dict, read_ahead: bool | dict, kwargs: dict
+) -> xarray.Dataset:
+    """Open the kerchunk references translated from the datacube fields of
+    items"""
+    if read_ahead:
+        from xpystac._coalesce import reference_store
+
+        options = read_ahead if isinstance(read_ahead, dict) else {}
+        mapper = reference_store(refs, **options)
+    elif get_chunk_cache() is not None:
+        from xpystac._zarr import plain_reference_store
+
+        mapper = plain_reference_store(refs)
+    else:
+        fsspec = _import_optional_dependency("fsspec")
+        mapper = fsspec.filesystem("reference", fo=refs).get_mapper()
+    if get_chunk_cache() is not None:
+        from xpystac._zarr import with_chunk_cache
+
+        mapper = with_chunk_cache(mapper)
+    default_kwargs = {"engine": "zarr", "consolidated": False}
+
+    with stage("open_dataset", engine="zarr"):
+        return open_planned(mapper, **{**default_kwargs, **kwargs})
 
 
 @functools.singledispatch
@@ -16,6 +132,7 @@ def to_xarray(
     stacking_library: Literal["odc.stac", "stackstac"] | None = None,
     patch_url: None | Callable[[str], str] = None,
     allow_kerchunk: bool = True,
+    stream: bool = False,
     **kwargs,
 ) -> xarray.Dataset:
     """Given a PySTAC object return an xarray dataset.
@@ -30,6 +147,23 @@ def to_xarray(
     * ItemCollection (output of pystac_client.search): stacks all the
       assets in all the items into a dataset with 2 more dimensions than
       any given asset.
+    * Item or ItemCollection of zarr or icechunk stores: unless a
+      ``stacking_library`` is given, opens the store asset of every item on
+      a thread pool of ``max_workers`` threads and concatenates them along
+      ``concat_dims`` (``time`` by default, taken from the item datetimes
+      when the stores do not have it). The stores must all have the same
+      variables, dtypes and sizes.
+    * Collection: opens the cheapest of the representations listed by
+      ``list_representations``: a collection-level consolidated zarr,
+      icechunk, kerchunk or unconsolidated zarr asset, or else its items.
+      Representations needing a missing optional dependency are skipped.
+      The choice and the reason for it are in the ``xpystac:representation``
+      and ``xpystac:reason`` attrs of the dataset.
+
+    Unless ``chunks`` (``chunksize`` for stackstac) is passed, the dask
+    chunks are whole multiples of the native chunks or tiles of the data,
+    grown up to the ``array.chunk-size`` of the dask config. COG tiles are
+    assumed to be 512x512 when stacking items.
 
     Parameters
     ----------
@@ -42,16 +176,77 @@ def to_xarray(
         Function that takes a string or pystac object and returns an altered
         version. Normally used to sign urls before trying to read data from
         them. For instance when working with Planetary Computer this argument
-        should be set to ``pc.sign``.
+        should be set to ``pc.sign``. Pass an ``xpystac.signing.Signer`` to
+        fetch tokens per container, in one batch, and reuse them until they
+        expire.
     allow_kerchunk : bool, (True by default)
         Control whether this reader tries to interpret kerchunk attributes
         if provided (either in the data-cube extension or as a regular asset
         with ``references`` or ``index`` as the role).
+    cache : ReferenceCache, optional
+        Cache for the kerchunk references, keyed by the STAC JSON of the
+        object. When provided, reopening the same items or reference asset
+        skips fetching and combining the references. For zarr stores without
+        consolidated metadata, the metadata of the store is consolidated once
+        and kept in the cache, so that reopening the store costs one read.
+    stream : bool, (False by default)
+        Only used for ``pystac_client.ItemSearch``. Instead of collecting all
+        the search results into an ItemCollection up front, hand the items
+        to the stacking library as they are paged in from the API.
+    partition : int or str, optional
+        Only used when stacking many items. Split the items into partitions
+        of this many items, or into time windows if given a pandas frequency
+        string like ``"1MS"``, stack each partition on a thread pool of
+        ``max_workers`` threads and concatenate the results along ``time``.
+        The items that odc.stac groups into one time step (see its
+        ``groupby``) stay in the same partition. This keeps the size of each
+        dask graph bounded for very large collections.
+    metadata_only : bool, (False by default)
+        Build the dataset from the datacube, projection and raster fields of
+        the STAC object alone, without reading any metadata from the data
+        stores. The dataset has the dims, coords, dtypes and chunks of the
+        one that would be opened but is backed by empty dask arrays, which
+        makes planning over many items a pure in-memory operation. Falls back
+        to opening the object when the fields are not complete, and when it
+        is opened with ``stacking_library="stackstac"``, ``prefilter`` or
+        kwargs other than ``bands``, which can change the region, grid,
+        chunks or dtypes of the dataset.
+    read_ahead : bool or dict, (False by default)
+        Only used for items with kerchunk references. Merge the byte ranges
+        of neighbouring chunks of the same file into blocks and read the
+        whole block when one of its chunks is read, keeping the last few
+        blocks of each file in memory. This speeds up reading whole
+        variables, but reads more than needed when only a few chunks are
+        read. Pass a dict to tune ``max_gap`` (the
+        largest gap in bytes between merged ranges, 64kB by default),
+        ``max_block`` (the largest block, 4MB by default) and
+        ``block_cache_size`` (the number of blocks kept per file, 4 by
+        default). The number of coalesced requests is reported by the
+        ``plan_reads`` stage of ``xpystac.tracing``.
+    prefilter : bool, (False by default)
+        Only used when stacking many items. Before handing the items to the
+        stacking library, drop those whose bbox does not intersect the
+        region given by ``bbox``, ``lon``/``lat``, ``bounds_latlon`` or
+        ``geopolygon``/``intersects``, and those outside of ``time`` (an
+        interval like ``"2020-01/2020-03"``, a ``(start, end)`` pair or a
+        single date). Items covering the same tile (``grid:code``, or else
+        bbox) at the same time are deduplicated, keeping the most recently
+        ``updated`` one. Geometries are matched with a ``shapely.STRtree``.
+    mmap : bool, (False by default)
+        Only used for assets with local (or ``file://``) hrefs. Map the
+        chunks of uncompressed zarr arrays and the tiles or strips of
+        uncompressed GeoTIFFs into memory with ``numpy.memmap`` rather than
+        reading them through zarr or GDAL, with dask chunks made of whole
+        blocks on disk. Falls back to ``xarray.open_dataset`` for anything else.
+    asset_key : str, optional
+        Only used for collections. Open the collection-level asset with this
+        key rather than the cheapest representation.
     """
     if _is_item_search(obj):
-        item_collection = obj.item_collection()
+        # ``items`` fetches pages lazily as the stacking library consumes them
+        items = obj.items() if stream else obj.item_collection()
         return to_xarray(
-            item_collection,
+            items,
             stacking_library=stacking_library,
             patch_url=patch_url,
             allow_kerchunk=allow_kerchunk,
@@ -63,79 +258,184 @@ def to_xarray(
 @to_xarray.register(pystac.Item)
 @to_xarray.register(pystac.ItemCollection)
 @to_xarray.register(list)
+@to_xarray.register(Iterator)
 def _(
-    obj: pystac.Item | pystac.ItemCollection,
+    obj: pystac.Item
+    | pystac.ItemCollection
+    | list[pystac.Item]
+    | Iterator[pystac.Item],
     drop_variables: str | list[str] | None = None,
     stacking_library: Literal["odc.stac", "stackstac"] | None = None,
     patch_url: None | Callable[[str], str] = None,
     allow_kerchunk: bool = True,
+    cache: ReferenceCache | None = None,
+    partition: int | str | None = None,
+    max_workers: int | None = None,
+    metadata_only: bool = False,
+    read_ahead: bool | dict = False,
+    prefilter: bool = False,
     **kwargs,
 ) -> xarray.Dataset:
     if drop_variables is not None:
         raise KeyError("``drop_variables`` not implemented for pystac items")
 
-    if allow_kerchunk:
+    # --- Dropping items changes the dataset, so prefiltered items are opened
+    if metadata_only and not prefilter:
+        skeleton_items = [obj] if isinstance(obj, pystac.Item) else list(obj)
+        if isinstance(obj, Iterator):
+            obj = iter(skeleton_items)
+        # --- Kerchunk items that are not opened from their references are
+        # stacked like any other items
+        datacube = allow_kerchunk or not (
+            skeleton_items and _is_kerchunked(skeleton_items[0])
+        )
+        try:
+            return skeleton(skeleton_items, stacking_library, datacube, **kwargs)
+        except _MissingMetadata:
+            pass
+
+    if isinstance(obj, Iterator):
+        # peek at the first item without dropping it from the iterator
+        first_obj = next(obj)
+        obj = itertools.chain([first_obj], obj)
+    else:
         first_obj = obj if isinstance(obj, pystac.Item) else next(i for i in obj)
-        is_kerchunked = any("kerchunk:" in k for k in first_obj.properties.keys())
-        if is_kerchunked:
-            kerchunk_combine = _import_optional_dependency("kerchunk.combine")
-            fsspec = _import_optional_dependency("fsspec")
 
-            if isinstance(obj, (list, pystac.ItemCollection)):
-                refs = kerchunk_combine.MultiZarrToZarr(
-                    [_stac_to_kerchunk(item) for item in obj],
-                    concat_dims=kwargs.get("concat_dims", "time"),
-                ).translate()
+    if allow_kerchunk:
+        if _is_kerchunked(first_obj):
+            concat_dims = kwargs.pop("concat_dims", "time")
+
+            if not isinstance(obj, pystac.Item):
+                items = list(obj)
+                if cache is None:
+                    refs = _combine_kerchunk_items(items, concat_dims)
+                else:
+                    key = cache.key(
+                        {
+                            "items": [i.to_dict(transform_hrefs=False) for i in items],
+                            "concat_dims": concat_dims,
+                        }
+                    )
+                    refs = cache.get_or_set(
+                        key, lambda: _combine_kerchunk_items(items, concat_dims)
+                    )
             else:
                 refs = _stac_to_kerchunk(obj)
 
-            mapper = fsspec.filesystem("reference", fo=refs).get_mapper()
-            default_kwargs = {
-                "chunks": {},
-                "engine": "zarr",
-                "consolidated": False,
-            }
+            record("item_references", refs=refs, read_ahead=read_ahead, kwargs=kwargs)
+            return _open_item_references(refs, read_ahead, kwargs)
 
-            return xarray.open_dataset(mapper, **{**default_kwargs, **kwargs})
+    # --- Items of zarr or icechunk stores are not stacked by a library
+    store_key = None if stacking_library else store_asset_key(first_obj)
 
     if stacking_library is None:
-        try:
-            _import_optional_dependency("odc.stac")
-            stacking_library = "odc.stac"
-        except ImportError:
-            _import_optional_dependency("stackstac")
-            stacking_library = "stackstac"
+        if store_key is None:
+            try:
+                _import_optional_dependency("odc.stac")
+                stacking_library = "odc.stac"
+            except ImportError:
+                _import_optional_dependency("stackstac")
+                stacking_library = "stackstac"
     elif stacking_library not in ["odc.stac", "stackstac"]:
         raise ValueError(f"{stacking_library=} is not a valid option")
 
+    if prefilter and not isinstance(obj, pystac.Item):
+        filters = {k: v for k, v in kwargs.items() if k in (*REGION_KWARGS, "time")}
+        obj, kwargs = prefilter_items(list(obj), kwargs)
+        if not obj:
+            raise ValueError(f"no items are left after prefiltering by {filters}")
+
+    if store_key is not None:
+        concat_dim = kwargs.pop("concat_dims", "time")
+        open_kwargs = {k: v for k, v in kwargs.items() if k not in REGION_KWARGS}
+        return stack_stores(
+            [obj] if isinstance(obj, pystac.Item) else list(obj),
+            lambda asset: to_xarray(
+                asset, patch_url=patch_url, cache=cache, **open_kwargs
+            ),
+            key=store_key,
+            concat_dim=concat_dim,
+            max_workers=max_workers,
+        )
+
+    # --- Only items of stores are left without a library, and they returned
+    assert stacking_library is not None
+    if is_recording():
+        # --- Sign the hrefs and compute the output grid once, for the plan
+        obj = [obj] if isinstance(obj, pystac.Item) else list(obj)
+        if patch_url is not None:
+            obj, patch_url = _sign_items(obj, patch_url), None
+        if stacking_library == "odc.stac":
+            kwargs = _odc_stac_grid(obj, **kwargs)
+        else:
+            kwargs = _stackstac_grid(obj, **kwargs)
+        record(
+            stacking_library,
+            items=[item.to_dict(transform_hrefs=False) for item in obj],
+            partition=partition,
+            max_workers=max_workers,
+            kwargs=kwargs,
+        )
+
+    if partition is not None and not isinstance(obj, pystac.Item):
+        return stack_partitioned(
+            list(obj),
+            stacking_library,
+            partition,
+            max_workers=max_workers,
+            patch_url=patch_url,
+            **kwargs,
+        )
+
     if stacking_library == "odc.stac":
-        odc_stac = _import_optional_dependency("odc.stac")
+        # --- Iterators are handed over as they are, to be consumed lazily
+        odc_items: Iterable[pystac.Item]
         if isinstance(obj, pystac.Item):
-            items = [obj]
+            odc_items = [obj]
+        elif isinstance(obj, Iterator):
+            odc_items = obj
         else:
-            items = [i for i in obj]
-        return odc_stac.load(
-            items,
-            **{"chunks": {"x": 1024, "y": 1024}, "patch_url": patch_url, **kwargs},
-        )
+            odc_items = [i for i in obj]
+        return odc_stac_load(odc_items, patch_url, **kwargs)
     elif stacking_library == "stackstac":
-        stackstac = _import_optional_dependency("stackstac")
-        if patch_url:
-            if isinstance(obj, pystac.STACObject):
-                obj = patch_url(obj)
-            else:
-                obj = [patch_url(o) for o in obj]
-        da = stackstac.stack(obj, **kwargs)
-        bands = {}
-        for band in da.band.values:
-            b = da.sel(band=band)
-            scalar_coords = {k: v.item() for k, v in b.coords.items() if v.shape == ()}
-            b = b.assign_attrs(
-                **{k: v for k, v in scalar_coords.items() if v is not None}
-            )
-            b = b.drop_vars(scalar_coords)
-            bands[band] = b
-        return xarray.Dataset(bands, attrs=da.attrs)
+        da = stackstac_stack(obj, patch_url, **kwargs)
+        with stage("split_bands"):
+            return stackstac_to_dataset(da)
+
+
+def _sign_items(
+    items: list[pystac.Item], patch_url: Callable[[str], str]
+) -> list[pystac.Item]:
+    """Copies of items with the hrefs of their assets passed through
+    ``patch_url``"""
+    items = prefetch(patch_url, items)
+    signed = []
+    for item in items:
+        item = item.clone()
+        for asset in item.assets.values():
+            asset.href = patch_url(asset.href)
+        signed.append(item)
+    return signed
+
+
+def _open_stacked(
+    stacking_library: Literal["odc.stac", "stackstac"],
+    items: list[dict],
+    partition: int | str | None,
+    max_workers: int | None,
+    kwargs: dict,
+) -> xarray.Dataset:
+    """Stack signed items on the output grid given in ``kwargs``"""
+    stac_items = [pystac.Item.from_dict(item) for item in items]
+    if partition is not None:
+        return stack_partitioned(
+            stac_items, stacking_library, partition, max_workers=max_workers, **kwargs
+        )
+    if stacking_library == "odc.stac":
+        return odc_stac_load(stac_items, **kwargs)
+    da = stackstac_stack(stac_items, **kwargs)
+    with stage("split_bands"):
+        return stackstac_to_dataset(da)
 
 
 @to_xarray.register
@@ -144,34 +444,32 @@ def _(
     stacking_library: Literal["odc.stac", "stackstac"] | None = None,
     patch_url: None | Callable[[str], str] = None,
     allow_kerchunk: bool = True,
+    cache: ReferenceCache | None = None,
+    metadata_only: bool = False,
+    mmap: bool = False,
     **kwargs,
 ) -> xarray.Dataset:
-    default_kwargs: Mapping = {"chunks": {}}
+    if metadata_only:
+        try:
+            return skeleton(obj, **kwargs)
+        except _MissingMetadata:
+            pass
+
+    if allow_kerchunk and _is_reference_asset(obj):
+        if cache is None:
+            refs = load_references(obj.href)
+        else:
+            key = cache.key(obj.to_dict())
+            refs = cache.get_or_set(key, lambda: load_references(obj.href))
+        return _open_references(obj, refs, patch_url, **kwargs)
+
+    default_kwargs: Mapping = {}
     open_kwargs = obj.extra_fields.get("xarray:open_kwargs", {})
 
     storage_options = obj.extra_fields.get("xarray:storage_options", None)
     if storage_options:
         open_kwargs["storage_options"] = storage_options
 
-    if (
-        allow_kerchunk
-        and obj.media_type == pystac.MediaType.JSON
-        and {"index", "references"}.intersection(set(obj.roles) if obj.roles else set())
-    ):
-        requests = _import_optional_dependency("requests")
-        r = requests.get(obj.href)
-        r.raise_for_status()
-
-        refs = r.json()
-        if patch_url is not None:
-            refs = patch_url(refs)
-
-        default_kwargs = {
-            **default_kwargs,
-            "engine": "kerchunk",
-        }
-        return xarray.open_dataset(refs, **{**default_kwargs, **open_kwargs, **kwargs})
-
     if obj.media_type == pystac.MediaType.COG:
         _import_optional_dependency("rioxarray")
         default_kwargs = {**default_kwargs, "engine": "rasterio"}
@@ -193,5 +491,528 @@ def _(
     if patch_url is not None:
         href = patch_url(href)
 
-    ds = xarray.open_dataset(href, **{**default_kwargs, **open_kwargs, **kwargs})
+    open_kwargs = {**default_kwargs, **open_kwargs, **kwargs}
+    if mmap and (path := _local_path(href)) is not None:
+        ds = _open_memmapped(path, open_kwargs)
+        if ds is not None:
+            record("mmap", path=path, open_kwargs=open_kwargs)
+            return ds
+
+    if open_kwargs.get("engine") == "zarr" and "consolidated" not in open_kwargs:
+        # --- Rather than letting zarr probe for consolidated metadata
+        from xpystac._zarr import zarr_open_args
+
+        href, zarr_kwargs = zarr_open_args(
+            href, open_kwargs.get("storage_options"), cache=cache
+        )
+        if not isinstance(href, str):
+            open_kwargs.pop("storage_options", None)
+        open_kwargs = {**zarr_kwargs, **open_kwargs}
+
+    location = obj.href.partition("?")[0]
+    record("asset", target=href, location=location, open_kwargs=open_kwargs)
+    return _open_target(href, location, open_kwargs)
+
+
+def _open_memmapped(path: str, open_kwargs: dict) -> xarray.Dataset | None:
+    from xpystac._mmap import open_memmapped
+
+    with stage("open_dataset", engine=open_kwargs.get("engine"), mmap=True):
+        return open_memmapped(path, **open_kwargs)
+
+
+def _open_target(target, location: str, open_kwargs: dict) -> xarray.Dataset:
+    """Open the signed href (or store) of an asset with the kwargs resolved
+    from its fields. ``location`` is the unsigned href, which chunks are
+    cached under."""
+    if open_kwargs.get("engine") == "zarr" and get_chunk_cache() is not None:
+        from xpystac._zarr import with_chunk_cache, zarr_store
+
+        open_kwargs = dict(open_kwargs)
+        if isinstance(target, str):
+            target = zarr_store(target, open_kwargs.pop("storage_options", None))
+        target = with_chunk_cache(target, location)
+
+    with stage("open_dataset", engine=open_kwargs.get("engine")):
+        return open_planned(target, **open_kwargs)
+
+
+# --- Readers of each kind of ``OpenPlan``, called with its spec
+_PLAN_READERS: dict[str, Callable[..., xarray.Dataset | None]] = {
+    "asset": _open_target,
+    "mmap": _open_memmapped,
+    "references": _open_reference_table,
+    "item_references": _open_item_references,
+    "odc.stac": functools.partial(_open_stacked, "odc.stac"),
+    "stackstac": functools.partial(_open_stacked, "stackstac"),
+    "stores": open_planned_stores,
+}
+
+
+@to_xarray.register
+def _(
+    obj: pystac.Collection,
+    asset_key: str | None = None,
+    **kwargs,
+) -> xarray.Dataset:
+    representations = list_representations(obj)
+    if asset_key is not None:
+        representations = [r for r in representations if r.key == asset_key]
+        if not representations:
+            raise KeyError(f"{obj.id} has no asset {asset_key!r} that can be opened")
+    if not representations:
+        raise ValueError(f"{obj.id} has neither assets that can be opened nor items")
+
+    skipped = []
+    errors: list[Exception] = []
+    for representation in representations:
+        try:
+            with stage(
+                "open_representation", kind=representation.kind, key=representation.key
+            ):
+                if representation.key is None:
+                    items = list(obj.get_items())
+                    if not items:
+                        raise ValueError("the item links lead to no items")
+                    ds = to_xarray(items, **kwargs)
+                else:
+                    ds = to_xarray(obj.assets[representation.key], **kwargs)
+            break
+        except Exception as e:
+            # --- Missing dependency or broken asset, move on to the next one
+            skipped.append(f"{representation.kind} ({type(e).__name__}: {e})")
+            errors.append(e)
+    else:
+        if len(errors) == 1:
+            raise errors[0]
+        raise ValueError(
+            f"none of the representations of {obj.id} can be opened: "
+            + ", ".join(skipped)
+        ) from errors[-1]
+
+    kinds = ", ".join(r.key or r.kind for r in representations)
+    reason = f"{representation.reason} (ranked first of {kinds})"
+    if skipped:
+        reason = f"{reason}; skipped {', '.join(skipped)}"
+    return ds.assign_attrs(
+        {
+            "xpystac:representation": representation.key or "items",
+            "xpystac:reason": reason,
+        }
+    )
+
+
+@to_xarray.register
+def _(obj: OpenPlan, **kwargs) -> xarray.Dataset:
+    # --- Everything but the defaults of xarray.open_dataset is in the plan
+    passed = sorted(k for k, v in kwargs.items() if v is not None)
+    if passed:
+        raise TypeError(f"{passed} cannot be passed when opening an OpenPlan")
+    reader: Callable[..., xarray.Dataset | None]
+    if obj.kind == "icechunk":
+        from xpystac._icechunk import read_icechunk_snapshot
+
+        reader = read_icechunk_snapshot
+    else:
+        reader = _PLAN_READERS[obj.kind]
+
+    dask = _import_optional_dependency("dask")
+    with dask.config.set({"array.chunk-size": obj.chunk_size}):
+        ds = reader(**obj.spec)
+    if ds is None:
+        # --- The mmap reader declines files that changed since they were planned
+        raise ValueError(f"{obj.spec['path']} can no longer be memory-mapped")
     return ds
+
+
+def plan_open(obj, **kwargs) -> OpenPlan:
+    """Open a PySTAC object like ``to_xarray`` and return the plan of how
+    it was opened rather than the dataset.
+
+    The plan holds the signed hrefs, open kwargs, kerchunk references,
+    icechunk snapshot or the output grid of stacked items, along with the
+    dask chunk size. ``OpenPlan.open`` (or ``to_xarray(plan)``) reopens the
+    same dataset from those alone, in any process, without querying STAC,
+    signing hrefs or resolving versions again. Signed hrefs expire, so
+    plans of signed objects are only good for as long as the signatures.
+
+    Parameters
+    ----------
+    obj : PySTAC object (Item, ItemCollection, Asset)
+        The object to plan the opening of.
+    **kwargs
+        Passed to ``to_xarray``.
+    """
+    with recording() as steps:
+        to_xarray(obj, **kwargs)
+    if not steps:
+        raise ValueError(f"opening {type(obj).__name__} objects cannot be planned")
+    return steps[-1]
+
+
+def refresh(
+    ds: xarray.Dataset,
+    items: pystac.Item | pystac.ItemCollection | Iterable[pystac.Item],
+    **kwargs,
+) -> xarray.Dataset:
+    """Append the new items of a search to a dataset opened by ``to_xarray``.
+
+    Only the new items are opened, through the same branch as the items of
+    ``ds`` (kerchunk references, stores or a stacking library), and their
+    time steps are appended to ``ds``. The output grid of the stacking
+    libraries and the chunks are read back from ``ds``, so the cost of a
+    refresh grows with the number of new items rather than with the length
+    of ``ds``. Items that ``ds`` already has are not appended again.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset
+        Dataset opened by ``to_xarray`` from items.
+    items : PySTAC object (Item, ItemCollection) or ItemSearch
+        The new items, for instance a search limited to the times after
+        the end of ``ds``.
+    **kwargs
+        Passed to ``to_xarray``, like the kwargs ``ds`` was opened with.
+        Kwargs setting the output grid are replaced by the grid of ``ds``.
+
+    Examples
+    --------
+    >>> ds = to_xarray(catalog.search(collections=[...], datetime="2024-01"))
+    >>> ds = refresh(ds, catalog.search(collections=[...], datetime="2024-02/.."))
+    """
+    if _is_item_search(items):
+        search: Any = items
+        items = search.item_collection()
+    items = [items] if isinstance(items, pystac.Item) else list(items)
+    if not items:
+        return ds
+
+    first = items[0]
+    stacking_library = kwargs.get("stacking_library")
+    if kwargs.get("allow_kerchunk", True) and _is_kerchunked(first):
+        reader = "kerchunk"
+    elif stacking_library is None and store_asset_key(first) is not None:
+        reader = "stores"
+    else:
+        # --- Only stackstac keeps its RasterSpec in the attrs
+        reader = stacking_library or ("stackstac" if "spec" in ds.attrs else "odc.stac")
+
+    with stage("refresh", reader=reader, n_items=len(items)):
+        kwargs = pinned_kwargs(ds, reader, kwargs)
+        delta = to_xarray(items, **kwargs)
+        return append_delta(ds, delta, kwargs.get("concat_dims", "time"))
+
+
+@functools.singledispatch
+async def ato_xarray(obj, **kwargs) -> xarray.Dataset:
+    """Async version of ``to_xarray``, taking the same arguments.
+
+    Kerchunk reference files are fetched with aiohttp and icechunk
+    repositories are opened with the async icechunk API, so many assets can
+    be opened concurrently on one event loop. Readers without an async API
+    (stacking items, zarr and COG assets) and decoding the metadata into a
+    dataset run in a thread with ``asyncio.to_thread``.
+
+    Pass an ``aiohttp.ClientSession`` as ``session`` to reuse connections
+    across calls. See ``ato_xarray_many`` to open many objects at once.
+    """
+    kwargs.pop("session", None)
+    return await asyncio.to_thread(to_xarray, obj, **kwargs)
+
+
+@ato_xarray.register
+async def _(
+    obj: pystac.Asset,
+    stacking_library: Literal["odc.stac", "stackstac"] | None = None,
+    patch_url: None | Callable[[str], str] = None,
+    allow_kerchunk: bool = True,
+    cache: ReferenceCache | None = None,
+    metadata_only: bool = False,
+    mmap: bool = False,
+    session=None,
+    **kwargs,
+) -> xarray.Dataset:
+    if metadata_only:
+        try:
+            return skeleton(obj, **kwargs)
+        except _MissingMetadata:
+            pass
+
+    if allow_kerchunk and _is_reference_asset(obj):
+        refs = None
+        if cache is not None:
+            key = cache.key(obj.to_dict())
+            refs = await asyncio.to_thread(cache.get, key)
+        if refs is None:
+            refs = await aload_references(obj.href, session=session)
+            if cache is not None:
+                await asyncio.to_thread(cache.set, key, refs)
+        return await asyncio.to_thread(_open_references, obj, refs, patch_url, **kwargs)
+
+    if obj.media_type == "application/vnd.zarr+icechunk":
+        from xpystac._icechunk import aread_icechunk
+
+        return await aread_icechunk(obj)
+
+    return await asyncio.to_thread(
+        to_xarray,
+        obj,
+        patch_url=patch_url,
+        allow_kerchunk=allow_kerchunk,
+        cache=cache,
+        mmap=mmap,
+        **kwargs,
+    )
+
+
+async def ato_xarray_many(
+    objs: Iterable,
+    *,
+    limit: int = POOL_SIZE,
+    return_exceptions: bool = False,
+    **kwargs,
+) -> list:
+    """Open many STAC objects concurrently with ``ato_xarray``.
+
+    Parameters
+    ----------
+    objs : iterable of PySTAC objects
+        The objects to open.
+    limit : int, (16 by default)
+        Maximum number of objects being opened at once. Readers without an
+        async API run on the default executor of the event loop, so raise
+        its ``max_workers`` too when ``limit`` is larger than that.
+    return_exceptions : bool, (False by default)
+        Return the exception raised for an object in its place rather than
+        raising the first one, like ``asyncio.gather``.
+    **kwargs
+        Passed to ``ato_xarray`` for every object. When some of the objects
+        are kerchunk reference assets on HTTP(S) and no ``session`` is given,
+        one ``aiohttp.ClientSession`` is shared by all of them.
+
+    Returns
+    -------
+    List of datasets in the same order as ``objs``.
+    """
+    objs = list(objs)
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _open(obj):
+        async with semaphore:
+            return await ato_xarray(obj, **kwargs)
+
+    async def _gather():
+        return await asyncio.gather(
+            *[_open(obj) for obj in objs], return_exceptions=return_exceptions
+        )
+
+    if kwargs.get("session") is None and any(
+        isinstance(obj, pystac.Asset)
+        and _is_reference_asset(obj)
+        and _is_http(obj.href)
+        for obj in objs
+    ):
+        aiohttp = _import_optional_dependency("aiohttp")
+        connector = aiohttp.TCPConnector(limit=limit)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            kwargs["session"] = session
+            return await _gather()
+    return await _gather()
+
+
+def open_reference_assets(
+    assets: Iterable[pystac.Asset],
+    *,
+    patch_url: None | Callable[[str], str] = None,
+    max_workers: int | None = None,
+    **kwargs,
+) -> list[xarray.Dataset]:
+    """Open many kerchunk reference assets concurrently.
+
+    The reference files are fetched and opened on a thread pool that shares
+    one pooled HTTP session, so connections are reused across assets.
+
+    Parameters
+    ----------
+    assets : iterable of pystac.Asset
+        Assets pointing to kerchunk reference files (``references`` or
+        ``index`` role).
+    patch_url : Callable, optional
+        Function that takes the references and returns an altered version.
+        See ``to_xarray``.
+    max_workers : int, optional
+        Maximum number of assets to fetch at once.
+
+    Returns
+    -------
+    List of datasets in the same order as ``assets``.
+    """
+    assets = list(assets)
+    for asset in assets:
+        if not _is_reference_asset(asset):
+            raise ValueError(f"{asset.href} is not a kerchunk reference asset")
+
+    def _open(asset: pystac.Asset) -> xarray.Dataset:
+        return to_xarray(asset, patch_url=patch_url, **kwargs)
+
+    prefetch(patch_url, assets)
+    with ThreadPoolExecutor(max_workers=max_workers or POOL_SIZE) as pool:
+        return list(pool.map(propagate(_open), assets))
+
+
+def to_xarray_many(
+    assets: Mapping[str, pystac.Asset] | Iterable[pystac.Asset],
+    *,
+    max_workers: int | None = None,
+    **kwargs,
+) -> tuple[dict[str | int, xarray.Dataset], dict[str | int, Exception]]:
+    """Open many assets concurrently, collecting failures instead of raising.
+
+    Assets are grouped by backend and opened on one bounded thread pool, so
+    that assets of the same kind share pooled icechunk repositories, HTTP
+    connections and cached fsspec filesystems while they are being opened.
+
+    Parameters
+    ----------
+    assets : mapping or iterable of pystac.Asset
+        The assets to open, keyed by name. Iterables are keyed by their
+        position, so that assets sharing an href (like versions of the same
+        icechunk repository) are all opened.
+    max_workers : int, optional
+        Maximum number of assets to open at once.
+    **kwargs
+        Passed to ``to_xarray`` for every asset.
+
+    Returns
+    -------
+    Datasets keyed like ``assets``, and the exception raised for each asset
+    that could not be opened.
+    """
+    pairs = assets.items() if isinstance(assets, Mapping) else enumerate(assets)
+    keyed: dict[str | int, pystac.Asset] = {k: asset for k, asset in pairs}
+
+    prefetch(kwargs.get("patch_url"), list(keyed.values()))
+    order = sorted(keyed, key=lambda k: _asset_backend(keyed[k]) or "")
+    datasets: dict[str | int, xarray.Dataset] = {}
+    errors: dict[str | int, Exception] = {}
+    with ThreadPoolExecutor(max_workers=max_workers or POOL_SIZE) as pool:
+        futures = {
+            key: pool.submit(propagate(to_xarray), keyed[key], **kwargs)
+            for key in order
+        }
+        for key in keyed:
+            try:
+                datasets[key] = futures[key].result()
+            except Exception as e:
+                errors[key] = e
+    return datasets, errors
+
+
+def to_datatree(
+    collections: pystac.Collection | Iterable[pystac.Collection],
+    *,
+    max_workers: int | None = None,
+    **kwargs,
+) -> xarray.DataTree:
+    """Open every collection-level asset that xpystac can read into a tree.
+
+    Parameters
+    ----------
+    collections : pystac.Collection or iterable of pystac.Collection
+        With one collection, the nodes of the tree are named after the asset
+        keys. With many, they are grouped under the id of each collection.
+    max_workers : int, optional
+        Maximum number of assets to open at once.
+    **kwargs
+        Passed to ``to_xarray`` for every asset.
+
+    Returns
+    -------
+    ``xarray.DataTree`` with one node per asset. Assets that could not be
+    opened are left out and their errors are listed as ``"path: error"``
+    strings in the ``xpystac:errors`` attribute of the root node, which is
+    only set when some asset failed.
+    """
+    if isinstance(collections, pystac.Collection):
+        assets = {
+            key: asset
+            for key, asset in collections.assets.items()
+            if _asset_backend(asset) is not None
+        }
+    else:
+        assets = {
+            f"{collection.id}/{key}": asset
+            for collection in collections
+            for key, asset in collection.assets.items()
+            if _asset_backend(asset) is not None
+        }
+
+    datasets, errors = to_xarray_many(assets, max_workers=max_workers, **kwargs)
+    tree = xarray.DataTree.from_dict({f"/{k}": ds for k, ds in datasets.items()})
+    if errors:
+        # --- A list of strings so that the tree can still be written to netCDF
+        tree.attrs["xpystac:errors"] = [
+            f"{k}: {type(e).__name__}: {e}" for k, e in errors.items()
+        ]
+    return tree
+
+
+def open_icechunk_versions(
+    collection: pystac.Collection,
+    versions: list[str] | None = None,
+    *,
+    role: str = "latest-version",
+    concat_dim: str | None = "version",
+    max_workers: int | None = None,
+) -> xarray.Dataset | dict[str, xarray.Dataset]:
+    """Open several versions of a collection-level icechunk asset at once.
+
+    The repository is opened once and a read-only session is created for
+    every version in parallel.
+
+    Parameters
+    ----------
+    collection : pystac.Collection
+        Collection with at least one icechunk asset.
+    versions : list of str, optional
+        Branches, tags or snapshot ids to open. Defaults to the ``version``
+        of every icechunk asset that shares the href of the asset with
+        ``role``.
+    role : str, ("latest-version" by default)
+        Role of the asset that points to the repository. Not needed when
+        the collection only has one icechunk asset.
+    concat_dim : str or None, ("version" by default)
+        Name of the new dimension along which the versions are concatenated.
+        If None return a dict of datasets keyed by version instead.
+    max_workers : int, optional
+        Maximum number of sessions to open at once.
+    """
+    from xpystac._icechunk import read_icechunk_versions
+
+    icechunk_assets = [
+        asset
+        for asset in collection.assets.values()
+        if asset.media_type == "application/vnd.zarr+icechunk"
+    ]
+    candidates = [a for a in icechunk_assets if role in (a.roles or [])]
+    if not candidates and len(icechunk_assets) == 1:
+        candidates = icechunk_assets
+    if not candidates:
+        raise ValueError(f"Could not find an icechunk asset with {role=}")
+    asset = candidates[0]
+
+    if versions is None:
+        versions = list(
+            dict.fromkeys(
+                a.extra_fields.get("version", "main")
+                for a in icechunk_assets
+                if a.href == asset.href
+            )
+        )
+
+    datasets = read_icechunk_versions(asset, versions, max_workers=max_workers)
+    if concat_dim is None:
+        return datasets
+    return xarray.concat(list(datasets.values()), dim=concat_dim).assign_coords(
+        {concat_dim: list(datasets)}
+    )
@@ -0,0 +1,99 @@
+"""Open plans: what ``to_xarray`` resolved while opening a STAC object.
+
+Opening a STAC object means sniffing media types, translating or combining
+kerchunk references, signing hrefs, resolving icechunk versions and
+computing the grid of stacked items. ``plan_open`` records the outcome of
+all that in an ``OpenPlan``, which reopens the same dataset from the
+resolved hrefs and kwargs alone. Plans pickle, so they can be shipped to
+dask workers or saved to a file for scheduled jobs.
+"""
+
+import contextlib
+import contextvars
+import dataclasses
+import os
+import pickle
+import zlib
+from collections.abc import Iterator
+from typing import Any
+
+# plans recorded by the ``to_xarray`` calls of the active ``recording`` block
+_steps: contextvars.ContextVar[list | None] = contextvars.ContextVar(
+    "xpystac_plan_steps", default=None
+)
+
+
+@dataclasses.dataclass
+class OpenPlan:
+    """How to reopen a dataset opened by ``to_xarray``.
+
+    ``kind`` names the reader (``asset``, ``mmap``, ``references``,
+    ``item_references``, ``icechunk``, ``stores``, ``odc.stac`` or
+    ``stackstac``) and ``spec`` holds what it was called with: signed hrefs,
+    open kwargs, reference tables, icechunk snapshots or the items and
+    output grid of stacked items. ``chunk_size`` is the ``array.chunk-size``
+    of dask the chunks were planned with, so that every process reopens
+    the dataset with the same chunks.
+
+    Examples
+    --------
+    >>> plan = plan_open(item_collection, patch_url=pc.sign)
+    >>> plan.save("cube.plan")
+    >>> ds = OpenPlan.load("cube.plan").open()
+    """
+
+    kind: str
+    spec: dict[str, Any]
+    chunk_size: int
+
+    def __repr__(self):
+        return f"OpenPlan(kind={self.kind!r}, spec={sorted(self.spec)})"
+
+    def open(self):
+        """Open the dataset, without going through STAC again"""
+        from xpystac.core import to_xarray
+
+        return to_xarray(self)
+
+    def save(self, path: str | os.PathLike):
+        """Write the plan to a local file"""
+        data = pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(os.path.expanduser(path), "wb") as f:
+            f.write(zlib.compress(data))
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> "OpenPlan":
+        """Read a plan written by ``save``.
+
+        Plans are pickles, so only load plans from files you trust.
+        """
+        with open(os.path.expanduser(path), "rb") as f:
+            plan = pickle.loads(zlib.decompress(f.read()))
+        if not isinstance(plan, cls):
+            raise TypeError(f"{path} does not hold an OpenPlan")
+        return plan
+
+
+@contextlib.contextmanager
+def recording() -> Iterator[list]:
+    """Collect the plans recorded inside the ``with`` block"""
+    steps: list = []
+    token = _steps.set(steps)
+    try:
+        yield steps
+    finally:
+        _steps.reset(token)
+
+
+def is_recording() -> bool:
+    """Whether a ``recording`` block is active"""
+    return _steps.get() is not None
+
+
+def record(kind: str, **spec):
+    """Record how a dataset is opened, if a ``recording`` block is active"""
+    steps = _steps.get()
+    if steps is not None:
+        from xpystac._chunks import chunk_budget
+
+        steps.append(OpenPlan(kind, spec, chunk_budget()))
@@ -0,0 +1,247 @@
+"""Batched signing of hrefs with tokens cached until they expire.
+
+Services like the Planetary Computer hand out one token per storage
+container, valid for an hour or so. Signing every href with a separate
+request, on every open, makes thousands of requests for tokens that are
+all the same. A ``Signer`` asks for the tokens of all the containers of
+an open in one call of a batch signer, and reuses them until they are
+about to expire. It can be passed as ``patch_url`` anywhere.
+
+>>> from xpystac.signing import Signer, Token
+>>> def sign_containers(containers):
+...     return {c: Token(query=get_sas_token(c), expiry=...) for c in containers}
+>>> to_xarray(item_collection, patch_url=Signer(sign_containers))
+"""
+
+import dataclasses
+import datetime
+import functools
+import threading
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from typing import Any
+from urllib.parse import urlparse
+
+import pystac
+
+from xpystac.tracing import stage
+from xpystac.utils import _local_path
+
+
+@dataclasses.dataclass(frozen=True)
+class Token:
+    """Query string granting access to a container until ``expiry``.
+
+    ``expiry`` should be timezone-aware; a naive one is taken as UTC.
+    """
+
+    query: str
+    expiry: datetime.datetime
+
+    def __post_init__(self):
+        if self.expiry.tzinfo is None:
+            utc = self.expiry.replace(tzinfo=datetime.timezone.utc)
+            object.__setattr__(self, "expiry", utc)
+
+
+# called with a list of containers, returns a token for each of them
+BatchSigner = Callable[[list[str]], Mapping[str, Token]]
+
+
+def container_of(href: str) -> str | None:
+    """Storage container of an href, or None for local hrefs.
+
+    That is the bucket (or container) of object store urls and the first
+    segment of the path of http urls, which is where blob storage services
+    put the container.
+    """
+    if _local_path(href) is not None:
+        return None
+    parsed = urlparse(href)
+    if parsed.scheme in ["http", "https"]:
+        first = parsed.path.lstrip("/").partition("/")[0]
+        return f"{parsed.scheme}://{parsed.netloc}/{first}"
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+class Signer:
+    """``patch_url`` signing hrefs with a token per container.
+
+    Signing an href (or an asset, item, list of items or kerchunk
+    references) fetches the tokens of all of its containers that are not
+    cached, or are about to expire, in one call of ``sign_containers``.
+    Signed objects are copies; the originals are left as they are.
+
+    Parameters
+    ----------
+    sign_containers : callable
+        Called with a list of containers, returns a ``Token`` for each one.
+    container : callable, optional
+        Container of an href, or None if the href does not need signing.
+        Defaults to ``container_of``.
+    margin : timedelta, (5 minutes by default)
+        Tokens are refreshed once they expire within ``margin``, so that
+        they are still valid while the data is being read.
+    """
+
+    def __init__(
+        self,
+        sign_containers: BatchSigner,
+        container: Callable[[str], str | None] = container_of,
+        margin: datetime.timedelta = datetime.timedelta(minutes=5),
+    ):
+        self.sign_containers = sign_containers
+        self.container = container
+        self.margin = margin
+        self._tokens: dict[str, Token] = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def __repr__(self):
+        return f"Signer({self.sign_containers!r}, tokens={len(self._tokens)})"
+
+    def tokens(self, hrefs: Iterable[str]) -> dict[str, Token]:
+        """Tokens of the containers of ``hrefs``, fetching the missing or
+        expiring ones in one call"""
+        containers = {c for href in hrefs if (c := self.container(href)) is not None}
+        # --- Held while fetching, so concurrent opens wait for one call
+        with self._lock:
+            deadline = datetime.datetime.now(datetime.timezone.utc) + self.margin
+            stale = sorted(
+                c
+                for c in containers
+                if c not in self._tokens or self._tokens[c].expiry <= deadline
+            )
+            if stale:
+                with stage("sign", n_containers=len(stale)):
+                    fetched = self.sign_containers(stale)
+                self._calls += 1
+                missing = set(stale).difference(fetched)
+                if missing:
+                    raise ValueError(f"no token was returned for {sorted(missing)}")
+                self._tokens.update({c: fetched[c] for c in stale})
+            return {c: self._tokens[c] for c in containers}
+
+    def __call__(self, obj):
+        tokens = self.tokens(_hrefs(obj))
+
+        def sign(href: str) -> str:
+            container = self.container(href)
+            if container is None:
+                return href
+            sep = "&" if "?" in href else "?"
+            return f"{href}{sep}{tokens[container].query}"
+
+        return _replace_hrefs(obj, sign)
+
+    def clear(self):
+        """Drop every cached token"""
+        with self._lock:
+            self._tokens.clear()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Number of calls of ``sign_containers`` and of cached tokens"""
+        return {"calls": self._calls, "tokens": len(self._tokens)}
+
+
+def prefetch(patch_url: Callable | None, objs: Any) -> Any:
+    """Fetch the tokens of every href of ``objs`` in one batch if
+    ``patch_url`` is a ``Signer``, so that signing the objects one by one
+    only hits its cache. Iterators are returned as lists."""
+    if not isinstance(patch_url, Signer):
+        return objs
+    if isinstance(objs, Iterator):
+        objs = list(objs)
+    patch_url.tokens(_hrefs(objs))
+    return objs
+
+
+def _reference_table(refs: dict) -> dict:
+    """Mapping of keys to references of kerchunk references, with or
+    without the version 1 wrapper"""
+    return refs["refs"] if isinstance(refs.get("refs"), dict) else refs
+
+
+@functools.singledispatch
+def _hrefs(obj) -> Iterator[str]:
+    raise TypeError(f"cannot sign {type(obj).__name__} objects")
+
+
+@_hrefs.register
+def _(obj: str) -> Iterator[str]:
+    yield obj
+
+
+@_hrefs.register
+def _(obj: pystac.Asset) -> Iterator[str]:
+    yield obj.href
+
+
+@_hrefs.register
+def _(obj: pystac.Item) -> Iterator[str]:
+    for asset in obj.assets.values():
+        yield asset.href
+
+
+@_hrefs.register(list)
+@_hrefs.register(tuple)
+@_hrefs.register(pystac.ItemCollection)
+def _(obj) -> Iterator[str]:
+    for o in obj:
+        yield from _hrefs(o)
+
+
+@_hrefs.register
+def _(obj: dict) -> Iterator[str]:
+    for ref in _reference_table(obj).values():
+        if isinstance(ref, list) and ref and isinstance(ref[0], str):
+            yield ref[0]
+
+
+@functools.singledispatch
+def _replace_hrefs(obj, sign: Callable[[str], str]):
+    raise TypeError(f"cannot sign {type(obj).__name__} objects")
+
+
+@_replace_hrefs.register
+def _(obj: str, sign: Callable[[str], str]) -> str:
+    return sign(obj)
+
+
+@_replace_hrefs.register
+def _(obj: pystac.Asset, sign: Callable[[str], str]) -> pystac.Asset:
+    asset = obj.clone()
+    asset.href = sign(obj.href)
+    return asset
+
+
+@_replace_hrefs.register
+def _(obj: pystac.Item, sign: Callable[[str], str]) -> pystac.Item:
+    item = obj.clone()
+    for asset in item.assets.values():
+        asset.href = sign(asset.href)
+    return item
+
+
+@_replace_hrefs.register(list)
+@_replace_hrefs.register(tuple)
+def _(obj, sign: Callable[[str], str]) -> list:
+    return [_replace_hrefs(o, sign) for o in obj]
+
+
+@_replace_hrefs.register
+def _(obj: pystac.ItemCollection, sign: Callable[[str], str]):
+    return pystac.ItemCollection(
+        [_replace_hrefs(item, sign) for item in obj], extra_fields=obj.extra_fields
+    )
+
+
+@_replace_hrefs.register
+def _(obj: dict, sign: Callable[[str], str]) -> dict:
+    table = {
+        key: [sign(ref[0]), *ref[1:]]
+        if isinstance(ref, list) and ref and isinstance(ref[0], str)
+        else ref
+        for key, ref in _reference_table(obj).items()
+    }
+    return {**obj, "refs": table} if isinstance(obj.get("refs"), dict) else table
@@ -0,0 +1,212 @@
+"""Per-stage timings of opening STAC objects.
+
+Every stage of ``to_xarray`` (importing optional dependencies, fetching and
+combining references, opening icechunk repositories, building the graph of
+the stacking library and decoding with xarray) is timed when tracing is
+enabled and skipped at the cost of one context variable lookup otherwise.
+
+>>> from xpystac.tracing import trace
+>>> with trace() as t:
+...     ds = to_xarray(item_collection)
+>>> t.summary()
+{'combine_references': {'count': 1, 'seconds': 0.04, 'n_items': 100}, ...}
+"""
+
+import contextlib
+import contextvars
+import threading
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+# callbacks of the traces that are active in the current context
+_callbacks: contextvars.ContextVar[tuple[Callable[["Stage"], None], ...]] = (
+    contextvars.ContextVar("xpystac_trace_callbacks", default=())
+)
+_current: contextvars.ContextVar["Stage | None"] = contextvars.ContextVar(
+    "xpystac_current_stage", default=None
+)
+
+
+class Stage:
+    """One timed stage, with the stages it ran and free-form attributes such
+    as the number of requests made or bytes read.
+
+    ``start`` is the wall-clock time at which the stage started, in
+    nanoseconds since the epoch, and ``duration`` is in seconds.
+    """
+
+    __slots__ = (
+        "name",
+        "attrs",
+        "parent",
+        "children",
+        "start",
+        "duration",
+        "error",
+        "_token",
+        "_counter",
+    )
+
+    def __init__(self, name: str, attrs: dict[str, Any]):
+        self.name = name
+        self.attrs = attrs
+        self.parent: Stage | None = None
+        self.children: list[Stage] = []
+        self.start = 0
+        self.duration = 0.0
+        self.error: BaseException | None = None
+        self._token: contextvars.Token | None = None
+        self._counter = 0
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, duration={self.duration:.6f}, {self.attrs})"
+
+    def record(self, **attrs):
+        """Add attributes to the stage"""
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Stage":
+        self.parent = _current.get()
+        self._token = _current.set(self)
+        self.start = time.time_ns()
+        self._counter = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = (time.perf_counter_ns() - self._counter) / 1e9
+        self.error = exc
+        _current.reset(self._token)
+        if self.parent is not None:
+            self.parent.children.append(self)
+        for callback in _callbacks.get():
+            callback(self)
+        return False
+
+
+class _NullStage:
+    """Stand-in for ``Stage`` when tracing is disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def record(self, **attrs):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name: str, **attrs) -> Stage | _NullStage:
+    """Time the body of a ``with`` block as a stage of the active traces"""
+    if not _callbacks.get():
+        return _NULL_STAGE
+    return Stage(name, attrs)
+
+
+def propagate(func: Callable) -> Callable:
+    """Run ``func`` in the tracing context of the caller.
+
+    Threads of a pool do not inherit context variables, so wrap functions
+    handed to a pool to keep the stages they run in the active traces.
+    """
+    if not _callbacks.get():
+        return func
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+
+    return run
+
+
+class Trace:
+    """Stages recorded by ``trace``, in the order in which they ended"""
+
+    def __init__(self):
+        self.stages: list[Stage] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, stage: Stage):
+        with self._lock:
+            self.stages.append(stage)
+
+    @property
+    def roots(self) -> list[Stage]:
+        """Stages that did not run inside another stage"""
+        return [s for s in self.stages if s.parent is None]
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        """Number of runs and total time of every stage, along with the
+        totals of its numeric attributes."""
+        summary: dict[str, dict[str, Any]] = {}
+        for s in self.stages:
+            totals = summary.setdefault(s.name, {"count": 0, "seconds": 0.0})
+            totals["count"] += 1
+            totals["seconds"] += s.duration
+            for k, v in s.attrs.items():
+                if isinstance(v, (int, float)) and not isinstance(v, bool):
+                    totals[k] = totals.get(k, 0) + v
+        return summary
+
+
+@contextlib.contextmanager
+def trace(callback: Callable[[Stage], None] | None = None) -> Iterator[Any]:
+    """Trace the stages run inside the ``with`` block.
+
+    Parameters
+    ----------
+    callback : Callable, optional
+        Called with every ``Stage`` as soon as it ends, e.g. to log it or to
+        export it with ``opentelemetry_callback``. By default the stages are
+        collected into the ``Trace`` that is yielded.
+    """
+    if callback is None:
+        callback = Trace()
+    token = _callbacks.set((*_callbacks.get(), callback))
+    try:
+        yield callback
+    finally:
+        _callbacks.reset(token)
+
+
+def opentelemetry_callback(tracer: Any = None) -> Callable[[Stage], None]:
+    """Callback for ``trace`` that exports stages as OpenTelemetry spans.
+
+    Spans are created once the outermost stage ends so that nested stages
+    (including those run on thread pools) become child spans. They are
+    parented to the span that was current when that outermost stage ended.
+    """
+    from opentelemetry import trace as otel_trace
+
+    if tracer is None:
+        tracer = otel_trace.get_tracer("xpystac")
+
+    def export(stage: Stage, context: Any = None):
+        span = tracer.start_span(
+            f"xpystac.{stage.name}",
+            context=context,
+            start_time=stage.start,
+            attributes={
+                k: v if isinstance(v, (bool, int, float, str)) else str(v)
+                for k, v in stage.attrs.items()
+            },
+        )
+        if stage.error is not None:
+            span.record_exception(stage.error)
+            span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR))
+        child_context = otel_trace.set_span_in_context(span)
+        for child in stage.children:
+            export(child, child_context)
+        span.end(end_time=stage.start + int(stage.duration * 1e9))
+
+    def callback(stage: Stage):
+        if stage.parent is None:
+            export(stage)
+
+    return callback
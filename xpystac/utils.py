@@ -1,10 +1,14 @@
 import importlib
 from typing import Any
+from urllib.parse import urlparse
+
+from xpystac.tracing import stage
 
 
 def _import_optional_dependency(name):
     try:
-        module = importlib.import_module(name)
+        with stage("import", module=name):
+            module = importlib.import_module(name)
     except ImportError as e:
         raise ImportError(f"Missing optional dependency '{name}'") from e
     return module
@@ -17,3 +21,26 @@ def _is_item_search(obj: Any):
     speed.
     """
     return obj.__class__.__name__ == "ItemSearch"
+
+
+def _is_pystac_object(obj: Any, *names: str) -> bool:
+    """Whether object is an instance of one of the named pystac classes.
+
+    Note: like ``_is_item_search`` this checks the names of the classes in
+    the MRO so that pystac does not need to be imported.
+    """
+    return any(
+        cls.__name__ in names and cls.__module__.partition(".")[0] == "pystac"
+        for cls in type(obj).__mro__
+    )
+
+
+def _local_path(href: str) -> str | None:
+    """Filesystem path of a local href, or None if the href is remote"""
+    parsed = urlparse(href)
+    if parsed.scheme == "file":
+        return parsed.path
+    # single letters are windows drive letters rather than url schemes
+    if len(parsed.scheme) <= 1:
+        return href
+    return None
@@ -1,11 +1,11 @@
 from collections.abc import Callable, Iterable
 from typing import Any, Literal
 
-import pystac
 from xarray.backends import BackendEntrypoint
 
-from xpystac.core import to_xarray
-from xpystac.utils import _is_item_search
+from xpystac.plan import OpenPlan
+from xpystac.tracing import stage
+from xpystac.utils import _is_item_search, _is_pystac_object
 
 
 class STACBackend(BackendEntrypoint):
@@ -33,10 +33,12 @@ class STACBackend(BackendEntrypoint):
         * ItemCollection (output of pystac_client.search): stacks all the
           assets in all the items into a dataset with 2 more dimensions than
           any given asset.
+        * Collection: opens the representation of the data that is cheapest
+          to open, among its collection-level assets and its items.
 
         Parameters
         ----------
-        filename_or_obj : PySTAC object (Item, ItemCollection, Asset)
+        filename_or_obj : PySTAC object (Item, ItemCollection, Asset, Collection)
             The object from which to read data.
         stacking_library : "odc.stac", "stackstac", optional
             When stacking multiple items, this argument determines which library
@@ -46,16 +48,26 @@ class STACBackend(BackendEntrypoint):
             version. Normally used to sign urls before trying to read data from
             them. For instance when working with Planetary Computer this argument
             should be set to ``pc.sign``.
+
+        Wrap the call in ``xpystac.tracing.trace`` to time each stage.
         """
-        return to_xarray(
-            filename_or_obj,
-            drop_variables=drop_variables,
-            stacking_library=stacking_library,
-            patch_url=patch_url,
-            **kwargs,
-        )
+        # --- Imported here so that listing the xarray backends stays cheap
+        from xpystac.core import to_xarray
+
+        with stage("to_xarray", type=type(filename_or_obj).__name__):
+            return to_xarray(
+                filename_or_obj,
+                drop_variables=drop_variables,
+                stacking_library=stacking_library,
+                patch_url=patch_url,
+                **kwargs,
+            )
 
     def guess_can_open(self, filename_or_obj: Any):
-        return isinstance(
-            filename_or_obj, (pystac.Asset, pystac.Item, pystac.ItemCollection)
-        ) or _is_item_search(filename_or_obj)
+        return (
+            _is_pystac_object(
+                filename_or_obj, "Asset", "Item", "ItemCollection", "Collection"
+            )
+            or _is_item_search(filename_or_obj)
+            or isinstance(filename_or_obj, OpenPlan)
+        )